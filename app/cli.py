@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Overlay Annotator - headless command line
+Session operations without Qt, mss or the UI, for build agents and scripts:
+
+  python -m app.cli export  SESSION... [--format md,html,json,pdf,ndjson] [--since TS]
+  python -m app.cli reindex SESSION...
+  python -m app.cli stats   SESSION... [--json]
+  python -m app.cli verify  SESSION... [--json]
+  python -m app.cli render  SESSION JOBS.json
+  python -m app.cli ingest  SESSION FOLDER [--watch]
+
+Only the standard library is imported at startup; app.core modules are
+loaded by the command that needs them. Several sessions are processed in
+parallel on a process pool (--jobs).
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+FORMATS = ("md", "html", "json", "pdf", "ndjson")
+DEFAULT_FORMATS = "md,html"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Headless Overlay Annotator session tools")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="sessions processed in parallel (default: one per CPU, capped)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="write reports for each session")
+    export.add_argument("sessions", nargs="+", type=Path)
+    export.add_argument("-f", "--format", default=DEFAULT_FORMATS,
+                        help=f"comma-separated output formats: {','.join(FORMATS)} (default: {DEFAULT_FORMATS})")
+    export.add_argument("--since", help="only entries saved after this ISO timestamp or date")
+    export.add_argument("--mode", choices=("embedded", "linked"), default="embedded", help="HTML image mode")
+    export.add_argument("--page-size", type=int, default=None, help="entries per HTML page (default: one file)")
+    export.add_argument("--max-width", type=int, default=None,
+                        help="max exported image width (default: session setting, 0 = full size)")
+    export.add_argument("--ndjson-image", choices=("path", "inline", "none"), default="path",
+                        help="how NDJSON rows reference images")
+    export.add_argument("--ndjson-out", type=Path, default=None,
+                        help="NDJSON output file (single session only; default: <session>/entries.ndjson)")
+
+    reindex = sub.add_parser("reindex", help="rebuild manifest.jsonl from metadata")
+    reindex.add_argument("sessions", nargs="+", type=Path)
+
+    render = sub.add_parser("render", help="burn annotations into images and save them as entries")
+    render.add_argument("sessions", nargs=1, type=Path, metavar="session")
+    render.add_argument("jobs_file", type=Path,
+                        help="JSON list of {image, shapes, title, notes}; image paths relative to this file")
+
+    ingest = sub.add_parser("ingest", help="add image files from a folder as entries")
+    ingest.add_argument("sessions", nargs=1, type=Path, metavar="session")
+    ingest.add_argument("folder", type=Path, help="drop folder; handled files move to ingested/ or failed/")
+    ingest.add_argument("--watch", action="store_true", help="keep watching until interrupted")
+    ingest.add_argument("--no-dedup", action="store_true", help="add entries for images already in the session")
+    ingest.add_argument("--keep-encoding", action="store_true",
+                        help="store PNG/JPEG/WebP files as they are instead of re-encoding")
+
+    for name, text in (("stats", "print session statistics"), ("verify", "check metadata, images and manifest")):
+        cmd = sub.add_parser(name, help=text)
+        cmd.add_argument("sessions", nargs="+", type=Path)
+        cmd.add_argument("--json", action="store_true", help="one JSON object per session")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    formats = []
+    if args.command == "export":
+        formats = [f.strip() for f in args.format.split(",") if f.strip()]
+        unknown = sorted(set(formats) - set(FORMATS))
+        if unknown or not formats:
+            parser.error(f"unknown format(s): {', '.join(unknown) or '(none)'}; choose from {','.join(FORMATS)}")
+        if args.ndjson_out and len(args.sessions) > 1:
+            parser.error("--ndjson-out needs a single session")
+
+    for session in args.sessions:
+        if not (session / "metadata").is_dir():
+            parser.error(f"not a session folder (no metadata/): {session}")
+
+    options = {k: v for k, v in vars(args).items() if k not in ("sessions", "jobs")}
+    options["formats"] = formats
+
+    from app.core.parallel import default_workers, ordered_map
+    jobs = max(1, min(args.jobs or default_workers(), len(args.sessions)))
+    # Split CPU between sessions: each export also runs a worker pool of its own
+    options["workers"] = max(1, default_workers() // jobs)
+    if jobs > 1:
+        # Import before the pool starts so forked workers inherit the modules
+        import app.core.models, app.core.storage  # noqa: F401,E401
+
+    tasks = [(str(session), options) for session in args.sessions]
+    ok = True
+    for session, result, error in ordered_map(_run_task, tasks, jobs, executor="process"):
+        ok = ok and error is None and not result.get("problems")
+        _print_result(args.command, session, result, error, getattr(args, "json", False))
+    return 0 if ok else 1
+
+
+def _run_task(task):
+    """Run one command on one session (process pool worker)"""
+    session, options = task
+    try:
+        return session, COMMANDS[options["command"]](Path(session), options), None
+    except Exception as e:
+        return session, {}, f"{type(e).__name__}: {e}"
+
+
+def cmd_export(session: Path, options: dict) -> dict:
+    from app.core.storage import SessionStore
+    from app.core.export_pipeline import HtmlSink, JsonSink, MarkdownSink, NdjsonSink, run_export
+
+    store = SessionStore(session)
+    # A --since export covers part of the session: keep other entries' cached
+    # fragments and assets/ files
+    prune = not options["since"]
+    sinks = []
+    for fmt in options["formats"]:
+        if fmt == "md":
+            sinks.append(MarkdownSink(store, prune=prune))
+        elif fmt == "html":
+            sinks.append(HtmlSink(store, max_width=options["max_width"], mode=options["mode"],
+                                  page_size=options["page_size"], prune=prune))
+        elif fmt == "json":
+            sinks.append(JsonSink(store))
+        elif fmt == "pdf":
+            from app.core.pdf_export import PdfSink
+            sinks.append(PdfSink(store, max_width=options["max_width"]))
+        elif fmt == "ndjson":
+            sinks.append(NdjsonSink(store, options["ndjson_out"], image=options["ndjson_image"]))
+    # Oldest first either way, the same order as GUI exports
+    entries = store.load_entries_since(options["since"]) if options["since"] else None
+    paths = run_export(store, sinks, workers=options["workers"], entries=entries)
+    return {"outputs": [str(p) for p in paths]}
+
+
+def cmd_reindex(session: Path, options: dict) -> dict:
+    from app.core.storage import SessionStore
+    return {"entries": SessionStore(session).reindex()}
+
+
+def cmd_render(session: Path, options: dict) -> dict:
+    from app.core.storage import SessionStore
+    from app.core.render import render_batch
+
+    jobs_file = options["jobs_file"]
+    jobs = json.loads(jobs_file.read_text(encoding="utf-8"))
+    for job in jobs:
+        job["image"] = str(jobs_file.parent / job["image"])
+    entries = render_batch(SessionStore(session), jobs, workers=options["workers"])
+    return {"entries": len(entries)}
+
+
+def cmd_ingest(session: Path, options: dict) -> dict:
+    import time
+    from app.core.storage import SessionStore
+    from app.core.ingest import DEFAULT_SETTLE, FolderWatcher
+
+    count = 0
+
+    def report(entries):
+        nonlocal count
+        count += len(entries)
+        print(f"{session}: +{len(entries)} entries ({count} total)", flush=True)
+
+    watcher = FolderWatcher(SessionStore(session), options["folder"], dedup=not options["no_dedup"],
+                            reencode=not options["keep_encoding"], workers=options["workers"],
+                            settle=DEFAULT_SETTLE if options["watch"] else 0.0)
+    if not options["watch"]:
+        return {"entries": len(watcher.scan_once())}
+    watcher.on_entries = report
+    watcher.start()
+    try:
+        while watcher.is_running():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+    return {"entries": count}
+
+
+def cmd_stats(session: Path, options: dict) -> dict:
+    from app.core.storage import SessionStore, compute_data_stats
+
+    store = SessionStore(session)
+    # Plain metadata dicts: stats need no validation, and skipping pydantic halves the run time
+    entries = store.load_entry_data()
+    stats = compute_data_stats(entries)
+    stamps = sorted(e["timestamp"] for e in entries)
+    stats.update(
+        first=stamps[0] if stamps else None,
+        last=stamps[-1] if stamps else None,
+        images=sum(1 for p in store.images.rglob("*") if p.is_file()),
+        image_bytes=_folder_size(store.images),
+        metadata_bytes=_folder_size(store.meta),
+        cache_bytes=_folder_size(store.cache_dir),
+    )
+    return stats
+
+
+def cmd_verify(session: Path, options: dict) -> dict:
+    """Unreadable metadata, missing or corrupted images, manifest drift, orphaned images"""
+    from app.core.storage import SessionStore, _HASH_RE, file_sha256
+    from app.core.serialization import load_entry
+
+    store = SessionStore(session)
+    problems = []
+    ids = set()
+    referenced = set()
+    for path in sorted(store.meta.glob("*.json")):
+        try:
+            entry = load_entry(path.read_bytes(), store.json_backend)
+        except Exception as e:
+            problems.append(f"unreadable metadata {path.name}: {e}")
+            continue
+        ids.add(entry.id)
+        image = store.root / entry.image.path
+        referenced.add(Path(entry.image.path).as_posix())
+        if not image.exists():
+            problems.append(f"entry {entry.id}: missing image {entry.image.path}")
+        elif _HASH_RE.match(image.stem) and file_sha256(image) != image.stem:
+            problems.append(f"entry {entry.id}: image content does not match its hash {entry.image.path}")
+
+    if store.manifest.exists():
+        indexed = set(store.manifest.rows())
+        if indexed != ids:
+            problems.append(f"manifest out of date ({len(indexed - ids)} stale, {len(ids - indexed)} missing); "
+                            f"run reindex")
+    orphans = [p for p in store.images.glob("??/*")
+               if _HASH_RE.match(p.stem) and p.relative_to(store.root).as_posix() not in referenced]
+    return {"entries": len(ids), "orphaned_images": len(orphans), "problems": problems}
+
+
+COMMANDS = {"export": cmd_export, "ingest": cmd_ingest, "reindex": cmd_reindex, "render": cmd_render,
+            "stats": cmd_stats, "verify": cmd_verify}
+
+
+def _folder_size(folder: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _print_result(command: str, session: str, result: dict, error, as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(dict(result, session=session, error=error)), flush=True)
+        return
+    if error:
+        print(f"{session}: error: {error}", file=sys.stderr, flush=True)
+    elif command == "export":
+        print(f"{session}: " + ", ".join(result["outputs"]), flush=True)
+    elif command == "reindex":
+        print(f"{session}: {result['entries']} entries indexed", flush=True)
+    elif command == "render":
+        print(f"{session}: {result['entries']} annotated entries saved", flush=True)
+    elif command == "ingest":
+        print(f"{session}: {result['entries']} entries ingested", flush=True)
+    elif command == "verify":
+        status = "OK" if not result["problems"] else f"{len(result['problems'])} problem(s)"
+        print(f"{session}: {status} ({result['entries']} entries, "
+              f"{result['orphaned_images']} orphaned images)", flush=True)
+        for problem in result["problems"]:
+            print(f"  - {problem}", flush=True)
+    else:
+        print(f"{session}:", flush=True)
+        for key, value in result.items():
+            print(f"  {key}: {value}", flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
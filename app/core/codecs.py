@@ -0,0 +1,131 @@
+"""
+Image codec presets for session storage
+Each preset wraps a Pillow format plus its encoder options
+"""
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional
+from PIL import Image, features
+
+# Images with at most this many colors fit a palette PNG without loss
+PALETTE_MAX_COLORS = 256
+
+# Fraction of unique colors in a sample above which content is treated as photographic
+PHOTO_UNIQUE_RATIO = 0.35
+
+
+@dataclass
+class Codec:
+    """Single image encoding preset"""
+    name: str
+    format: str
+    extension: str
+    mime: str
+    lossless: bool
+    options: Dict = field(default_factory=dict)
+    palette: bool = False
+
+    def encode(self, pil: Image.Image) -> bytes:
+        """Encode a PIL image to bytes with this preset"""
+        img = pil.convert("RGB")
+        if self.palette:
+            img = _quantize(img)
+        buf = BytesIO()
+        img.save(buf, self.format, **self.options)
+        return buf.getvalue()
+
+
+CODECS: Dict[str, Codec] = {
+    "jpeg": Codec(
+        name="jpeg", format="JPEG", extension=".jpg", mime="image/jpeg", lossless=False,
+        options={"quality": 95, "optimize": True, "progressive": True},
+    ),
+    "webp-lossless": Codec(
+        name="webp-lossless", format="WEBP", extension=".webp", mime="image/webp", lossless=True,
+        options={"lossless": True, "quality": 80, "method": 4},
+    ),
+    "webp": Codec(
+        name="webp", format="WEBP", extension=".webp", mime="image/webp", lossless=False,
+        options={"quality": 90, "method": 4},
+    ),
+    "png": Codec(
+        name="png", format="PNG", extension=".png", mime="image/png", lossless=True,
+        options={"optimize": True},
+    ),
+    "png-palette": Codec(
+        name="png-palette", format="PNG", extension=".png", mime="image/png", lossless=False,
+        options={"optimize": True}, palette=True,
+    ),
+}
+
+# Pseudo-codec that picks one of the presets above per image
+AUTO = "auto"
+
+MIME_BY_EXTENSION = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+
+def webp_available() -> bool:
+    """Check whether this Pillow build can write WebP"""
+    return bool(features.check("webp"))
+
+
+def codec_names() -> List[str]:
+    """Preset names selectable for a session, including auto"""
+    return [AUTO] + list(CODECS)
+
+
+def get_codec(name: str) -> Codec:
+    """Look up a preset by name, falling back to PNG when WebP is unavailable"""
+    if name not in CODECS:
+        raise ValueError(f"Unknown image codec: {name!r} (expected one of {codec_names()})")
+    codec = CODECS[name]
+    if codec.format == "WEBP" and not webp_available():
+        return CODECS["png"] if codec.lossless else CODECS["jpeg"]
+    return codec
+
+
+def choose_codec(pil: Image.Image) -> Codec:
+    """Pick a preset from image content (used by auto mode)
+
+    Photographic content becomes lossy WebP; text and UI captures are stored
+    losslessly. Lossless WebP beats palette PNG on size even for flat UI, so
+    palette PNG is only picked for low-color images when WebP is unavailable.
+    """
+    rgb = pil.convert("RGB")
+    if rgb.getcolors(PALETTE_MAX_COLORS) is not None:
+        return get_codec("webp-lossless" if webp_available() else "png-palette")
+
+    sample = rgb.copy()
+    sample.thumbnail((256, 256))
+    pixels = sample.width * sample.height
+    colors = sample.getcolors(pixels)
+    if colors is not None and len(colors) / max(pixels, 1) > PHOTO_UNIQUE_RATIO:
+        return get_codec("webp")
+    return get_codec("webp-lossless")
+
+
+def resolve_codec(name: str, pil: Optional[Image.Image] = None) -> Codec:
+    """Resolve a preset name (or auto) to a concrete codec"""
+    if name == AUTO:
+        if pil is None:
+            raise ValueError("Auto codec selection needs an image")
+        return choose_codec(pil)
+    return get_codec(name)
+
+
+def mime_for_path(path) -> str:
+    """MIME type for a stored image based on its extension"""
+    return MIME_BY_EXTENSION.get(Path(path).suffix.lower(), "image/jpeg")
+
+
+def _quantize(img: Image.Image) -> Image.Image:
+    """Reduce to a palette image, exact when the image already has few colors"""
+    colors = img.getcolors(PALETTE_MAX_COLORS)
+    count = len(colors) if colors else PALETTE_MAX_COLORS
+    return img.quantize(colors=count, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
@@ -0,0 +1,127 @@
+"""
+Control socket protocol
+Other tools drive a running app over a local socket: one JSON object per
+line in each direction. Requests carry "cmd" (plus an optional "id" echoed
+in the reply); replies carry "ok" and either results or "error". A full
+command queue answers {"ok": false, "error": "busy"} straight away.
+
+This module is Qt-free: the server side lives in app.ui.control_server,
+and send() is a stdlib client for scripts and test runners. hand_off() is
+what a second `python -m app.main` uses to pass its arguments to the
+instance already running, before any Qt import.
+"""
+import getpass
+import json
+import os
+import socket
+import sys
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional
+
+# Longest request line accepted; longer input closes the connection
+MAX_LINE_BYTES = 64 * 1024
+
+# Commands and the fields each requires
+COMMANDS: Dict[str, tuple] = {
+    "ping": (),
+    "status": (),
+    "show": (),           # raise the main window
+    "capture": (),        # optional: region [x, y, w, h], title, notes, save
+    "add": ("image",),    # optional: title, notes, tags
+    "export": (),         # optional: formats ["md", "html", "json", "pdf"], mode
+}
+
+BUSY = "busy"
+
+# Seconds a launching process waits for the resident instance to answer
+HANDOFF_TIMEOUT = 2.0
+
+
+class CommandError(Exception):
+    """Request that cannot be run; the message goes back to the client"""
+
+
+def server_name() -> str:
+    """Per-user socket name, so users on one machine do not collide"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "user"
+    return f"overlay-annotator-{user}"
+
+
+def parse_command(line: bytes) -> Dict[str, Any]:
+    """Validate one request line"""
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        raise CommandError(f"invalid JSON: {e}")
+    if not isinstance(request, dict):
+        raise CommandError("request must be a JSON object")
+    cmd = request.get("cmd")
+    if cmd not in COMMANDS:
+        raise CommandError(f"unknown command: {cmd!r}; expected one of {', '.join(COMMANDS)}")
+    missing = [name for name in COMMANDS[cmd] if name not in request]
+    if missing:
+        raise CommandError(f"{cmd}: missing {', '.join(missing)}")
+    return request
+
+
+def encode_reply(request: Optional[Dict[str, Any]], ok: bool = True, **fields) -> bytes:
+    """Reply line for a request (echoing its id)"""
+    reply: Dict[str, Any] = {"ok": ok}
+    if request and "id" in request:
+        reply["id"] = request["id"]
+    reply.update(fields)
+    return json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def socket_path(name: Optional[str] = None) -> str:
+    """Where QLocalServer listens for a name on this platform"""
+    name = name or server_name()
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{name}"
+    return os.path.join(os.environ.get("TMPDIR") or tempfile.gettempdir(), name)
+
+
+def send(requests: Iterable[Dict[str, Any]], name: Optional[str] = None, timeout: float = 10.0) -> List[Dict]:
+    """Send requests to a running app and return its replies
+
+    Replies arrive as commands finish ("busy" ones at once), so match them
+    to requests by "id" when sending more than one.
+    """
+    payload = b"".join(json.dumps(r).encode("utf-8") + b"\n" for r in requests)
+    expected = payload.count(b"\n")
+    path = socket_path(name)
+    if sys.platform == "win32":
+        with open(path, "r+b", buffering=0) as pipe:
+            pipe.write(payload)
+            return [json.loads(pipe.readline()) for _ in range(expected)]
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(payload)
+        replies = []
+        buffer = b""
+        while len(replies) < expected:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            replies.extend(json.loads(line) for line in lines if line.strip())
+        return replies
+
+
+def hand_off(requests: Iterable[Dict[str, Any]], name: Optional[str] = None,
+             timeout: float = HANDOFF_TIMEOUT) -> Optional[List[Dict]]:
+    """Pass launch requests to the instance already running
+
+    Returns its replies, or None when nothing answers (no socket, a stale
+    one left by a crash, or a hung instance); the caller then starts up.
+    """
+    try:
+        return send(requests, name, timeout)
+    except (OSError, ValueError):
+        return None
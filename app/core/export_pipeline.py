@@ -0,0 +1,433 @@
+"""
+Single-pass export pipeline
+run_export() loads the session's entries once and feeds every sink (Markdown,
+HTML, JSON, ...) from the same ordered pass: per-entry work (fragment render,
+image encode, JSON dump) runs on a bounded thread pool (or, for headless
+callers that opt in, a process pool), and each sink writes its results in
+order to a temp file that replaces the output on success.
+A threading.Event cancels the run between entries and leaves old outputs intact.
+"""
+from contextlib import closing
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+import base64
+import os
+import shutil
+import threading
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+from markupsafe import Markup
+
+from app.core.codecs import get_codec, mime_for_path
+from app.core.fragments import FragmentCache
+from app.core.metrics import timed
+from app.core.parallel import default_workers, ordered_map
+from app.core.serialization import dump_entry, dumps
+from app.core.storage import EXPORT_MODES, ProgressCallback, SessionStore, compute_stats
+from app.core.templates import get_environment, template_source
+
+if TYPE_CHECKING:
+    from app.core.models import Entry
+
+# Placeholder the report template renders where entry fragments are stitched in
+FRAGMENT_SLOT = "<!--overlay-annotator:fragments-->"
+
+# How NDJSON rows reference images
+NDJSON_IMAGE_MODES = ("path", "inline", "none")
+
+# Sinks the current worker process prepares entries for (see _init_worker)
+_worker_sinks: Sequence["ExportSink"] = ()
+
+
+class ExportCancelled(Exception):
+    """Raised by run_export when its cancel event is set"""
+
+
+class ExportSink:
+    """One output fed entry by entry by run_export
+
+    prepare() runs on pool threads or in worker processes and must be
+    thread-safe; write() and the other methods run in order on the exporting
+    thread. Worker processes get a pickled copy of the sink made after
+    open(), without the attributes named in _local_state.
+    """
+
+    # Per-run state that stays in the exporting process (open files, templates)
+    _local_state = ("_files", "_file")
+
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if k not in self._local_state}
+
+    def open(self, entries: List["Entry"]) -> None:
+        pass
+
+    def prepare(self, entry: "Entry"):
+        return entry
+
+    def write(self, prepared) -> None:
+        raise NotImplementedError
+
+    def close(self) -> Path:
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        pass
+
+
+@timed("export.run")
+def run_export(store: SessionStore, sinks: Sequence[ExportSink], progress: Optional[ProgressCallback] = None,
+               cancel: Optional[threading.Event] = None, workers: Optional[int] = None,
+               entries: Optional[List["Entry"]] = None, executor: Optional[str] = None) -> List[Path]:
+    """Load entries once and write every sink in a single ordered pass
+
+    Returns the sinks' output paths in order. If cancel is set (checked
+    between entries) ExportCancelled is raised and no output is replaced.
+    executor is "thread" (default) or "process". Spawned workers re-import
+    the caller's __main__ module, so processes are only worth it for
+    headless callers with many entries and several cores.
+    """
+    if entries is None:
+        entries = store.load_entries()
+    total = len(entries)
+    workers = workers or default_workers()
+    opened: List[ExportSink] = []
+    try:
+        for sink in sinks:
+            sink.open(entries)
+            opened.append(sink)
+        if executor == "process":
+            # Spawned, not forked: the caller may have other threads running
+            results = ordered_map(_prepare_in_worker, entries, workers, executor="process",
+                                  initializer=_init_worker, initargs=(list(sinks),), start_method="spawn")
+        else:
+            results = ordered_map(partial(_prepare_all, sinks), entries, workers)
+        # Cancel is checked here, between results: closing the map drops queued
+        # work, and at most its window of entries is prepared after the event is set
+        with closing(results):
+            for done, prepared in enumerate(results, 1):
+                if cancel is not None and cancel.is_set():
+                    raise ExportCancelled()
+                for sink, item in zip(sinks, prepared):
+                    sink.write(item)
+                if progress:
+                    progress(done, total)
+        if cancel is not None and cancel.is_set():
+            raise ExportCancelled()
+        return [sink.close() for sink in sinks]
+    except BaseException:
+        for sink in opened:
+            sink.abort()
+        raise
+
+
+def _prepare_all(sinks: Sequence[ExportSink], entry: "Entry") -> list:
+    """Per-entry work for every sink (pool worker)"""
+    return [sink.prepare(entry) for sink in sinks]
+
+
+def _init_worker(sinks: Sequence[ExportSink]) -> None:
+    global _worker_sinks
+    _worker_sinks = sinks
+
+
+def _prepare_in_worker(entry: "Entry") -> list:
+    """Per-entry work for every sink (process pool worker)"""
+    return [sink.prepare(entry) for sink in _worker_sinks]
+
+
+class ReportSink(ExportSink):
+    """report.<kind> from the session templates: frame around cached entry fragments
+
+    With page_size the frame is written once per page to <out>-NNNN and
+    out itself becomes an index of the pages. prune=False keeps cached
+    fragments of entries not in this export (for partial exports).
+    """
+
+    _local_state = ExportSink._local_state + ("frame_tpl", "entry_tpl", "context", "pages", "keys", "_tail")
+
+    def __init__(self, store: SessionStore, kind: str, out: Optional[Path] = None, autoescape: bool = False,
+                 max_width: Optional[int] = None, mode: str = "embedded", page_size: Optional[int] = None,
+                 prune: bool = True):
+        if mode not in EXPORT_MODES:
+            raise ValueError(f"Unknown HTML export mode: {mode!r} (expected one of {EXPORT_MODES})")
+        if page_size is not None and page_size < 1:
+            raise ValueError(f"Page size must be >= 1, got {page_size}")
+        self.store = store
+        self.kind = kind
+        self.out = Path(out) if out else store.root / f"report.{kind}"
+        self.autoescape = autoescape
+        self.max_width = max_width
+        self.mode = mode
+        self.page_size = page_size
+        self.prune = prune
+        # Each mode keeps its own fragments so switching modes doesn't evict the other
+        self.cache_kind = kind if mode == "embedded" else f"{kind}-{mode}"
+        self._files = _PendingFiles()
+
+    def __setstate__(self, state):
+        # Worker process: templates don't pickle, load the entry template again
+        self.__dict__.update(state)
+        env = get_environment(self.store.tpl_dir, autoescape=self.autoescape)
+        self.entry_tpl = env.get_template(f"entry.{self.kind}.j2")
+
+    def frame_context(self, entries: List["Entry"]) -> dict:
+        """Variables for the report frame (header, stats)"""
+        return {}
+
+    def open(self, entries: List["Entry"]) -> None:
+        env = get_environment(self.store.tpl_dir, autoescape=self.autoescape)
+        self.frame_tpl = env.get_template(f"report.{self.kind}.j2")
+        entry_name = f"entry.{self.kind}.j2"
+        self.entry_tpl = env.get_template(entry_name)
+        self.tpl_key = FragmentCache.key(self.kind, template_source(env, entry_name), self.max_width, self.mode,
+                                         self.store.export_quality, get_codec("webp").extension)
+        self.context = self.frame_context(entries)
+        self.pages = (_paginate(self.out, entries, self.page_size) if self.page_size
+                      else [(self.out, entries, None)])
+        self.keys: List[str] = []
+        self._page = -1
+        self._start_page()
+
+    def prepare(self, entry: "Entry"):
+        return self.store.entry_fragment(self.kind, self.cache_kind, self.entry_tpl, self.tpl_key,
+                                          self.max_width, self.mode, entry)
+
+    def write(self, prepared) -> None:
+        key, fragment = prepared
+        while self._remaining == 0:
+            self._finish_page()
+            self._start_page()
+        self.keys.append(key)
+        with open(fragment, "rb") as src:
+            shutil.copyfileobj(src, self._file)
+        self._remaining -= 1
+
+    def close(self) -> Path:
+        self._finish_page()
+        if self.page_size:
+            index = [_page_summary(path, page_entries) for path, page_entries, _ in self.pages]
+            with self._files.open(self.out) as f:
+                f.write(self.frame_tpl.render(fragments=[], pages=index, **self.context).encode("utf-8"))
+        # Every page (and the index) is replaced together
+        self._files.commit()
+        _prune_pages(self.out, len(self.pages) if self.page_size else 0)
+        # Drop fragments for entries that changed or no longer exist
+        if self.prune:
+            self.store.fragments.prune(self.cache_kind, self.keys)
+        return self.out
+
+    def abort(self) -> None:
+        self._files.discard()
+
+    def _start_page(self) -> None:
+        self._page += 1
+        path, page_entries, pagination = self.pages[self._page]
+        head, self._tail = _render_frame(self.frame_tpl, dict(self.context, pagination=pagination))
+        self._file = self._files.open(path)
+        self._file.write(head.encode("utf-8"))
+        self._remaining = len(page_entries)
+
+    def _finish_page(self) -> None:
+        self._file.write(self._tail.encode("utf-8"))
+        self._file.close()
+
+
+class MarkdownSink(ReportSink):
+    """report.md"""
+
+    def __init__(self, store: SessionStore, out: Optional[Path] = None, prune: bool = True):
+        super().__init__(store, "md", out, autoescape=False, prune=prune)
+
+
+class HtmlSink(ReportSink):
+    """report.html with embedded or linked images, optionally paginated"""
+
+    _local_state = ReportSink._local_state + ("_asset_ids",)
+
+    def __init__(self, store: SessionStore, out: Optional[Path] = None, max_width: Optional[int] = None,
+                 mode: str = "embedded", page_size: Optional[int] = None, prune: bool = True):
+        if max_width is None:
+            max_width = store.export_max_width
+        super().__init__(store, "html", out, autoescape=True, max_width=max_width, mode=mode,
+                         page_size=page_size, prune=prune)
+
+    def frame_context(self, entries: List["Entry"]) -> dict:
+        return dict(
+            stats=compute_stats(entries),
+            session_name=self.store.root.name,
+            export_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        )
+
+    def open(self, entries: List["Entry"]) -> None:
+        linked = self.mode == "linked" and self.prune
+        self._asset_ids = [self.store.asset_id(entry) for entry in entries] if linked else None
+        super().open(entries)
+
+    def close(self) -> Path:
+        out = super().close()
+        if self._asset_ids is not None:
+            self.store.prune_assets(self._asset_ids)
+        return out
+
+
+class JsonSink(ExportSink):
+    """report.json: session header, stats and every entry as one JSON document"""
+
+    def __init__(self, store: SessionStore, out: Optional[Path] = None):
+        self.store = store
+        self.out = Path(out) if out else store.root / "report.json"
+        self._files = _PendingFiles()
+
+    def open(self, entries: List["Entry"]) -> None:
+        self._file = self._files.open(self.out)
+        header = dumps({
+            "session": self.store.root.name,
+            "exported": datetime.now().isoformat(timespec="seconds"),
+            "stats": compute_stats(entries),
+        }, self.store.json_backend)
+        # Open the header object back up to append the entries array
+        self._file.write(header[:-1].encode("utf-8") + b',"entries":[')
+        self._first = True
+
+    def prepare(self, entry: "Entry") -> bytes:
+        return dump_entry(entry, self.store.json_backend, pretty=False)
+
+    def write(self, prepared: bytes) -> None:
+        if not self._first:
+            self._file.write(b",")
+        self._file.write(b"\n")
+        self._file.write(prepared)
+        self._first = False
+
+    def close(self) -> Path:
+        self._file.write(b"\n]}\n")
+        self._files.commit()
+        return self.out
+
+    def abort(self) -> None:
+        self._files.discard()
+
+
+class NdjsonSink(ExportSink):
+    """One JSON object per entry per line, for feeding other tools
+
+    image="path" keeps the session-relative image path, "inline" also embeds
+    the file as base64 (image.mime, image.data), "none" drops the path.
+    with_hash fills image.sha256 for entries saved before it was recorded.
+    """
+
+    def __init__(self, store: SessionStore, out: Optional[Path] = None, image: str = "path",
+                 with_hash: bool = True):
+        if image not in NDJSON_IMAGE_MODES:
+            raise ValueError(f"Unknown NDJSON image mode: {image!r} (expected one of {NDJSON_IMAGE_MODES})")
+        self.store = store
+        self.out = Path(out) if out else store.root / "entries.ndjson"
+        self.image = image
+        self.with_hash = with_hash
+        self._files = _PendingFiles()
+
+    def open(self, entries: List["Entry"]) -> None:
+        self._file = self._files.open(self.out)
+
+    def prepare(self, entry: "Entry") -> bytes:
+        row = entry.model_dump(mode="json")
+        image = row["image"]
+        if self.with_hash and not image.get("sha256"):
+            image["sha256"] = self.store.image_hash(entry.image.path)
+        if self.image == "inline":
+            source = self.store.root / entry.image.path
+            if source.exists():
+                image["mime"] = mime_for_path(str(source))
+                image["data"] = base64.b64encode(source.read_bytes()).decode("ascii")
+        elif self.image == "none":
+            del image["path"]
+        return dumps(row, self.store.json_backend).encode("utf-8") + b"\n"
+
+    def write(self, prepared: bytes) -> None:
+        self._file.write(prepared)
+
+    def close(self) -> Path:
+        self._files.commit()
+        return self.out
+
+    def abort(self) -> None:
+        self._files.discard()
+
+
+def _paginate(out: Path, entries: List["Entry"], page_size: int) -> List[tuple]:
+    """Split entries into (page path, page entries, pagination context) triples"""
+    count = max(1, -(-len(entries) // page_size))
+    names = [f"{out.stem}-{n:04d}{out.suffix}" for n in range(1, count + 1)]
+    pages = []
+    for i, name in enumerate(names):
+        start = i * page_size
+        page_entries = entries[start:start + page_size]
+        pages.append((out.with_name(name), page_entries, {
+            "page": i + 1,
+            "pages": count,
+            "prev": names[i - 1] if i > 0 else None,
+            "next": names[i + 1] if i + 1 < count else None,
+            "index": out.name,
+            "first": start + 1 if page_entries else 0,
+            "last": start + len(page_entries),
+        }))
+    return pages
+
+
+def _page_summary(path: Path, entries: List["Entry"]) -> dict:
+    """Index row for one page"""
+    return {
+        "number": int(path.stem.rsplit("-", 1)[1]),
+        "href": path.name,
+        "count": len(entries),
+        "first_title": entries[0].title if entries else "",
+        "first_date": entries[0].timestamp[:10] if entries else "",
+        "last_date": entries[-1].timestamp[:10] if entries else "",
+    }
+
+
+def _prune_pages(out: Path, count: int) -> None:
+    """Remove pages left over from an earlier export that had more of them"""
+    for path in out.parent.glob(f"{out.stem}-[0-9][0-9][0-9][0-9]{out.suffix}"):
+        if int(path.stem.rsplit("-", 1)[1]) > count:
+            path.unlink()
+
+
+def _render_frame(tpl, context: dict):
+    """Render a report template around FRAGMENT_SLOT and split it into head and tail"""
+    frame = tpl.render(fragments=[Markup(FRAGMENT_SLOT)], **context)
+    if FRAGMENT_SLOT not in frame:
+        raise ValueError(f"Template {tpl.name} must loop over 'fragments' to place entries")
+    head, tail = frame.split(FRAGMENT_SLOT, 1)
+    return head, tail
+
+
+class _PendingFiles:
+    """Outputs written under temp names, renamed into place together on commit
+
+    Readers never see a partial export, and an aborted export leaves the
+    previous files untouched.
+    """
+
+    def __init__(self):
+        self._files = []
+
+    def open(self, path: Path):
+        # Unique per thread: a GUI export and a control-socket export may share a folder
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        f = open(tmp, "wb")
+        self._files.append((tmp, path, f))
+        return f
+
+    def commit(self) -> None:
+        files, self._files = self._files, []
+        for tmp, path, f in files:
+            f.close()
+            os.replace(tmp, path)
+
+    def discard(self) -> None:
+        files, self._files = self._files, []
+        for tmp, path, f in files:
+            f.close()
+            tmp.unlink(missing_ok=True)
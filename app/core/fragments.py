@@ -0,0 +1,58 @@
+"""
+Per-entry rendered fragment cache for incremental report exports
+A fragment is keyed by the entry JSON, its image content, the entry template
+source and export parameters, so any change produces a new key
+"""
+from pathlib import Path
+import hashlib
+import os
+import threading
+from typing import Iterable, Optional
+
+
+class FragmentCache:
+    """Rendered entry fragments under <session>/_cache/fragments/<kind>/"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def key(*parts) -> str:
+        """Stable hash over the inputs that determine a fragment"""
+        h = hashlib.sha256()
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = str(part).encode("utf-8")
+            h.update(len(part).to_bytes(8, "little"))
+            h.update(part)
+        return h.hexdigest()
+
+    def path_for(self, kind: str, key: str) -> Path:
+        return self.cache_dir / kind / f"{key}.frag"
+
+    def get(self, kind: str, key: str) -> Optional[Path]:
+        path = self.path_for(kind, key)
+        return path if path.exists() else None
+
+    def put(self, kind: str, key: str, text: str) -> Path:
+        """Store a rendered fragment atomically (safe from worker threads)"""
+        path = self.path_for(kind, key)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        os.replace(tmp, path)
+        return path
+
+    def prune(self, kind: str, keep: Iterable[str]) -> int:
+        """Delete fragments of a kind that the latest export did not use"""
+        keep = set(keep)
+        removed = 0
+        folder = self.cache_dir / kind
+        if not folder.exists():
+            return 0
+        for path in folder.glob("*.frag"):
+            if path.stem not in keep:
+                path.unlink()
+                removed += 1
+        return removed
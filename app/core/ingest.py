@@ -0,0 +1,315 @@
+"""
+Watch-folder ingestion
+Image files dropped into a folder (e.g. by automated UI tests) become
+session entries. A file is picked up once its size and mtime have stayed
+unchanged for `settle` seconds, decoded and stored on a bounded worker
+pool, then moved to <folder>/ingested (or <folder>/failed). Entry fields
+come from a sidecar (shot.png.json or shot.json, written before the image)
+or from the filename.
+"""
+from contextlib import closing
+import hashlib
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from app.core.models import Entry, ImageModel
+from app.core.parallel import default_workers, ordered_map
+from app.core.serialization import loads
+from app.core.storage import SessionStore, parse_timestamp
+
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.Ingest')
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".tif", ".tiff")
+INGESTED_DIR = "ingested"
+FAILED_DIR = "failed"
+
+# Seconds a file must stay unchanged before it is read (writers still busy)
+DEFAULT_SETTLE = 1.0
+# Seconds between folder scans when nothing pokes the watcher
+DEFAULT_POLL_INTERVAL = 2.0
+# Files handled per pass; a burst of thousands is worked through in chunks
+MAX_BATCH = 256
+
+# Sidecar fields copied onto the entry
+SIDECAR_FIELDS = ("title", "notes", "tags", "layout", "context", "timestamp")
+
+EntriesCallback = Callable[[List[Entry]], None]
+ErrorCallback = Callable[[Path, str], None]
+
+
+class IngestedImage(NamedTuple):
+    """Result of encoding one dropped file (worker side); stored only if it is kept"""
+    source: Path
+    data: Optional[bytes]
+    extension: str
+    size: Tuple[int, int]
+    sha256: Optional[str]
+    fields: dict
+    error: Optional[str]
+
+
+def sidecar_for(path: Path) -> Optional[Path]:
+    """shot.png.json or shot.json next to the image, if present"""
+    for candidate in (path.with_name(path.name + ".json"), path.with_suffix(".json")):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def entry_fields(path: Path) -> dict:
+    """Entry fields from the sidecar JSON, else a title from the filename"""
+    fields = {"title": path.stem.replace("_", " ").replace("-", " ").strip() or path.name, "notes": ""}
+    sidecar = sidecar_for(path)
+    if sidecar is not None:
+        data = loads(sidecar.read_bytes())
+        if not isinstance(data, dict):
+            raise ValueError(f"{sidecar.name} is not a JSON object")
+        fields.update({k: data[k] for k in SIDECAR_FIELDS if k in data})
+        if fields.get("timestamp"):
+            # Checked here so a bad value fails this file, not later --since exports
+            try:
+                fields["timestamp"] = parse_timestamp(fields["timestamp"]).isoformat()
+            except (TypeError, ValueError):
+                raise ValueError(f"{sidecar.name}: invalid timestamp {fields['timestamp']!r}") from None
+    return fields
+
+
+def encode_image_file(store: SessionStore, path: Path, reencode: bool = True) -> Tuple[bytes, str, Tuple[int, int]]:
+    """Decode a dropped image; bytes to store (session codec, or the file as is), extension and size"""
+    with Image.open(path) as img:
+        img.load()  # full decode: truncated or corrupt files fail here
+        ext = path.suffix.lower()
+        if reencode or ext not in (".png", ".jpg", ".jpeg", ".webp"):
+            data, extension = store.encode_image(img)
+        else:
+            data, extension = path.read_bytes(), ".jpg" if ext == ".jpeg" else ext
+        return data, extension, img.size
+
+
+def store_image_file(store: SessionStore, path: Path, reencode: bool = True) -> ImageModel:
+    """Decode a dropped image and store it (re-encoded with the session codec, or as is)"""
+    data, extension, (width, height) = encode_image_file(store, path, reencode)
+    rel = store.store_image_bytes(data, extension)
+    return ImageModel(path=rel.as_posix(), width=width, height=height, sha256=store.image_hash(rel))
+
+
+def store_image(store: SessionStore, img: Image.Image) -> ImageModel:
+    """Encode an image with the session codec and store it"""
+    rel = store.save_image(img)
+    return ImageModel(path=rel.as_posix(), width=img.width, height=img.height, sha256=store.image_hash(rel))
+
+
+class FolderWatcher:
+    """Polls a folder on a background thread and ingests settled image files
+
+    poke() wakes the thread early (hook it to a filesystem change signal);
+    repeated pokes coalesce. Decoding and encoding run on at most `workers`
+    threads with a bounded submission window, so memory stays flat however
+    many files arrive. Entries are saved on the watcher thread in arrival
+    order and reported through on_entries, one call per batch.
+    """
+
+    def __init__(self, store: SessionStore, folder: Path, dedup: bool = True, reencode: bool = True,
+                 workers: Optional[int] = None, settle: float = DEFAULT_SETTLE,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 on_entries: Optional[EntriesCallback] = None, on_error: Optional[ErrorCallback] = None):
+        self.store = store
+        self.folder = Path(folder)
+        self.dedup = dedup
+        self.reencode = reencode
+        self.workers = workers or default_workers()
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.on_entries = on_entries
+        self.on_error = on_error
+        self._seen: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self._known_hashes: Optional[set] = None
+        self._manifest_size = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="FolderWatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.folder} for new images")
+
+    def stop(self, wait: bool = True) -> None:
+        """Stop after the current file; files not yet handled stay in the folder"""
+        self._stop.set()
+        self._wake.set()
+        if wait and self._thread:
+            self._thread.join()
+        self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def poke(self) -> None:
+        """Scan now instead of at the next poll"""
+        self._wake.set()
+
+    def scan_once(self) -> List[Entry]:
+        """Ingest every file that has settled; returns the new entries"""
+        ready = self._settled_files()
+        entries: List[Entry] = []
+        for start in range(0, len(ready), MAX_BATCH):
+            if self._stop.is_set():
+                break
+            batch = self._ingest(ready[start:start + MAX_BATCH])
+            entries.extend(batch)
+            if batch and self.on_entries:
+                self.on_entries(batch)
+        return entries
+
+    # --- internals ---
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.scan_once()
+            except Exception:
+                logger.error("Folder scan failed", exc_info=True)
+            # Files still settling are re-checked after `settle`, not a full poll
+            timeout = min(self.poll_interval, self.settle) if self._seen else self.poll_interval
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _settled_files(self) -> List[Path]:
+        """Image files whose size and mtime have not changed for `settle` seconds"""
+        now = time.monotonic()
+        present = {}
+        try:
+            with os.scandir(self.folder) as it:
+                for item in it:
+                    if item.name.startswith(".") or not item.name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    try:
+                        if not item.is_file():
+                            continue
+                        st = item.stat()
+                    except OSError:
+                        continue
+                    if st.st_size:
+                        present[item.name] = ((st.st_size, st.st_mtime_ns), st.st_mtime)
+        except FileNotFoundError:
+            return []
+
+        ready = []
+        seen = {}
+        for name, (signature, mtime) in present.items():
+            previous = self._seen.get(name)
+            since = previous[1] if previous and previous[0] == signature else now
+            if now - since >= self.settle:
+                ready.append((mtime, name))
+            else:
+                seen[name] = (signature, since)
+        self._seen = seen  # forget files that vanished or are about to be handled
+        return [self.folder / name for _, name in sorted(ready)]
+
+    def _ingest(self, paths: List[Path]) -> List[Entry]:
+        if self.dedup:
+            self._refresh_known_hashes()
+        entries = []
+        with closing(ordered_map(self._encode_one, paths, self.workers)) as results:
+            for result in results:
+                if self._stop.is_set():
+                    break  # files not handled yet stay in the folder for next time
+                if result.error:
+                    logger.warning(f"Could not ingest {result.source.name}: {result.error}")
+                    self._dispose(result.source, FAILED_DIR)
+                    if self.on_error:
+                        self.on_error(result.source, result.error)
+                    continue
+                sha = result.sha256
+                if self.dedup and sha in self._known_hashes:
+                    # Checked before storing, so duplicates never write an image
+                    logger.info(f"Skipped duplicate {result.source.name}")
+                else:
+                    # Stored and saved together here: a stop never leaves an unsaved image
+                    rel = self.store.store_image_bytes(result.data, result.extension)
+                    width, height = result.size
+                    entry = entry_from_fields(result.fields, ImageModel(path=rel.as_posix(), width=width,
+                                                                        height=height, sha256=sha))
+                    self.store.save_entry(entry)
+                    entries.append(entry)
+                    if self._known_hashes is not None:
+                        self._known_hashes.add(sha)
+                self._dispose(result.source, INGESTED_DIR)
+        if entries:
+            logger.info(f"Ingested {len(entries)} entries from {self.folder}")
+        return entries
+
+    def _refresh_known_hashes(self) -> None:
+        """Re-read image hashes when the manifest changed (saves, deletes, reindex)"""
+        size = self.store.manifest.size()
+        if self._known_hashes is None or size != self._manifest_size:
+            self._known_hashes = {row.get("sha256") for row in self.store.ensure_manifest().rows().values()}
+            self._manifest_size = self.store.manifest.size()
+
+    def _encode_one(self, path: Path) -> IngestedImage:
+        """Decode, encode and hash one file (pool thread)"""
+        try:
+            fields = entry_fields(path)
+            data, extension, size = encode_image_file(self.store, path, self.reencode)
+            return IngestedImage(path, data, extension, size, hashlib.sha256(data).hexdigest(), fields, None)
+        except Exception as e:
+            return IngestedImage(path, None, "", (0, 0), None, {}, f"{type(e).__name__}: {e}")
+
+    def _dispose(self, path: Path, subdir: str) -> None:
+        """Move a handled file (and its sidecar) out of the watched folder
+
+        A bare shot.json stays while another shot.* image still needs it.
+        """
+        target_dir = self.folder / subdir
+        target_dir.mkdir(exist_ok=True)
+        sidecar = sidecar_for(path)
+        if sidecar == path.with_suffix(".json") and _shares_stem(path):
+            sidecar = None
+        for source in (path, sidecar):
+            if source is None or not source.exists():
+                continue
+            target = target_dir / source.name
+            n = 1
+            while target.exists():
+                target = target_dir / f"{source.stem}.{n}{source.suffix}"
+                n += 1
+            try:
+                os.replace(source, target)
+            except OSError:
+                logger.warning(f"Could not move {source.name} to {subdir}/", exc_info=True)
+
+
+def _shares_stem(path: Path) -> bool:
+    """Whether another image named like path (shot.png / shot.jpg) is still in its folder"""
+    for ext in IMAGE_EXTENSIONS:
+        for suffix in (ext, ext.upper()):
+            other = path.with_suffix(suffix)
+            # samefile: shot.PNG is shot.png on case-insensitive filesystems
+            if other.name != path.name and other.exists() and not other.samefile(path):
+                return True
+    return False
+
+
+def entry_from_fields(fields: dict, image: ImageModel) -> Entry:
+    """New entry for a stored image from sidecar/request fields"""
+    entry = Entry.new(title=str(fields.get("title") or "Untitled"), notes=str(fields.get("notes") or ""),
+                      layout=fields.get("layout") or "image-left", image=image)
+    if fields.get("tags"):
+        entry.tags = list(fields["tags"])
+    if fields.get("context"):
+        entry.context = dict(fields["context"])
+    if fields.get("timestamp"):
+        entry.timestamp = parse_timestamp(fields["timestamp"]).isoformat()
+    return entry
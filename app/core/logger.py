@@ -1,15 +1,72 @@
 """
 Error logging system for Overlay Annotator
 Logs all errors to file for debugging
+
+Each launch writes overlay_annotator_<timestamp>.log, rotated into gzip
+backups when it grows past LOG_MAX_BYTES. At startup a background thread
+compresses logs of earlier launches and deletes the oldest files once the
+folder exceeds LOG_MAX_TOTAL_BYTES or LOG_MAX_FILES, or they pass
+LOG_MAX_AGE_DAYS.
 """
+import atexit
+import gzip
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
+from typing import NamedTuple, Optional, Union
+
+# Level for the app's own loggers; --log-level or this variable overrides it
+LOG_LEVEL_ENV = "OVERLAY_ANNOTATOR_LOG_LEVEL"
+DEFAULT_LEVEL = "INFO"
+# Third-party libraries (PIL decoders log every PNG chunk at DEBUG) stay quieter
+LIBRARY_LEVEL = logging.WARNING
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+LOG_PREFIX = "overlay_annotator_"
+# One launch's log is rotated at this size, keeping LOG_BACKUP_COUNT gzip backups
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+# Retention across all launches (compressed sizes)
+LOG_MAX_TOTAL_BYTES = 100 * 1024 * 1024
+LOG_MAX_AGE_DAYS = 14
+# A kiosk relaunched all day makes many small files; keep the folder listable
+LOG_MAX_FILES = 200
+# Logs of earlier launches untouched this long are compressed; a long-running
+# instance still writing to its file is left alone
+COMPRESS_AFTER_S = 24 * 3600
+
+# Writes queued records to file and console on its own thread
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def resolve_level(level: Union[str, int, None] = None) -> int:
+    """Numeric level from an argument, the environment or the default"""
+    if level is None:
+        level = os.environ.get(LOG_LEVEL_ENV) or DEFAULT_LEVEL
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level: {level}")
+    return value
 
 
-def setup_logging(log_dir: Path = None):
-    """Setup logging to both file and console"""
+def setup_logging(log_dir: Path = None, level: Union[str, int, None] = None):
+    """Setup logging to both file and console
+
+    Log calls only put the record on a queue; a QueueListener thread does
+    the formatting and the file/console writes, so a slow disk never
+    stalls the GUI thread.
+    """
+    global _listener
     
     # Create logs directory
     if log_dir is None:
@@ -20,29 +77,140 @@ def setup_logging(log_dir: Path = None):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = log_dir / f"overlay_annotator_{timestamp}.log"
     
-    # Configure logging
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            # File handler - saves everything
-            logging.FileHandler(log_file, encoding='utf-8'),
-            # Console handler - shows important messages
-            logging.StreamHandler(sys.stdout)
-        ]
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
     )
+    file_handler.namer = lambda name: name + ".gz"
+    file_handler.rotator = _gzip_file
+    console_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+    
+    stop_logging()
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(LIBRARY_LEVEL)
+    _listener = logging.handlers.QueueListener(records, file_handler, console_handler)
+    _listener.start()
     
     logger = logging.getLogger('OverlayAnnotator')
+    logger.setLevel(resolve_level(level))
     logger.info("=" * 60)
     logger.info("Overlay Annotator Started")
     logger.info(f"Log file: {log_file}")
+    logger.info(f"Log level: {logging.getLevelName(logger.level)}")
     logger.info(f"Python version: {sys.version}")
     logger.info(f"Platform: {sys.platform}")
     logger.info("=" * 60)
     
+    # Old logs can number in the thousands: prune without delaying startup
+    threading.Thread(target=_prune_in_background, args=(log_dir, log_file),
+                     name="LogPruner", daemon=True).start()
+    
     return logger, log_file
 
 
+class PruneResult(NamedTuple):
+    compressed: int
+    deleted: int
+    total_bytes: int  # what is left
+
+
+def prune_logs(log_dir: Path, current: Optional[Path] = None, max_total_bytes: int = LOG_MAX_TOTAL_BYTES,
+               max_age_days: float = LOG_MAX_AGE_DAYS, compress_after: float = COMPRESS_AFTER_S,
+               max_files: int = LOG_MAX_FILES) -> PruneResult:
+    """Compress idle logs, then delete by age and oldest-first down to max_total_bytes and max_files
+
+    Only overlay_annotator_* log files are touched; `current` (the log of
+    this launch) and its rotated backups are never deleted.
+    """
+    now = time.time()
+    protected = current.name if current else None
+    files = []  # (mtime, size, path)
+    compressed = 0
+    # List first: compressing adds files to the directory being scanned
+    with os.scandir(log_dir) as it:
+        entries = [item for item in it if item.name.startswith(LOG_PREFIX)
+                   and (item.name.endswith(".log") or ".log." in item.name)]
+    for item in entries:
+        try:
+            if not item.is_file():
+                continue
+            st = item.stat()
+        except OSError:
+            continue
+        path = Path(item.path)
+        age = now - st.st_mtime
+        if (item.name.endswith(".log") and item.name != protected
+                and compress_after <= age < max_age_days * 86400):  # expired ones are deleted below
+            try:
+                path = _gzip_file(path, path.with_name(path.name + ".gz"))
+                os.utime(path, (st.st_atime, st.st_mtime))  # age by when it was written
+                compressed += 1
+                st = path.stat()
+            except OSError:
+                logging.getLogger('OverlayAnnotator.Logs').warning(f"Could not compress {item.name}", exc_info=True)
+        files.append((st.st_mtime, st.st_size, path))
+    
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    count = len(files)
+    deleted = 0
+    for mtime, size, path in files:
+        if protected and path.name.startswith(protected):
+            continue
+        if total <= max_total_bytes and count <= max_files and now - mtime < max_age_days * 86400:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            continue  # gone already, or still open by another instance on Windows
+        total -= size
+        count -= 1
+        deleted += 1
+    return PruneResult(compressed, deleted, total)
+
+
+def _prune_in_background(log_dir: Path, current: Path):
+    logger = logging.getLogger('OverlayAnnotator.Logs')
+    try:
+        result = prune_logs(log_dir, current)
+    except Exception:
+        logger.warning("Log pruning failed", exc_info=True)
+        return
+    if result.compressed or result.deleted:
+        logger.info(f"Log folder pruned: {result.compressed} compressed, {result.deleted} deleted, "
+                    f"{result.total_bytes / 1e6:.1f} MB kept")
+
+
+def _gzip_file(source, dest):
+    """Compress source into dest (atomically), then remove source"""
+    dest = Path(dest)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    with open(source, "rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, dest)
+    os.remove(source)
+    return dest
+
+
+def stop_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # drains the queue first
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
 def log_exception(logger, exc_info=None):
     """Log an exception with full traceback"""
     if exc_info is None:
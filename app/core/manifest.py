@@ -0,0 +1,134 @@
+"""
+Append-only session manifest (manifest.jsonl)
+One small JSON row per entry, so the entry list never needs to open metadata/*.json
+"""
+from pathlib import Path
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from app.core.serialization import default_backend, dumps, loads
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def manifest_row(entry) -> Dict:
+    """Summary of an entry as stored in the manifest"""
+    return {
+        "id": entry.id,
+        "title": entry.title,
+        "timestamp": entry.timestamp,
+        "image": entry.image.path,
+        "sha256": entry.image.sha256,
+    }
+
+
+class SessionManifest:
+    """Line-per-change index of session entries
+
+    Saving an entry appends its row; re-saving appends a newer row with the
+    same id and deleting appends a tombstone. Readers keep the last row per
+    id. reindex() on the store rewrites the file compactly.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._backend = default_backend()
+
+    def __getstate__(self):
+        # The lock only guards appends within this process
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def append(self, row: Dict) -> None:
+        line = dumps(row, self._backend) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def append_tombstone(self, entry_id: str) -> None:
+        self.append({"id": entry_id, "deleted": True})
+
+    def size(self) -> int:
+        """Current file size in bytes (0 if missing)"""
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def read_page(self, offset: int, max_rows: int) -> Tuple[List[Dict], int]:
+        """Read up to max_rows raw rows starting at a byte offset
+
+        Returns the rows and the offset to continue from. A final line
+        without a newline (an append in progress) is left for the next call.
+        """
+        rows: List[Dict] = []
+        if not self.path.exists():
+            return rows, offset
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while len(rows) < max_rows:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(loads(line, self._backend))
+                except ValueError:
+                    # Garbage left by a crash mid-append
+                    continue
+        return rows, offset
+
+    def iter_changes(self, page_size: int = 1000) -> Iterator[Dict]:
+        """Raw rows in file order, including superseded rows and tombstones"""
+        offset = 0
+        while True:
+            rows, next_offset = self.read_page(offset, page_size)
+            if next_offset == offset:
+                return
+            offset = next_offset
+            yield from rows
+
+    def rows(self) -> Dict[str, Dict]:
+        """Live rows keyed by id, in first-saved order"""
+        return self.snapshot()[0]
+
+    def snapshot(self, page_size: int = 1000) -> Tuple[Dict[str, Dict], int]:
+        """Live rows plus the byte offset they were read up to
+
+        Passing the offset to read_page() later returns only the changes
+        appended since.
+        """
+        live: Dict[str, Dict] = {}
+        offset = 0
+        while True:
+            rows, next_offset = self.read_page(offset, page_size)
+            if next_offset == offset:
+                return live, offset
+            offset = next_offset
+            for row in rows:
+                if row.get("deleted"):
+                    live.pop(row["id"], None)
+                else:
+                    live[row["id"]] = row
+
+    def rewrite(self, rows: Iterable[Dict]) -> None:
+        """Atomically replace the manifest with the given rows"""
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(dumps(row, self._backend) + "\n")
+            os.replace(tmp, self.path)
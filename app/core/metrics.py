@@ -0,0 +1,226 @@
+"""
+Hot-path timing spans
+Code marks out work with span("name") (or @timed("name")) and the time is
+added to a per-name histogram; enable() also writes a summary (count,
+p50/p95/max in milliseconds) to a JSON file every few seconds. Steps that
+cross events, such as hotkey to loaded canvas, use mark() and
+record_since().
+
+Metrics are off unless enabled: span() then returns a shared no-op
+context manager and timed() functions call straight through, so the
+instrumented call sites cost one global lookup each.
+"""
+from collections import deque
+from functools import wraps
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.Metrics')
+
+METRICS_ENV = "OVERLAY_ANNOTATOR_METRICS"
+METRICS_FILE = "metrics.json"
+# Seconds between metrics file writes
+DEFAULT_WRITE_INTERVAL = 30.0
+# Most recent durations kept per span for the percentiles
+SAMPLES_PER_SPAN = 1024
+
+
+class _Histogram:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLES_PER_SPAN)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return {
+            "count": self.count,
+            "p50_ms": round(pick(0.50) * 1000, 3),
+            "p95_ms": round(pick(0.95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3),
+        }
+
+
+class Metrics:
+    """Span histograms plus the thread that writes them out"""
+
+    def __init__(self, path: Optional[Path] = None, interval: float = DEFAULT_WRITE_INTERVAL):
+        self.path = Path(path) if path else None
+        self.interval = interval
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, _Histogram] = {}
+        self._marks: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram()
+            histogram.add(seconds)
+
+    def mark(self, name: str) -> None:
+        self._marks[name] = time.perf_counter()
+
+    def record_since(self, mark: str, name: str) -> None:
+        start = self._marks.pop(mark, None)
+        if start is not None:
+            self.record(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            spans = {name: h.summary() for name, h in sorted(self._histograms.items())}
+        return {"started": self.started, "written": time.time(), "pid": os.getpid(), "spans": spans}
+
+    def write(self) -> None:
+        """Write the snapshot atomically to self.path"""
+        if self.path is None:
+            return
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.snapshot(), indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def start(self) -> None:
+        if self.path is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="MetricsWriter", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer thread and write a final snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.write()
+        except OSError:
+            logger.warning(f"Could not write {self.path}", exc_info=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                logger.warning(f"Could not write {self.path}", exc_info=True)
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: Metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+# Active collector; None while metrics are disabled
+_metrics: Optional[Metrics] = None
+
+
+def enable(path: Optional[Path] = None, interval: float = DEFAULT_WRITE_INTERVAL) -> Metrics:
+    """Start collecting; with a path, write it every `interval` seconds"""
+    global _metrics
+    disable()
+    _metrics = Metrics(path, interval)
+    _metrics.start()
+    if path:
+        logger.info(f"Timing metrics enabled: {path}")
+    return _metrics
+
+
+def disable() -> None:
+    """Stop collecting (writing a final snapshot)"""
+    global _metrics
+    metrics, _metrics = _metrics, None
+    if metrics is not None:
+        metrics.stop()
+
+
+def enabled() -> bool:
+    return _metrics is not None
+
+
+def enabled_by_environment() -> bool:
+    return os.environ.get(METRICS_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+def current() -> Optional[Metrics]:
+    return _metrics
+
+
+def span(name: str):
+    """Context manager timing its block under `name`"""
+    metrics = _metrics
+    if metrics is None:
+        return _NULL_SPAN
+    return _Span(metrics, name)
+
+
+def timed(name: str) -> Callable:
+    """Decorator timing every call under `name`"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            metrics = _metrics
+            if metrics is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def mark(name: str) -> None:
+    """Remember now as the start of a step that ends in another event"""
+    metrics = _metrics
+    if metrics is not None:
+        metrics.mark(name)
+
+
+def record_since(mark_name: str, name: str) -> None:
+    """Record the time since mark(mark_name) under `name` (once per mark)"""
+    metrics = _metrics
+    if metrics is not None:
+        metrics.record_since(mark_name, name)
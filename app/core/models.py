@@ -10,6 +10,7 @@ class ImageModel(BaseModel):
     height: int
     quality: Optional[int] = None  # Compatible with Python <3.10
     hires: bool = False
+    sha256: Optional[str] = None  # Content hash of the stored file
 
 class Entry(BaseModel):
     id: str
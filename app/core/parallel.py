@@ -0,0 +1,60 @@
+"""
+Bounded, order-preserving parallel map used by exports and batch jobs
+"""
+from collections import deque
+import os
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def default_workers(limit: int = 8) -> int:
+    """Worker count for CPU-bound pools: one per core, capped"""
+    return max(1, min(limit, os.cpu_count() or 1))
+
+
+def ordered_map(fn: Callable[[T], R], items: Iterable[T], workers: Optional[int] = None,
+                window: Optional[int] = None, executor: str = "thread",
+                initializer: Optional[Callable] = None, initargs: tuple = (),
+                start_method: Optional[str] = None) -> Iterator[R]:
+    """Like map(fn, items) on a pool, yielding results in input order
+
+    At most `window` items (default 2 per worker) are submitted ahead of the
+    consumer, so memory stays bounded however long the input is. With one
+    worker everything runs inline on the calling thread (after initializer).
+    executor is "thread" or "process" (fn, items and initargs must then be
+    picklable); start_method picks the multiprocessing start method
+    ("spawn" is safe from threaded callers, the default "fork" is not).
+    """
+    workers = workers or default_workers()
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in items:
+            yield fn(item)
+        return
+
+    # Pools load on first parallel use: single-worker callers (one-session CLI runs) skip them
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    window = max(window or workers * 2, 1)
+    if executor == "process":
+        import multiprocessing
+        context = multiprocessing.get_context(start_method) if start_method else None
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                   initializer=initializer, initargs=initargs)
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Consumer stopped early (error or cancel): drop work not yet started
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
@@ -0,0 +1,286 @@
+"""
+Streaming PDF export
+A small pure-Python PDF writer: each page (image as a DCT/JPEG XObject plus
+Helvetica title, metadata and wrapped notes) is written to disk as soon as it
+is laid out, and only object offsets are kept, so memory stays bounded for
+any session size. No network, fonts or external tools are needed.
+"""
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Dict, List, NamedTuple, Optional
+
+from PIL import Image
+
+from app.core.export_pipeline import ExportSink, _PendingFiles
+from app.core.renditions import flatten_for_jpeg
+from app.core.storage import SessionStore, compute_stats
+
+if TYPE_CHECKING:
+    from app.core.models import Entry
+
+# A4 portrait in points, and the printable box inside the margins
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 40
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+TITLE_SIZE, META_SIZE, NOTES_SIZE = 16, 9, 10
+LINE_GAP = 1.4
+
+# Standard 14 font metrics (1/1000 em) for printable ASCII; other characters use DEFAULT_GLYPH_WIDTH
+_HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+DEFAULT_GLYPH_WIDTH = 556
+FONTS = {"F1": ("Helvetica", _HELVETICA), "F2": ("Helvetica-Bold", _HELVETICA_BOLD)}
+
+
+class PdfImage(NamedTuple):
+    """JPEG data ready to embed as an image XObject"""
+    data: bytes
+    width: int
+    height: int
+    gray: bool
+
+
+def text_width(text: str, size: float, font: str = "F1") -> float:
+    """Rendered width of text in points"""
+    widths = FONTS[font][1]
+    total = 0
+    for ch in text:
+        code = ord(ch)
+        total += widths[code - 32] if 32 <= code < 127 else DEFAULT_GLYPH_WIDTH
+    return total * size / 1000
+
+
+def wrap_text(text: str, size: float, max_width: float, font: str = "F1") -> List[str]:
+    """Greedy word wrap; words longer than a line are broken by character"""
+    lines = []
+    for paragraph in text.replace("\r\n", "\n").replace("\t", "    ").split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if text_width(candidate, size, font) <= max_width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            while text_width(word, size, font) > max_width:
+                cut = len(word) - 1
+                while cut > 1 and text_width(word[:cut], size, font) > max_width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+    return lines
+
+
+def pdf_string(text: str) -> bytes:
+    """Literal string in WinAnsiEncoding; unsupported characters become '?'"""
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def prepare_pdf_image(path: Path, quality: int) -> Optional[PdfImage]:
+    """JPEG bytes for an image file, passing RGB/gray JPEGs through untouched
+
+    PdfSink reads from RenditionCache.jpeg_for, so conversions happen once
+    per image, width and quality rather than on every export.
+    """
+    if not path.exists():
+        return None
+    with Image.open(path) as img:
+        if img.format == "JPEG" and img.mode in ("RGB", "L"):
+            return PdfImage(path.read_bytes(), img.width, img.height, img.mode == "L")
+        img = flatten_for_jpeg(img)
+        buf = BytesIO()
+        img.save(buf, "JPEG", quality=quality)
+        return PdfImage(buf.getvalue(), img.width, img.height, img.mode == "L")
+
+
+class PdfWriter:
+    """Writes PDF objects as they are produced; the page tree is written last"""
+
+    def __init__(self, f: BinaryIO, title: str = ""):
+        self.f = f
+        self.offsets: Dict[int, int] = {}
+        self.page_ids: List[int] = []
+        self._next_id = 1
+        self.catalog_id = self.reserve()
+        self.pages_id = self.reserve()
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.write_object(self.catalog_id, b"<< /Type /Catalog /Pages %d 0 R >>" % self.pages_id)
+        self.font_ids = {
+            name: self.add_object(b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+                                  % base.encode("ascii"))
+            for name, (base, _) in FONTS.items()
+        }
+        self.info_id = self.add_object(b"<< /Title %s /Producer (Overlay Annotator) /CreationDate (D:%s) >>"
+                                       % (pdf_string(title), datetime.now().strftime("%Y%m%d%H%M%S").encode()))
+
+    def reserve(self) -> int:
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def write_object(self, obj_id: int, body: bytes) -> int:
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % obj_id)
+        self.f.write(body)
+        self.f.write(b"\nendobj\n")
+        return obj_id
+
+    def add_object(self, body: bytes) -> int:
+        return self.write_object(self.reserve(), body)
+
+    def add_stream(self, data: bytes, entries: bytes = b"") -> int:
+        obj_id = self.reserve()
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(b"%d 0 obj\n<< /Length %d %s>>\nstream\n" % (obj_id, len(data), entries))
+        self.f.write(data)
+        self.f.write(b"\nendstream\nendobj\n")
+        return obj_id
+
+    def add_image(self, image: PdfImage) -> int:
+        colors = b"/DeviceGray" if image.gray else b"/DeviceRGB"
+        return self.add_stream(image.data, b"/Type /XObject /Subtype /Image /Width %d /Height %d "
+                                           b"/ColorSpace %s /BitsPerComponent 8 /Filter /DCTDecode "
+                                           % (image.width, image.height, colors))
+
+    def add_page(self, content: bytes, images: Optional[Dict[str, int]] = None) -> int:
+        fonts = b" ".join(b"/%s %d 0 R" % (name.encode(), obj_id) for name, obj_id in self.font_ids.items())
+        xobjects = b""
+        if images:
+            xobjects = b" /XObject << %s >>" % b" ".join(
+                b"/%s %d 0 R" % (name.encode(), obj_id) for name, obj_id in images.items())
+        content_id = self.add_stream(content)
+        page_id = self.add_object(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << %s >>%s >> >>"
+            % (self.pages_id, PAGE_WIDTH, PAGE_HEIGHT, content_id, fonts, xobjects))
+        self.page_ids.append(page_id)
+        return page_id
+
+    def close(self) -> None:
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self.write_object(self.pages_id, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids)))
+        xref = self.f.tell()
+        size = self._next_id
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        for obj_id in range(1, size):
+            self.f.write(b"%010d 00000 n \n" % self.offsets[obj_id])
+        self.f.write(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                     % (size, self.catalog_id, self.info_id, xref))
+
+
+class _Page:
+    """Content stream for one page, filled top to bottom"""
+
+    def __init__(self):
+        self.ops: List[bytes] = []
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def room(self) -> float:
+        return self.y - MARGIN
+
+    def text(self, lines: List[str], size: float, font: str = "F1", gap: float = 0) -> None:
+        leading = size * LINE_GAP
+        for line in lines:
+            self.y -= leading
+            self.ops.append(b"BT /%s %g Tf %g %g Td %s Tj ET" % (font.encode(), size, MARGIN, self.y, pdf_string(line)))
+        self.y -= gap
+
+    def image(self, name: str, width: float, height: float, gap: float = 0) -> None:
+        self.y -= height
+        self.ops.append(b"q %g 0 0 %g %g %g cm /%s Do Q" % (width, height, MARGIN, self.y, name.encode()))
+        self.y -= gap
+
+    def content(self) -> bytes:
+        return b"\n".join(self.ops)
+
+
+class PdfSink(ExportSink):
+    """report.pdf: a cover page, then one page per entry (notes continue on extra pages)"""
+
+    _local_state = ExportSink._local_state + ("pdf",)
+
+    def __init__(self, store: SessionStore, out: Optional[Path] = None, max_width: Optional[int] = None,
+                 quality: Optional[int] = None):
+        self.store = store
+        self.out = Path(out) if out else store.root / "report.pdf"
+        self.max_width = store.export_max_width if max_width is None else max_width
+        self.quality = quality or store.export_quality
+        self._files = _PendingFiles()
+
+    def open(self, entries: List["Entry"]) -> None:
+        self.pdf = PdfWriter(self._files.open(self.out), title=self.store.root.name)
+        stats = compute_stats(entries)
+        cover = _Page()
+        cover.text(wrap_text(self.store.root.name, 24, CONTENT_WIDTH, "F2"), 24, "F2", gap=12)
+        cover.text([
+            "Overlay Annotator Report",
+            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"Total entries: {stats['total']}",
+            f"With notes: {stats['with_notes']}",
+            f"Average width: {stats['avg_width']}px",
+        ], 12)
+        self.pdf.add_page(cover.content())
+
+    def prepare(self, entry: "Entry"):
+        """Image bytes for one entry (pool worker)"""
+        source = self.store.export_rendition(entry, self.max_width)
+        if source.exists():
+            source = self.store.renditions.jpeg_for(source, self.store.asset_id(entry), self.max_width or 0,
+                                                    self.quality)
+        return entry, prepare_pdf_image(source, self.quality)
+
+    def write(self, prepared) -> None:
+        entry, image = prepared
+        page = _Page()
+        page.text(wrap_text(entry.title, TITLE_SIZE, CONTENT_WIDTH, "F2"), TITLE_SIZE, "F2", gap=2)
+        page.text([f"{entry.timestamp[:19].replace('T', ' ')}   {entry.image.width} x {entry.image.height}   "
+                   f"ID: {entry.id}"], META_SIZE, gap=10)
+
+        images = None
+        if image is not None:
+            # Fit the width, leaving at least a few lines for notes below
+            scale = min(1.0, CONTENT_WIDTH / image.width, max(page.room() - 80, 120) / image.height)
+            images = {"Im1": self.pdf.add_image(image)}
+            page.image("Im1", image.width * scale, image.height * scale, gap=14)
+        else:
+            page.text(["Image not found"], NOTES_SIZE, gap=14)
+
+        lines = wrap_text(entry.notes, NOTES_SIZE, CONTENT_WIDTH) if entry.notes else ["No notes provided"]
+        leading = NOTES_SIZE * LINE_GAP
+        while lines:
+            fit = max(1, int(page.room() // leading))
+            page.text(lines[:fit], NOTES_SIZE)
+            lines = lines[fit:]
+            self.pdf.add_page(page.content(), images)
+            images = None
+            if lines:
+                page = _Page()
+                page.text(wrap_text(f"{entry.title} (continued)", META_SIZE, CONTENT_WIDTH, "F2"), META_SIZE,
+                          "F2", gap=6)
+
+    def close(self) -> Path:
+        self.pdf.close()
+        self._files.commit()
+        return self.out
+
+    def abort(self) -> None:
+        self._files.discard()
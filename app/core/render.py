@@ -0,0 +1,168 @@
+"""
+Headless annotation rendering
+Burns boxes, arrows, pen strokes, text labels and redactions into an image
+with PIL only, so the editor (AnnotationCanvas.render_annotated) and batch
+jobs without a GUI produce identical output.
+"""
+from functools import lru_cache
+import logging
+from pathlib import Path
+from typing import Iterable, List, Literal, Optional, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from pydantic import BaseModel
+
+from app.core.models import Entry, ImageModel
+from app.core.parallel import ordered_map
+from app.core.storage import ProgressCallback, SessionStore
+
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.Render')
+
+BLUR_RADIUS = 15
+FONT_CANDIDATES = ("arial.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+TEXT_BACKGROUND = (255, 255, 255, 220)
+REDACT_COLOR = (0, 0, 0)
+
+ShapeKind = Literal["box", "arrow", "pen", "text", "blur", "redact"]
+
+
+class Shape(BaseModel):
+    """Single annotation in source coordinates (x1/y1 is the text anchor)"""
+    kind: ShapeKind
+    x1: int
+    y1: int
+    x2: Optional[int] = None
+    y2: Optional[int] = None
+    color: Tuple[int, int, int] = (255, 0, 0)
+    width: int = 3
+    text: Optional[str] = None
+
+
+class RenderJob(BaseModel):
+    """One batch item: source image, its annotations and the entry to create"""
+    image: str
+    shapes: List[Shape] = []
+    title: str = "Untitled"
+    notes: str = ""
+    layout: str = "image-left"
+
+
+def render_annotations(image: Image.Image, shapes: Iterable[Shape],
+                       scale_x: float = 1.0, scale_y: float = 1.0) -> Image.Image:
+    """Copy of image with shapes burned in, in order
+
+    Shape coordinates are multiplied by scale_x/scale_y (the editor passes
+    widget coordinates; headless callers use image coordinates and 1.0).
+    Line widths, arrowheads and text grow with the scale so annotations stay
+    legible on large captures.
+    """
+    output = image.convert("RGBA") if image.mode != "RGBA" else image.copy()
+    draw = ImageDraw.Draw(output)
+    min_width = max(3, int(3 * scale_x))  # At least 3px, scaled up for large images
+
+    for shape in shapes:
+        x1 = int(shape.x1 * scale_x)
+        y1 = int(shape.y1 * scale_y)
+
+        if shape.kind == "text":
+            if not shape.text:
+                continue
+            font = _load_font(max(24, int(32 * scale_y)))
+            draw.rectangle(draw.textbbox((x1, y1), shape.text, font=font), fill=TEXT_BACKGROUND)
+            draw.text((x1, y1), shape.text, fill=tuple(shape.color), font=font)
+            continue
+
+        if shape.x2 is None or shape.y2 is None:
+            continue
+        x2 = int(shape.x2 * scale_x)
+        y2 = int(shape.y2 * scale_y)
+        # Normalized box for rectangles and regions (PIL needs x1 <= x2, y1 <= y2)
+        box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        color = tuple(shape.color)
+        width = max(min_width, int(shape.width * max(scale_x, scale_y)))
+
+        if shape.kind == "box":
+            draw.rectangle(box, outline=color, width=width)
+        elif shape.kind == "blur":
+            if box[2] > box[0] and box[3] > box[1]:
+                region = output.crop(box).filter(ImageFilter.GaussianBlur(radius=BLUR_RADIUS))
+                output.paste(region, box[:2])
+        elif shape.kind == "redact":
+            draw.rectangle(box, fill=REDACT_COLOR)
+        else:
+            # Lines keep their direction so the arrowhead lands on the end point
+            draw.line((x1, y1, x2, y2), fill=color, width=width)
+            if shape.kind == "arrow":
+                _draw_arrowhead(draw, (x1, y1, x2, y2), color, max(20, int(30 * scale_x)))
+
+    return output
+
+
+def render_file(path: Union[str, Path], shapes: Iterable[Shape]) -> Image.Image:
+    """Load an image file and render shapes given in image coordinates"""
+    with Image.open(path) as img:
+        img.load()
+        return render_annotations(img, shapes)
+
+
+def render_batch(store: SessionStore, jobs: Iterable[Union[RenderJob, dict]],
+                 workers: Optional[int] = None, progress: Optional[ProgressCallback] = None) -> List[Entry]:
+    """Render jobs on a process pool and save each result as a session entry
+
+    Workers decode, render, encode and write the content-addressed image
+    (safe across processes); entries and the manifest are written here, in
+    job order.
+    """
+    jobs = [job if isinstance(job, RenderJob) else RenderJob(**job) for job in jobs]
+    tasks = [(str(store.root), store.codec, job) for job in jobs]
+    entries: List[Entry] = []
+    for i, (job, image) in enumerate(zip(jobs, ordered_map(_render_task, tasks, workers, executor="process"))):
+        entry = Entry.new(title=job.title, notes=job.notes, layout=job.layout, image=ImageModel(**image))
+        store.save_entry(entry)
+        entries.append(entry)
+        if progress:
+            progress(i + 1, len(jobs))
+    logger.info(f"Rendered {len(entries)} annotated entries into {store.root}")
+    return entries
+
+
+def _render_task(task) -> dict:
+    """Render one job and store its image (process pool worker)"""
+    root, codec, job = task
+    store = _worker_store(root, codec)
+    pil = render_file(job.image, job.shapes)
+    rel = store.save_image(pil)
+    return {"path": rel.as_posix(), "width": pil.width, "height": pil.height, "sha256": store.image_hash(rel)}
+
+
+@lru_cache(maxsize=4)
+def _worker_store(root: str, codec: str) -> SessionStore:
+    """Store reused across the jobs a worker process handles"""
+    return SessionStore(Path(root), codec=codec)
+
+
+@lru_cache(maxsize=16)
+def _load_font(size: int) -> ImageFont.ImageFont:
+    """First available TrueType font at size, else PIL's small default"""
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _draw_arrowhead(draw: ImageDraw.ImageDraw, line, color, size: int) -> None:
+    x1, y1, x2, y2 = line
+    dx = x2 - x1
+    dy = y2 - y1
+    length = (dx ** 2 + dy ** 2) ** 0.5
+    if length <= 0:
+        return
+    dx, dy = dx / length, dy / length
+    draw.polygon([
+        (x2, y2),
+        (int(x2 - size * (dx + dy * 0.5)), int(y2 - size * (dy - dx * 0.5))),
+        (int(x2 - size * (dx - dy * 0.5)), int(y2 - size * (dy + dx * 0.5))),
+    ], fill=color)
@@ -0,0 +1,107 @@
+"""
+Downscaled image renditions for exports
+Renditions are cached under <session>/_cache/renditions keyed by the source
+image hash and the rendition parameters, so every export (embedded, linked,
+repeated) encodes each size of each image once
+"""
+from pathlib import Path
+import os
+import shutil
+import threading
+from typing import Optional
+from PIL import Image
+
+from app.core.codecs import get_codec
+
+# Reports display images at most this wide (.container max-width in report.html.j2)
+WEB_WIDTH = 1400
+THUMB_WIDTH = 400
+RENDITION_QUALITY = 82
+
+
+class RenditionCache:
+    """Downscaled copies of stored images under <session>/_cache/renditions/"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+
+    def path_for(self, source_hash: str, max_width: int, quality: int = RENDITION_QUALITY) -> Path:
+        ext = get_codec("webp").extension
+        return self.cache_dir / source_hash[:2] / f"{source_hash}_w{max_width}_q{quality}{ext}"
+
+    def get_or_create(self, source: Path, source_hash: str, max_width: int,
+                      quality: int = RENDITION_QUALITY, width: Optional[int] = None) -> Path:
+        """Path of source scaled to at most max_width, or source itself if already narrower
+
+        width is the known source width (skips opening images that need no
+        downscale). Safe to call from worker threads.
+        """
+        if width is not None and width <= max_width:
+            return Path(source)
+        target = self.path_for(source_hash, max_width, quality)
+        if target.exists():
+            return target
+        with Image.open(source) as img:
+            if img.width <= max_width:
+                return Path(source)
+            return write_rendition(img, target, max_width, quality)
+
+
+    def jpeg_for(self, source: Path, source_hash: str, max_width: int, quality: int = RENDITION_QUALITY) -> Path:
+        """source as an RGB or grayscale JPEG (for PDF embedding)
+
+        JPEGs that already qualify are returned as they are; anything else
+        is converted once and cached, keyed like renditions (max_width 0 =
+        full size). Safe to call from worker threads.
+        """
+        target = self.cache_dir / source_hash[:2] / f"{source_hash}_w{max_width}_q{quality}.jpg"
+        if target.exists():
+            return target
+        with Image.open(source) as img:
+            if img.format == "JPEG" and img.mode in ("RGB", "L"):
+                return Path(source)
+            flat = flatten_for_jpeg(img)
+        _atomic_save(target, lambda tmp: flat.save(tmp, "JPEG", quality=quality))
+        return target
+
+
+def flatten_for_jpeg(img: Image.Image) -> Image.Image:
+    """RGB or L copy of img, with transparency flattened onto white (the page background)"""
+    if img.mode in ("RGBA", "LA", "P"):
+        rgba = img.convert("RGBA")
+        flat = Image.new("RGB", rgba.size, "white")
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        return flat
+    return img.convert("RGB") if img.mode != "L" else img.copy()
+
+
+def write_rendition(img: Image.Image, target: Path, max_width: int, quality: int = RENDITION_QUALITY) -> Path:
+    """Write a WebP (or JPEG fallback) copy of img at most max_width wide"""
+    codec = get_codec("webp")
+    img = img.convert("RGB")
+    img.thumbnail((max_width, img.height), Image.Resampling.LANCZOS)
+    options = dict(codec.options, quality=quality)
+    _atomic_save(target, lambda tmp: img.save(tmp, codec.format, **options))
+    return target
+
+
+def link_or_copy(source: Path, target: Path) -> Path:
+    """Hard-link an immutable stored image into an export, copying if linking fails"""
+    def place(tmp):
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copyfile(source, tmp)
+    _atomic_save(target, place)
+    return target
+
+
+def _atomic_save(target: Path, write) -> None:
+    target.parent.mkdir(exist_ok=True, parents=True)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
@@ -0,0 +1,97 @@
+"""
+Entry (de)serialization backends
+orjson (for writing) when installed, pydantic's native JSON path otherwise,
+and the stdlib json module as a last resort (pydantic v1)
+"""
+from functools import lru_cache
+import json
+from typing import TYPE_CHECKING, Any, Dict
+
+if TYPE_CHECKING:
+    from app.core.models import Entry
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+BACKENDS = ("orjson", "pydantic", "json")
+
+
+@lru_cache(maxsize=None)
+def pydantic_json_available() -> bool:
+    """pydantic v2 native JSON support
+
+    Looks for pydantic-core (the v2 engine) without importing pydantic, so
+    opening a store does not pay for the models until an entry is loaded.
+    """
+    from importlib.util import find_spec
+    return find_spec("pydantic_core") is not None
+
+
+def default_backend() -> str:
+    """Fastest backend available in this environment"""
+    if ORJSON_AVAILABLE and pydantic_json_available():
+        return "orjson"
+    if pydantic_json_available():
+        return "pydantic"
+    return "json"
+
+
+def resolve_backend(backend: str = None) -> str:
+    """Validate a backend name, falling back when its library is missing"""
+    if backend is None or backend == "auto":
+        return default_backend()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {backend!r} (expected one of {BACKENDS})")
+    if backend == "orjson" and not (ORJSON_AVAILABLE and pydantic_json_available()):
+        return default_backend()
+    if backend == "pydantic" and not pydantic_json_available():
+        return "json"
+    return backend
+
+
+def _entry_dict(entry: "Entry") -> Dict[str, Any]:
+    try:
+        return entry.model_dump()
+    except AttributeError:
+        return entry.dict()
+
+
+def dump_entry(entry: "Entry", backend: str = "json", pretty: bool = True) -> bytes:
+    """Serialize an entry to UTF-8 JSON bytes"""
+    if backend == "orjson":
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        return orjson.dumps(entry.model_dump(mode="json"), option=option)
+    if backend == "pydantic":
+        return entry.model_dump_json(indent=2 if pretty else None).encode("utf-8")
+    if pretty:
+        return json.dumps(_entry_dict(entry), indent=2).encode("utf-8")
+    return json.dumps(_entry_dict(entry), separators=(",", ":")).encode("utf-8")
+
+
+def load_entry(data: bytes, backend: str = "json") -> "Entry":
+    """Parse and validate an entry from JSON bytes"""
+    from app.core.models import Entry
+    if backend in ("orjson", "pydantic"):
+        # pydantic-core parses and validates in one native pass; it matches
+        # orjson.loads + model_validate in bench_serialization.py without
+        # building an intermediate dict
+        return Entry.model_validate_json(data)
+    return Entry(**json.loads(data))
+
+
+def dumps(obj: Any, backend: str = "json") -> str:
+    """Compact JSON for plain data (manifest rows, feeds)"""
+    if backend == "orjson":
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data, backend: str = "json") -> Any:
+    """Parse plain JSON data"""
+    if backend == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
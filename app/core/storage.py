@@ -1,129 +1,590 @@
 
 from pathlib import Path
+import base64
+import hashlib
 import json
+import logging
+import os
+import re
+import threading
 from datetime import datetime
-from typing import List
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Tuple
 from PIL import Image
-from jinja2 import Environment, FileSystemLoader
-from app.core.models import Entry
+from markupsafe import Markup
+from app.core.codecs import MIME_BY_EXTENSION, codec_names, get_codec, mime_for_path, resolve_codec
+from app.core.thumbnails import ThumbnailCache
+from app.core.manifest import MANIFEST_NAME, SessionManifest, manifest_row
+from app.core.serialization import dump_entry, load_entry, loads, resolve_backend
+from app.core.fragments import FragmentCache
+from app.core.metrics import span, timed
+from app.core.templates import (
+    TEMPLATE_MARKER, TEMPLATE_NAMES, TEMPLATE_VERSION, default_templates, is_stock_template, template_version
+)
+from app.core.renditions import RENDITION_QUALITY, THUMB_WIDTH, WEB_WIDTH, RenditionCache, link_or_copy
 
-DEFAULT_REPORT_MD_J2 = '''# Overlay Annotator Session
+if TYPE_CHECKING:
+    # pydantic is imported when the first entry is loaded, not with the store
+    from app.core.models import Entry
 
-{% for e in entries %}
-## {{ e.title }}
-Captured: {{ e.timestamp }}
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.Storage')
 
-| Screenshot | Notes |
-|---|---|
-| ![{{ e.title }}]({{ e.image.path }}) | {{ e.notes }} |
+DEFAULT_CODEC = "jpeg"
+
+# Content-addressed image names are the SHA-256 of the encoded bytes
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Raw bytes per base64 chunk when streaming images (multiple of 3, no padding mid-image)
+B64_CHUNK_BYTES = 3 * 16 * 1024
+
+# HTML export modes: images inlined as data URIs, or files under assets/
+EXPORT_MODES = ("embedded", "linked")
+
+# Export progress callback: (entries done, total entries)
+ProgressCallback = Callable[[int, int], None]
+
+
+class PreparedImage(NamedTuple):
+    """Export-ready image: MIME type plus base64 text in chunks"""
+    mime: str
+    chunks: List[Markup]
 
-{% endfor %}
-'''
 
 class SessionStore:
-    def __init__(self, session_root: Path):
+    def __init__(self, session_root: Path, codec: str = None, json_backend: str = None,
+                 pretty_json: bool = True, export_max_width: Optional[int] = None,
+                 export_quality: Optional[int] = None):
         self.root = Path(session_root)
         self.images = self.root / "images"
         self.meta = self.root / "metadata"
+        self.settings_path = self.root / "session.json"
+        self.manifest = SessionManifest(self.root / MANIFEST_NAME)
+        # Entry metadata serializer (orjson / pydantic / json) and file layout
+        self.json_backend = resolve_backend(json_backend)
+        self.pretty_json = pretty_json
+        self.cache_dir = self.root / "_cache"
+        self.thumbnails = ThumbnailCache(self.cache_dir / "thumbnails")
+        self.renditions = RenditionCache(self.cache_dir / "renditions")
         self.tpl_dir = self.root / "_templates"
         self.tpl_dir.mkdir(exist_ok=True)
+        # Serialises image writes and unlinks with entry saves and deletes (this process)
+        self._lock = threading.RLock()
+        # Stored image paths whose entry has not been saved yet, so deletes leave them alone
+        self._unsaved: Dict[str, int] = {}
         
-        # Create default Markdown template
-        default_md_tpl = self.tpl_dir / "report.md.j2"
-        if not default_md_tpl.exists():
-            default_md_tpl.write_text(DEFAULT_REPORT_MD_J2, encoding="utf-8")
+        # Image codec preset: explicit argument wins, then the saved session setting
+        self.codec = DEFAULT_CODEC
+        if codec is not None:
+            self.set_codec(codec)
+        else:
+            self.codec = self.load_settings().get("codec", DEFAULT_CODEC)
         
-        # Create default HTML template
-        default_html_tpl = self.tpl_dir / "report.html.j2"
-        if not default_html_tpl.exists():
-            # Copy from package templates
-            from pathlib import Path as P
-            pkg_template = P(__file__).parent / "_templates" / "report.html.j2"
-            if pkg_template.exists():
-                default_html_tpl.write_text(pkg_template.read_text(encoding="utf-8"), encoding="utf-8")
-            else:
-                # Fallback: create minimal HTML template
-                default_html_tpl.write_text(self._get_default_html_template(), encoding="utf-8")
+        # Export rendition size/quality: same precedence as the codec
+        settings = self.load_settings()
+        self.export_max_width = settings.get("export_max_width", WEB_WIDTH)
+        self.export_quality = settings.get("export_quality", RENDITION_QUALITY)
+        if export_max_width is not None or export_quality is not None:
+            self.set_export_renditions(export_max_width, export_quality)
+        
+        # Templates resolve session overrides first, then the package defaults.
+        # Retire stock copies made for an older template context so they stop
+        # overriding; edited copies are the user's and stay
+        for name in TEMPLATE_NAMES:
+            tpl_path = self.tpl_dir / name
+            if tpl_path.exists():
+                source = tpl_path.read_text(encoding="utf-8")
+                if TEMPLATE_MARKER in source:
+                    continue
+                if is_stock_template(source):
+                    self._retire_template(tpl_path, template_version(source))
+                else:
+                    logger.warning(f"{tpl_path} was written for template v{template_version(source)} "
+                                   f"(current: v{TEMPLATE_VERSION}) and still overrides the default; "
+                                   f"update it or delete it to use the new one")
+        
+        self.fragments = FragmentCache(self.cache_dir / "fragments")
+
+    def __getstate__(self):
+        # Export worker processes get a copy; the lock and unsaved images belong to this process
+        state = self.__dict__.copy()
+        del state["_lock"], state["_unsaved"]
+        return state
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._unsaved = {}
+
+    def _retire_template(self, tpl_path: Path, version: int) -> Path:
+        """Move an outdated template copy to <name>.v<version>.bak, never over an earlier backup"""
+        backup = tpl_path.with_name(f"{tpl_path.name}.v{version}.bak")
+        n = 1
+        while backup.exists():
+            backup = tpl_path.with_name(f"{tpl_path.name}.v{version}.{n}.bak")
+            n += 1
+        os.replace(tpl_path, backup)
+        return backup
+
+    def customize_templates(self) -> List[Path]:
+        """Copy the default templates into _templates/ for editing (existing copies are kept)"""
+        written = []
+        for name, source in default_templates().items():
+            tpl_path = self.tpl_dir / name
+            if not tpl_path.exists():
+                tpl_path.write_text(source, encoding="utf-8")
+                written.append(tpl_path)
+        return written
+
+    def load_settings(self) -> dict:
+        """Read per-session settings (codec preset, ...)"""
+        if not self.settings_path.exists():
+            return {}
+        with open(self.settings_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def set_codec(self, codec: str) -> None:
+        """Select the image codec preset for this session and persist it"""
+        if codec not in codec_names():
+            raise ValueError(f"Unknown image codec: {codec!r} (expected one of {codec_names()})")
+        self.codec = codec
+        self._update_settings(codec=codec)
+
+    def set_export_renditions(self, max_width: Optional[int] = None, quality: Optional[int] = None) -> None:
+        """Set the max width (0 = full size) and quality of exported images and persist them"""
+        if max_width is not None:
+            if max_width < 0:
+                raise ValueError(f"Export max width must be >= 0, got {max_width}")
+            self.export_max_width = max_width
+        if quality is not None:
+            if not 1 <= quality <= 100:
+                raise ValueError(f"Export quality must be between 1 and 100, got {quality}")
+            self.export_quality = quality
+        self._update_settings(export_max_width=self.export_max_width, export_quality=self.export_quality)
+
+    def _update_settings(self, **values) -> None:
+        """Merge values into session.json, skipping the write when nothing changed"""
+        settings = self.load_settings()
+        if all(settings.get(k) == v for k, v in values.items()):
+            return
+        settings.update(values)
+        self.root.mkdir(exist_ok=True, parents=True)
+        with open(self.settings_path, "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=2)
+
+    @timed("store.save_image")
     def save_image(self, pil: Image.Image) -> Path:
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        path = self.images / f"entry_{ts}.jpg"
-        self.images.mkdir(exist_ok=True, parents=True)
-        pil.convert("RGB").save(path, "JPEG", quality=95, optimize=True, progressive=True)
-        return path.relative_to(self.root)
+        """Encode and store an image under its content hash
+
+        Files live at images/<first two hex digits>/<sha256><ext> and are
+        written once: saving identical content again reuses the existing
+        file, so stored images never change and can be cached forever.
+        """
+        return self.store_image_bytes(*self.encode_image(pil))
+
+    def encode_image(self, pil: Image.Image) -> Tuple[bytes, str]:
+        """Encoded bytes and file extension with the session codec, without storing them"""
+        codec = resolve_codec(self.codec, pil)
+        with span("store.encode"):
+            return codec.encode(pil), codec.extension
+
+    def import_image(self, source: Path) -> Path:
+        """Store an already-encoded JPEG, PNG or WebP file as is, under its content hash"""
+        source = Path(source)
+        ext = source.suffix.lower()
+        if ext not in MIME_BY_EXTENSION:
+            raise ValueError(f"Cannot store {source.name} without re-encoding")
+        return self.store_image_bytes(source.read_bytes(), ".jpg" if ext == ".jpeg" else ext)
 
-    def save_entry(self, entry: Entry) -> None:
+    def store_image_bytes(self, data: bytes, extension: str) -> Path:
+        """Write encoded image bytes once at images/<ab>/<sha256><ext>
+
+        The image counts as referenced until save_entry() saves an entry
+        for it or release_image() gives it up.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.images / digest[:2] / f"{digest}{extension}"
+        rel = path.relative_to(self.root)
+        # Unique per thread: ingestion workers may store the same bytes at once
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True, parents=True)
+            tmp.write_bytes(data)
+        with self._lock:
+            if tmp.exists():
+                os.replace(tmp, path)
+            elif not path.exists():
+                # Deleted since the check above: write it again under the lock
+                path.parent.mkdir(exist_ok=True, parents=True)
+                path.write_bytes(data)
+            key = rel.as_posix()
+            self._unsaved[key] = self._unsaved.get(key, 0) + 1
+        return rel
+
+    def release_image(self, image_path) -> bool:
+        """Give up a stored image whose entry will not be saved
+
+        The file is removed if no entry references it; returns whether it was.
+        """
+        key = Path(image_path).as_posix()
+        with self._lock:
+            self._forget_unsaved(key)
+            return self._unlink_unreferenced(key)
+
+    def _forget_unsaved(self, key: str) -> None:
+        count = self._unsaved.get(key, 0)
+        if count > 1:
+            self._unsaved[key] = count - 1
+        else:
+            self._unsaved.pop(key, None)
+
+    def _unlink_unreferenced(self, key: str) -> bool:
+        """Remove an image nothing references any more (caller holds the lock)"""
+        if key in self._unsaved or self.image_refcounts().get(key, 0):
+            return False
+        img = self.root / key
+        if not img.exists():
+            return False
+        img.unlink()
+        return True
+
+    def image_hash(self, image_path) -> Optional[str]:
+        """Content hash of a stored image, hashing the file for legacy names"""
+        rel = Path(image_path)
+        if _HASH_RE.match(rel.stem):
+            return rel.stem
+        full = self.root / rel
+        if not full.exists():
+            return None
+        return file_sha256(full)
+
+    def image_refcounts(self) -> Dict[str, int]:
+        """Number of entries referencing each stored image path (from the manifest rows)"""
+        counts: Dict[str, int] = {}
+        for row in self.ensure_manifest().rows().values():
+            key = Path(row["image"]).as_posix()
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def delete_entry(self, entry_id: str) -> bool:
+        """Delete an entry, removing its image once nothing references it"""
+        path = self.meta / f"{entry_id}.json"
+        with self._lock:
+            if not path.exists():
+                return False
+            image_path = Path(loads(path.read_bytes(), self.json_backend)["image"]["path"]).as_posix()
+            path.unlink()
+            if self.manifest.exists():
+                self.manifest.append_tombstone(entry_id)
+            self._unlink_unreferenced(image_path)
+        return True
+
+    def collect_garbage(self) -> List[Path]:
+        """Remove content-addressed images no entry references"""
+        removed: List[Path] = []
+        with self._lock:
+            referenced = set(self.image_refcounts()) | set(self._unsaved)
+            for img in self.images.glob("??/*"):
+                rel = img.relative_to(self.root).as_posix()
+                if _HASH_RE.match(img.stem) and rel not in referenced:
+                    img.unlink()
+                    removed.append(img)
+        return removed
+
+    @timed("store.save_entry")
+    def save_entry(self, entry: "Entry") -> None:
         self.meta.mkdir(exist_ok=True, parents=True)
         path = self.meta / f"{entry.id}.json"
-        try:
-            data = entry.model_dump()
-        except AttributeError:
-            data = entry.dict()
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-
-    def load_entries(self) -> List[Entry]:
-        out: List[Entry] = []
+        data = dump_entry(entry, self.json_backend, self.pretty_json)
+        with self._lock:
+            path.write_bytes(data)
+            if self.manifest.exists():
+                self.manifest.append(manifest_row(entry))
+            else:
+                # First save in a session from an older version: index everything
+                self.reindex()
+            # Referenced by a saved entry now, which protects it from here on
+            self._forget_unsaved(Path(entry.image.path).as_posix())
+
+    def load_entry(self, entry_id: str) -> Optional["Entry"]:
+        """Load a single entry by id"""
+        path = self.meta / f"{entry_id}.json"
+        if not path.exists():
+            return None
+        return load_entry(path.read_bytes(), self.json_backend)
+
+    def load_entries(self) -> List["Entry"]:
+        """All entries, oldest first (the order every export uses)"""
+        out: List["Entry"] = []
         for p in sorted(self.meta.glob("*.json")):
-            with open(p, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                out.append(Entry(**data))
+            out.append(load_entry(p.read_bytes(), self.json_backend))
+        out.sort(key=lambda e: timestamp_order(e.timestamp))
         return out
 
-    def export_markdown(self) -> Path:
-        entries = self.load_entries()
-        env = Environment(loader=FileSystemLoader(str(self.tpl_dir)), autoescape=False)
-        tpl = env.get_template("report.md.j2")
-        md = tpl.render(entries=entries)
-        out = self.root / "report.md"
-        out.write_text(md, encoding="utf-8")
+    def load_entry_data(self) -> List[dict]:
+        """Entry metadata as plain dicts, without model validation (load_entries() order)"""
+        out = [loads(p.read_bytes(), self.json_backend) for p in sorted(self.meta.glob("*.json"))]
+        out.sort(key=lambda d: timestamp_order(d.get("timestamp")))
         return out
-    def export_html(self) -> Path:
-        """Export session as HTML with embedded base64 images"""
-        import base64
-        from datetime import datetime
-        
+
+    def load_entries_since(self, since) -> List["Entry"]:
+        """Entries with a timestamp after since (datetime or ISO string), oldest first
+
+        Candidates are picked from the manifest, so only matching entries
+        are read from disk. Entries whose timestamp does not parse are skipped.
+        """
+        cutoff = parse_timestamp(since)
+        entries = []
+        for row in sorted(self.ensure_manifest().rows().values(), key=lambda r: timestamp_order(r["timestamp"])):
+            try:
+                if parse_timestamp(row["timestamp"]) <= cutoff:
+                    continue
+            except ValueError:
+                logger.warning(f"Skipping entry {row['id']}: invalid timestamp {row['timestamp']!r}")
+                continue
+            entry = self.load_entry(row["id"])
+            if entry is not None:
+                entries.append(entry)
+        return entries
+
+    def reindex(self) -> int:
+        """Rebuild manifest.jsonl from metadata/*.json, oldest entry first"""
         entries = self.load_entries()
+        self.root.mkdir(exist_ok=True, parents=True)
+        self.manifest.rewrite(manifest_row(e) for e in entries)
+        return len(entries)
+
+    def ensure_manifest(self) -> SessionManifest:
+        """Session manifest, built from metadata on first use"""
+        if not self.manifest.exists():
+            self.reindex()
+        return self.manifest
+
+    @timed("store.export_markdown")
+    def export_markdown(self, progress: Optional[ProgressCallback] = None,
+                        workers: Optional[int] = None) -> Path:
+        """Export session as Markdown, reusing cached entry fragments"""
+        from app.core.export_pipeline import MarkdownSink, run_export
+        return run_export(self, [MarkdownSink(self)], progress=progress, workers=workers)[0]
+
+    @timed("store.export_html")
+    def export_html(self, progress: Optional[ProgressCallback] = None, workers: Optional[int] = None,
+                    max_width: Optional[int] = None, mode: str = "embedded",
+                    page_size: Optional[int] = None) -> Path:
+        """Export session as HTML with embedded base64 images, or linked assets
+
+        Images wider than max_width (default: the session's export_max_width,
+        0 = full size) are replaced by cached renditions from _cache/renditions.
+        mode="linked" writes images next to report.html under assets/ instead:
+        the full-size file plus web-size and thumbnail downscales, named by
+        content hash and written once, referenced through srcset with lazy
+        loading so the report opens without decoding every image.
+
+        With page_size, entries go to report-0001.html, report-0002.html, ...
+        (page_size entries each, with prev/next links) and report.html becomes
+        an index of the pages, so no single file grows with the session.
+
+        Each entry is rendered to a cached fragment keyed by its JSON, image
+        content, entry template and export options; re-exports only render
+        entries that changed and stitch the rest from disk. Rendering (image
+        read, rendition lookup, base64) runs on a worker pool (processes for
+        large sessions) a few entries ahead of the writer and results are written in order,
+        so memory stays bounded regardless of session size. workers=1 keeps
+        everything on the calling thread.
+        """
+        from app.core.export_pipeline import HtmlSink, run_export
+        sink = HtmlSink(self, max_width=max_width, mode=mode, page_size=page_size)
+        return run_export(self, [sink], progress=progress, workers=workers)[0]
+
+    @timed("store.export_json")
+    def export_json(self, progress: Optional[ProgressCallback] = None,
+                    workers: Optional[int] = None) -> Path:
+        """Export session header, stats and all entries as report.json"""
+        from app.core.export_pipeline import JsonSink, run_export
+        return run_export(self, [JsonSink(self)], progress=progress, workers=workers)[0]
+
+    @timed("store.export_ndjson")
+    def export_ndjson(self, out: Optional[Path] = None, since=None, image: str = "path",
+                      with_hash: bool = True, progress: Optional[ProgressCallback] = None,
+                      workers: Optional[int] = None) -> Path:
+        """Stream entries as NDJSON (one object per line, oldest first)
+
+        since limits the export to entries saved after a datetime or ISO
+        timestamp, so scheduled jobs can export only what is new. image is
+        "path", "inline" (base64 in image.data) or "none". Written to
+        entries.ndjson unless out is given.
+        """
+        from app.core.export_pipeline import NdjsonSink, run_export
+        sink = NdjsonSink(self, out, image=image, with_hash=with_hash)
+        return run_export(self, [sink], progress=progress, workers=workers,
+                          entries=self.load_entries_since(since) if since is not None else None)[0]
+
+    @timed("store.export_pdf")
+    def export_pdf(self, progress: Optional[ProgressCallback] = None, workers: Optional[int] = None,
+                   max_width: Optional[int] = None) -> Path:
+        """Export session as report.pdf, written page by page
+
+        Images use the same cached renditions as HTML exports (max_width
+        defaults to the session's export_max_width) and are embedded as JPEG.
+        """
+        from app.core.pdf_export import PdfSink
+        from app.core.export_pipeline import run_export
+        return run_export(self, [PdfSink(self, max_width=max_width)], progress=progress, workers=workers)[0]
+
+    def entry_fragment(self, kind: str, cache_kind: str, entry_tpl, tpl_key: str,
+                        max_width: Optional[int], mode: str, entry: "Entry"):
+        """Cached fragment for one entry, rendering it on a miss (pool worker)"""
+        # Linked assets are checked even on a fragment hit: the assets/ folder
+        # may have been deleted or copied elsewhere without it
+        assets = self._export_assets(entry, max_width) if mode == "linked" else None
+        key = FragmentCache.key(tpl_key, dump_entry(entry, "json", pretty=False), self._image_key(entry))
+        cached = self.fragments.get(cache_kind, key)
+        if cached is not None:
+            return key, cached
         
-        # Convert entries to dicts and add base64 images
-        entries_with_images = []
-        for entry in entries:
-            # Convert to dict
-            entry_dict = entry.model_dump()
-            
-            # Add base64 image
-            img_path = self.root / entry.image.path
-            if img_path.exists():
-                with open(img_path, 'rb') as f:
-                    img_data = f.read()
-                    entry_dict['image_base64'] = base64.b64encode(img_data).decode('utf-8')
-            else:
-                entry_dict['image_base64'] = None
-            
-            entries_with_images.append(entry_dict)
+        entry_dict = entry.model_dump()
+        if mode == "linked":
+            entry_dict['assets'] = assets
+            entry_dict['has_image'] = assets is not None
+        elif kind == "html":
+            image = prepare_export_image(str(self.export_rendition(entry, max_width)))
+            entry_dict['has_image'] = image is not None
+            entry_dict['image_mime'] = image.mime if image else None
+            entry_dict['image_chunks'] = image.chunks if image else ()
+        return key, self.fragments.put(cache_kind, key, entry_tpl.render(entry=entry_dict))
+
+    def asset_id(self, entry: "Entry") -> str:
+        """File name stem for an entry's image under assets/"""
+        image_key = self._image_key(entry)
+        return image_key if _HASH_RE.match(image_key) else FragmentCache.key(image_key)
+
+    def _export_assets(self, entry: "Entry", max_width: Optional[int] = None) -> Optional[dict]:
+        """Write (once) the full, web and thumbnail files for a linked export"""
+        source = self.root / entry.image.path
+        if not source.exists():
+            return None
+        asset_id = self.asset_id(entry)
+        assets_dir = self.root / "assets"
+        full = assets_dir / f"{asset_id}{source.suffix.lower()}"
+        if not full.exists():
+            link_or_copy(source, full)
         
-        env = Environment(loader=FileSystemLoader(str(self.tpl_dir)), autoescape=True)
-        tpl = env.get_template("report.html.j2")
-        html = tpl.render(
-            entries=entries_with_images,
-            session_name=self.root.name,
-            export_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        )
-        out = self.root / "report.html"
-        out.write_text(html, encoding="utf-8")
-        return out
-    
-    def _get_default_html_template(self) -> str:
-        """Fallback HTML template if package template not found"""
-        return '''<!DOCTYPE html>
-<html><head><meta charset="UTF-8"><title>{{ session_name }}</title>
-<style>body{font-family:sans-serif;padding:20px;background:#f5f5f5}
-.entry{background:white;margin:20px 0;padding:20px;border-radius:8px}
-img{max-width:100%;height:auto}</style></head><body>
-<h1>{{ session_name }}</h1><p>Generated: {{ export_date }}</p>
-{% for entry in entries %}
-<div class="entry"><h2>{{ entry.title }}</h2>
-<p>{{ entry.timestamp }}</p>
-{% if entry.image_base64 %}<img src="data:image/jpeg;base64,{{ entry.image_base64 }}">{% endif %}
-<p>{{ entry.notes }}</p></div>
-{% endfor %}</body></html>'''
+        width, height = entry.image.width, entry.image.height
+        candidates = [(f"assets/{full.name}", width)]
+        for target_width in sorted({THUMB_WIDTH, max_width or WEB_WIDTH}):
+            if target_width >= width:
+                continue
+            rendition = self.renditions.path_for(asset_id, target_width, self.export_quality)
+            target = assets_dir / rendition.name
+            if not target.exists():
+                link_or_copy(self.export_rendition(entry, target_width), target)
+            candidates.append((f"assets/{target.name}", target_width))
+        
+        # Browsers without srcset get the largest downscale, not the original
+        return {
+            "full": candidates[0][0],
+            "src": candidates[-1][0],
+            "srcset": ", ".join(f"{url} {w}w" for url, w in candidates),
+            "width": width,
+            "height": height,
+        }
+
+    def export_rendition(self, entry: "Entry", max_width: Optional[int]) -> Path:
+        """Stored image, or its cached downscale when wider than max_width"""
+        source = self.root / entry.image.path
+        if not max_width or not source.exists():
+            return source
+        return self.renditions.get_or_create(source, self.asset_id(entry), max_width,
+                                             self.export_quality, width=entry.image.width)
+
+    def prune_assets(self, keep) -> int:
+        """Delete files under assets/ that no exported entry references"""
+        assets_dir = self.root / "assets"
+        if not assets_dir.exists():
+            return 0
+        keep = set(keep)
+        removed = 0
+        for path in assets_dir.iterdir():
+            if path.is_file() and path.name.split(".", 1)[0].split("_", 1)[0] not in keep:
+                path.unlink()
+                removed += 1
+        return removed
+
+    def _image_key(self, entry: "Entry") -> str:
+        """Cheap identity for an entry's image content"""
+        if entry.image.sha256:
+            return entry.image.sha256
+        rel = Path(entry.image.path)
+        if _HASH_RE.match(rel.stem):
+            return rel.stem
+        # Legacy file name: size + mtime instead of hashing the whole file
+        try:
+            st = (self.root / rel).stat()
+        except FileNotFoundError:
+            return f"{rel.as_posix()}:missing"
+        return f"{rel.as_posix()}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def parse_timestamp(value) -> datetime:
+    """Timezone-aware datetime from a datetime or ISO string (naive values are local time)"""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return value if value.tzinfo else value.astimezone()
+
+
+def timestamp_order(value) -> tuple:
+    """Sort key putting entries oldest first
+
+    Timestamps are compared as instants, so differing UTC offsets order
+    correctly. Values that do not parse sort last, by their text, instead
+    of failing the whole sort.
+    """
+    try:
+        return (False, parse_timestamp(value).timestamp())
+    except (TypeError, ValueError, OverflowError):
+        return (True, str(value))
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 hex digest of a file, read in blocks"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def compute_stats(entries: List["Entry"]) -> dict:
+    """Report header numbers, computed once in Python instead of template filters"""
+    return _stats([(bool(e.notes), e.image.width) for e in entries])
+
+
+def compute_data_stats(entries: List[dict]) -> dict:
+    """compute_stats() for plain metadata dicts (SessionStore.load_entry_data)"""
+    return _stats([(bool(e.get("notes")), e["image"]["width"]) for e in entries])
+
+
+def _stats(rows: List[tuple]) -> dict:
+    total = len(rows)
+    return {
+        "total": total,
+        "with_notes": sum(1 for has_notes, _ in rows if has_notes),
+        "avg_width": sum(width for _, width in rows) // total if total else 0,
+    }
+
+
+def prepare_export_image(path: str) -> Optional[PreparedImage]:
+    """Read and base64-encode one image (or rendition) for export
+
+    Module-level so it can run on thread or process pools. Returns None
+    when the image file is missing.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return PreparedImage(mime_for_path(path), _base64_chunks(f))
+
+
+def _base64_chunks(f) -> List[Markup]:
+    """Base64-encode a binary file object block by block (safe to emit unescaped)"""
+    return [Markup(base64.b64encode(block).decode("ascii"))
+            for block in iter(lambda: f.read(B64_CHUNK_BYTES), b"")]
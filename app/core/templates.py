@@ -0,0 +1,176 @@
+"""
+Shared Jinja environments for report exports
+The MAX_ENVIRONMENTS most recently used environments per (session template
+folder, autoescape) are kept, so templates compile once per session; compiled
+bytecode is also cached on disk across runs, and auto_reload recompiles a
+template only when its mtime changes.
+Lookup order: <session>/_templates overrides, package templates, built-ins.
+"""
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from jinja2 import BytecodeCache, Environment
+
+# Bumped when the template context changes. Session copies without the current
+# marker are moved aside (<name>.v<old>.bak) if they are unedited stock templates;
+# edited ones are kept, with a warning
+TEMPLATE_VERSION = 5
+TEMPLATE_MARKER = f"overlay-annotator template v{TEMPLATE_VERSION}"
+_MARKER_RE = re.compile(r"overlay-annotator template v(\d+)")
+
+# SHA-256 (LF line endings) of every template source this app has shipped or
+# copied into sessions, current versions included; add new ones when a template changes
+STOCK_TEMPLATE_HASHES = frozenset({
+    "06bf07bd72bd3eab5994d7baf4689e7bccb85f270c2b5b48c49e090899713170",
+    "0ef381170ada3656b22444d08960fa7829a3055d7b9667db9d3d411741bd68b4",
+    "14e5029eb16775465519d666d9d1d1b521fdc2436f2b73105a3339b1c16b3b2b",
+    "150aa237ddec54d9a5930f5e13ec936fb7e0495240477ca0d7ef49e28f001b75",
+    "1f839af38fd4435dcd9a1261415462b13fab6cbf4804eb63aafcb2e8320891b2",
+    "25236965626ec520ea986b82b12dea7461ea4c93b1f788cf544e8cd2e381d090",
+    "5ddf32d408d141ae0bc4f844c58efb2a70bff0e36a908948c7edb55275a7a798",
+    "673ca7612f2eb428c95bafda5facfe3aabfb18c56d721e7ca6f3ec5240ea63f0",
+    "6c49f57f7c434af04de5a9be11e049974057e8355b1f7eade5066c3ea2bba0e7",
+    "6fcc4b576eda44f21535e93e795fa44ef79abc738ae4f0310361e4176da51a90",
+    "732e2b8e0709810ef59193dbada98e765fcd2f66db0e5767d9f19bc8d1c1bd26",
+    "776ec52b46cb802facf6c4d495a10b1d5ab5e055a4bbe546d3c4bd0b9c5f5b86",
+    "802bb9c257f3cd196f58c48150ba4b9c95a47b23d137ee606bdade98489f5447",
+    "8a6ad3f7c503ecc4263e8f2096cbefea3ef2acf5f0a4928dedee344773243bdc",
+    "95800b8d9e5e19a104f2b7ad9b19d5a4917fc3cc1b5d8693457cf9bce1d03360",
+    "a4031c7366c3220fe558844b74e73927ba0a18f8b51dd29a1d4746e8b356f508",
+    "ac87fe247ac6a2e78613e16273a3a0851495e8bf9f20ca098e1c64d7a5155ad8",
+    "aefcfbc2f1e9b1a8288c2a258075f84f223bead42e6989d47394d9159416e3ad",
+    "c5099e983631bbcc4ebe2e6fd2394a141f835f44f7528db42c212e386e3ae4e1",
+    "c54e3a6ff8cf9d91b175da64a11f9822a2845bb5a33d761190ed372324b0c1b7",
+    "cbbeb8db885a0478ba57ab481e804112beeda36a465cfae0c82dde273cc60c9a",
+    "d5fa777dd75a84e57d213c39aaf19904aafc81f4b0a54103fbf70843466cd9c1",
+    "db3de62cdc585c35193f6867b998aa465831f550215196bcc4f72645db2a5832",
+    "f3ed1bd290a89bd12e3b65a4f97c59f34dffe71202ca49ea49a9e3327e3432fb",
+    "f73d0aa0c6963d89e8e6af4a53970f2dbc2f80fc69de09cc864140834668ddeb",
+})
+
+PACKAGE_TEMPLATES = Path(__file__).parent / "_templates"
+
+TEMPLATE_NAMES = ("report.md.j2", "entry.md.j2", "report.html.j2", "entry.html.j2")
+
+DEFAULT_REPORT_MD_J2 = '''{# ''' + TEMPLATE_MARKER + ''' #}# Overlay Annotator Session
+
+{% for fragment in fragments %}{{ fragment }}{% endfor %}
+'''
+
+DEFAULT_ENTRY_MD_J2 = '''{# ''' + TEMPLATE_MARKER + ''' #}
+## {{ entry.title }}
+Captured: {{ entry.timestamp }}
+
+| Screenshot | Notes |
+|---|---|
+| ![{{ entry.title }}]({{ entry.image.path }}) | {{ entry.notes }} |
+
+'''
+
+# Minimal HTML versions, used only if the package templates are missing
+DEFAULT_REPORT_HTML_J2 = '''{# ''' + TEMPLATE_MARKER + ''' #}<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><title>{{ session_name }}</title>
+<style>body{font-family:sans-serif;padding:20px;background:#f5f5f5}
+.entry{background:white;margin:20px 0;padding:20px;border-radius:8px}
+img{max-width:100%;height:auto}</style></head><body>
+<h1>{{ session_name }}</h1><p>Generated: {{ export_date }}</p>
+{% if pagination %}<p>{% if pagination.prev %}<a href="{{ pagination.prev }}">Previous</a> {% endif %}<a href="{{ pagination.index }}">Page {{ pagination.page }} of {{ pagination.pages }}</a>{% if pagination.next %} <a href="{{ pagination.next }}">Next</a>{% endif %}</p>{% endif %}
+{% if pages %}<ol>{% for page in pages %}<li><a href="{{ page.href }}">{{ page.first_title }}</a> ({{ page.count }} entries)</li>{% endfor %}</ol>{% endif %}
+{% for fragment in fragments %}{{ fragment }}{% endfor %}</body></html>'''
+
+DEFAULT_ENTRY_HTML_J2 = '''{# ''' + TEMPLATE_MARKER + ''' #}<div class="entry"><h2>{{ entry.title }}</h2>
+<p>{{ entry.timestamp }}</p>
+{% if entry.assets %}<a href="{{ entry.assets.full }}"><img src="{{ entry.assets.src }}" srcset="{{ entry.assets.srcset }}" width="{{ entry.assets.width }}" height="{{ entry.assets.height }}" loading="lazy" decoding="async"></a>
+{% elif entry.has_image %}<img src="data:{{ entry.image_mime }};base64,{% for chunk in entry.image_chunks %}{{ chunk }}{% endfor %}">{% endif %}
+<p>{{ entry.notes }}</p></div>
+'''
+
+BUILTIN_TEMPLATES = {
+    "report.md.j2": DEFAULT_REPORT_MD_J2,
+    "entry.md.j2": DEFAULT_ENTRY_MD_J2,
+    "report.html.j2": DEFAULT_REPORT_HTML_J2,
+    "entry.html.j2": DEFAULT_ENTRY_HTML_J2,
+}
+
+# A resident instance exporting many sessions would otherwise keep every
+# session's environment and compiled templates alive
+MAX_ENVIRONMENTS = 8
+
+_environments: "OrderedDict[Tuple[Optional[str], bool], Environment]" = OrderedDict()
+_lock = threading.Lock()
+_bytecode_cache: Optional["BytecodeCache"] = None
+
+
+def get_environment(template_dir: Optional[Path] = None, autoescape: bool = False) -> "Environment":
+    """Shared Jinja environment for a session template folder (LRU-cached)"""
+    key = (str(Path(template_dir).resolve()) if template_dir else None, autoescape)
+    with _lock:
+        env = _environments.get(key)
+        if env is not None:
+            _environments.move_to_end(key)
+        else:
+            # jinja2 is only needed once something is exported
+            from jinja2 import ChoiceLoader, DictLoader, Environment, FileSystemLoader
+            loaders = [FileSystemLoader(str(PACKAGE_TEMPLATES)), DictLoader(BUILTIN_TEMPLATES)]
+            if template_dir:
+                loaders.insert(0, FileSystemLoader(str(template_dir)))
+            env = Environment(
+                loader=ChoiceLoader(loaders),
+                autoescape=autoescape,
+                auto_reload=True,
+                bytecode_cache=_get_bytecode_cache(),
+            )
+            _environments[key] = env
+            while len(_environments) > MAX_ENVIRONMENTS:
+                _environments.popitem(last=False)
+    return env
+
+
+def template_source(env: "Environment", name: str) -> str:
+    """Source text the environment resolves for a template name"""
+    return env.loader.get_source(env, name)[0]
+
+
+def template_version(source: str) -> int:
+    """Version in a template's marker comment (0 for copies made before markers)"""
+    match = _MARKER_RE.search(source)
+    return int(match.group(1)) if match else 0
+
+
+def is_stock_template(source: str) -> bool:
+    """Whether a template source is an unedited copy of a shipped default"""
+    digest = hashlib.sha256(source.replace("\r\n", "\n").encode("utf-8")).hexdigest()
+    return digest in STOCK_TEMPLATE_HASHES
+
+
+def default_templates() -> Dict[str, str]:
+    """Default template sources: package files, else the built-in versions"""
+    templates = {}
+    for name in TEMPLATE_NAMES:
+        pkg_template = PACKAGE_TEMPLATES / name
+        templates[name] = (pkg_template.read_text(encoding="utf-8") if pkg_template.exists()
+                           else BUILTIN_TEMPLATES[name])
+    return templates
+
+
+def clear_environments() -> None:
+    """Drop cached environments (tests, or after moving a session)"""
+    with _lock:
+        _environments.clear()
+
+
+def _get_bytecode_cache() -> Optional["BytecodeCache"]:
+    """Per-user on-disk bytecode cache, or none if the temp folder is unusable"""
+    global _bytecode_cache
+    if _bytecode_cache is None:
+        from jinja2 import FileSystemBytecodeCache
+        try:
+            _bytecode_cache = FileSystemBytecodeCache()
+        except (OSError, RuntimeError):
+            return None
+    return _bytecode_cache
@@ -0,0 +1,48 @@
+"""
+On-disk thumbnail cache for session images
+Thumbnails are keyed by image content hash and size, so they never go stale
+"""
+from pathlib import Path
+import os
+import threading
+from typing import Optional
+from PIL import Image
+
+DEFAULT_THUMBNAIL_SIZE = 96
+
+
+class ThumbnailCache:
+    """Lazily generated PNG thumbnails under <session>/_cache/thumbnails"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+
+    def path_for(self, image_hash: str, size: int = DEFAULT_THUMBNAIL_SIZE) -> Path:
+        return self.cache_dir / image_hash[:2] / f"{image_hash}_{size}.png"
+
+    def get(self, image_hash: str, size: int = DEFAULT_THUMBNAIL_SIZE) -> Optional[Path]:
+        """Cached thumbnail path, or None if it has not been generated yet"""
+        path = self.path_for(image_hash, size)
+        return path if path.exists() else None
+
+    def get_or_create(self, source: Path, image_hash: str, size: int = DEFAULT_THUMBNAIL_SIZE) -> Path:
+        """Return the cached thumbnail, generating it from source on a miss
+
+        Safe to call from worker threads: output is written to a temp file
+        and moved into place, so readers never see a partial thumbnail.
+        """
+        path = self.path_for(image_hash, size)
+        if path.exists():
+            return path
+
+        with Image.open(source) as img:
+            # JPEG can decode at reduced scale, which is much faster for big captures
+            img.draft("RGB", (size * 2, size * 2))
+            thumb = img.convert("RGB")
+            thumb.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        path.parent.mkdir(exist_ok=True, parents=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        thumb.save(tmp, "PNG", optimize=True)
+        os.replace(tmp, path)
+        return path
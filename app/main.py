@@ -2,19 +2,61 @@
 """
 Overlay Annotator v2 - Main Entry Point
 Launch with global hotkey support (Ctrl+Alt+S)
+
+Only one instance runs per user: launching again hands the arguments to
+the running instance over the control socket and exits, before Qt loads.
 """
 from pathlib import Path
+import argparse
 import sys
 import faulthandler
 import os
 
+from app.core.control import hand_off
+
 # Enable faulthandler for C-level crash traces
 faulthandler.enable(sys.stderr)
 
 # Force software rendering on Windows to avoid GPU driver issues
 os.environ.setdefault("QT_OPENGL", "software")
 
-from PyQt6.QtWidgets import QApplication, QMessageBox
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.main", description="Overlay Annotator")
+    parser.add_argument("--capture", action="store_true", help="start a region capture")
+    parser.add_argument("--tray", action="store_true",
+                        help="stay resident in the system tray; closing the window only hides it")
+    parser.add_argument("--new-instance", action="store_true",
+                        help="start a separate instance instead of handing off to a running one")
+    parser.add_argument("--metrics", action="store_true",
+                        help="write hot-path timings to metrics.json in the log folder "
+                             "(also $OVERLAY_ANNOTATOR_METRICS=1)")
+    parser.add_argument("--log-level", type=str.upper, choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+                        help="default: $OVERLAY_ANNOTATOR_LOG_LEVEL or INFO")
+    # Qt consumes its own options (-platform, -style, ...) from sys.argv
+    args, _qt_args = parser.parse_known_args(argv)
+    return args
+
+
+def hand_off_launch(args) -> bool:
+    """Forward this launch to a running instance; False if none answered"""
+    replies = hand_off([{"cmd": "capture"} if args.capture else {"cmd": "show"}])
+    if replies is None:
+        return False
+    for reply in replies:
+        if not reply.get("ok"):
+            print(f"Overlay Annotator: {reply.get('error')}", file=sys.stderr)
+            if args.capture:
+                hand_off([{"cmd": "show"}])  # e.g. no session yet: let the user pick one
+    return True
+
+
+if __name__ == "__main__":
+    ARGS = parse_args()
+    if not ARGS.new_instance and hand_off_launch(ARGS):
+        sys.exit(0)
+
+from PyQt6.QtWidgets import QApplication, QMessageBox, QMenu, QStyle, QSystemTrayIcon
 from PyQt6.QtCore import QObject, pyqtSignal, QTimer
 
 try:
@@ -25,16 +67,22 @@ except ImportError:
     HOTKEY_AVAILABLE = False
 
 from app.ui.main_window import MainWindow
-from app.ui.capture_overlay import CaptureOverlay
+from app.ui.capture_overlay import CaptureOverlay, grab_region
+from app.ui.background import run_in_background
+from app.ui.control_server import ControlServer, PendingReply
+from app.core.control import CommandError
+from app.core import metrics
 from app.core.logger import setup_logging, exception_hook, log_exception
 
 ROOT = Path(__file__).resolve().parent
 
 
 class OverlayAnnotatorApp:
-    def __init__(self):
+    def __init__(self, tray: bool = False, log_level: str = None, collect_metrics: bool = False):
         # Setup logging first
-        self.logger, self.log_file = setup_logging()
+        self.logger, self.log_file = setup_logging(level=log_level)
+        if collect_metrics or metrics.enabled_by_environment():
+            metrics.enable(self.log_file.parent / metrics.METRICS_FILE)
         self.logger.info("Initializing application...")
         
         try:
@@ -47,6 +95,11 @@ class OverlayAnnotatorApp:
             )
             self.capture_overlay = None
             self.hk_capture = None
+            self.control_server = ControlServer(self.control_handlers(), parent=self.main_window)
+            # Resident: closing the window hides it; quit from the tray menu
+            self.tray_icon = self.create_tray_icon() if tray else None
+            self.resident = self.tray_icon is not None
+            self.app.setQuitOnLastWindowClosed(not self.resident)
             
             self.logger.info("Application initialized successfully")
             
@@ -58,9 +111,12 @@ class OverlayAnnotatorApp:
         """Show the transparent capture overlay"""
         try:
             self.logger.info("Showing capture overlay...")
+            metrics.record_since("hotkey", "capture.hotkey_to_handler")
+            metrics.mark("capture")
+            metrics.mark("overlay")
             if self.capture_overlay is None:
                 self.capture_overlay = CaptureOverlay(
-                    on_region_selected=self.main_window.handle_captured_region,
+                    on_region_selected=self.on_region_captured,
                     logger=self.logger
                 )
             self.capture_overlay.start_capture()
@@ -73,6 +129,42 @@ class OverlayAnnotatorApp:
                 f"Failed to start capture:\n{str(e)}\n\nCheck log file:\n{self.log_file}"
             )
     
+    def on_region_captured(self, pil_img):
+        """Bring up the (possibly hidden) window with the capture loaded"""
+        self.show_window()
+        self.main_window.handle_captured_region(pil_img)
+        metrics.record_since("selected", "capture.selection_to_canvas")
+        metrics.record_since("capture", "capture.request_to_canvas")
+    
+    def show_window(self):
+        """Show, restore and focus the main window"""
+        window = self.main_window
+        if window.isMinimized():
+            window.showNormal()
+        else:
+            window.show()
+        window.raise_()
+        window.activateWindow()
+    
+    def create_tray_icon(self):
+        """Tray icon with show/capture/quit, or None without a system tray"""
+        if not QSystemTrayIcon.isSystemTrayAvailable():
+            self.logger.warning("No system tray available; running with the window instead")
+            return None
+        icon = QSystemTrayIcon(self.app.style().standardIcon(QStyle.StandardPixmap.SP_DesktopIcon), self.app)
+        icon.setToolTip("Overlay Annotator")
+        menu = QMenu()
+        menu.addAction("Show Window", self.show_window)
+        menu.addAction("Capture", self.show_capture_overlay)
+        menu.addSeparator()
+        menu.addAction("Quit", self.app.quit)
+        icon.setContextMenu(menu)
+        icon.activated.connect(
+            lambda reason: self.show_window() if reason == QSystemTrayIcon.ActivationReason.Trigger else None
+        )
+        self._tray_menu = menu  # QSystemTrayIcon does not take ownership
+        return icon
+    
     def register_hotkey(self):
         """Register system-wide hotkey using QHotkey (Qt-safe)"""
         if not HOTKEY_AVAILABLE:
@@ -92,7 +184,7 @@ class OverlayAnnotatorApp:
             
             # Connect to slot via QTimer for thread safety
             self.hk_capture.activated.connect(
-                lambda: QTimer.singleShot(0, self.show_capture_overlay)
+                lambda: (metrics.mark("hotkey"), QTimer.singleShot(0, self.show_capture_overlay))
             )
             
             self.logger.info("Hotkey registered successfully - Ctrl+Alt+S active")
@@ -102,11 +194,136 @@ class OverlayAnnotatorApp:
             print(f"\nWarning: Could not register hotkey: {e}")
             print("Use the 'Capture' button instead\n")
     
-    def run(self):
+    def control_handlers(self):
+        """Control socket commands (run on the GUI thread, see app.core.control)"""
+        return {
+            "ping": lambda request: {"pong": True},
+            "status": self._cmd_status,
+            "show": self._cmd_show,
+            "capture": self._cmd_capture,
+            "add": self._cmd_add,
+            "export": self._cmd_export,
+        }
+    
+    def _require_session(self):
+        if self.main_window.session_loader:
+            raise CommandError("session still loading")
+        if not self.main_window.store:
+            raise CommandError("no session open")
+        return self.main_window.store
+    
+    def _cmd_status(self, request):
+        window = self.main_window
+        return {
+            "pid": os.getpid(),
+            "visible": window.isVisible(),
+            "session": str(window.session_path) if window.session_path else None,
+            "loading": window.session_loader is not None,
+            "entries": window.entry_model.rowCount(),
+            "exporting": window.export_worker is not None,
+            "queued": self.control_server.pending(),
+        }
+    
+    def _cmd_show(self, request):
+        self.show_window()
+        return {"status": "shown"}
+    
+    def _cmd_capture(self, request):
+        """Interactive overlay, or a given region saved/loaded without it"""
+        from app.core.ingest import entry_from_fields, store_image
+        store = self._require_session()
+        region = request.get("region")
+        if region is None:
+            QTimer.singleShot(0, self.show_capture_overlay)
+            return {"status": "overlay shown"}
+        try:
+            x, y, width, height = (int(v) for v in region)
+        except (TypeError, ValueError):
+            raise CommandError("region must be [x, y, width, height]")
+        if not request.get("save", True):
+            self.main_window.handle_captured_region(grab_region(x, y, width, height))
+            return {"status": "loaded in editor"}
+        fields = {"title": request.get("title") or "Capture", "notes": request.get("notes", ""),
+                  "layout": self.main_window.layout_select.currentText()}
+        
+        def save():
+            entry = entry_from_fields(fields, store_image(store, grab_region(x, y, width, height)))
+            store.save_entry(entry)
+            return entry
+        return self._save_in_background(store, save)
+    
+    def _cmd_add(self, request):
+        """New entry from an image file (fields as in a watch-folder sidecar)"""
+        from app.core.ingest import entry_fields, entry_from_fields, store_image_file
+        store = self._require_session()
+        path = Path(request["image"])
+        if not path.is_file():
+            raise CommandError(f"no such file: {path}")
+        overrides = {k: request[k] for k in ("title", "notes", "tags", "context") if k in request}
+        
+        def save():
+            try:
+                fields = entry_fields(path)
+            except ValueError as e:
+                raise CommandError(str(e))  # unreadable sidecar or invalid timestamp
+            fields.update(overrides)
+            entry = entry_from_fields(fields, store_image_file(store, path))
+            store.save_entry(entry)
+            return entry
+        return self._save_in_background(store, save)
+    
+    def _save_in_background(self, store, save):
+        """Decode, encode and write on a pool thread; reply once the entry is listed"""
+        reply = PendingReply()
+        
+        def saved(entry):
+            self.main_window.show_saved_entry(store, entry)
+            reply.resolve(entry=entry.id)
+        
+        def failed(error):
+            if not isinstance(error, CommandError):
+                self.logger.error("Saving entry for control command failed", exc_info=error)
+            reply.fail(str(error) if isinstance(error, CommandError) else f"{type(error).__name__}: {error}")
+        
+        run_in_background(save, saved, failed)
+        return reply
+    
+    def _cmd_export(self, request):
+        """Start a background export; progress shows in the window"""
+        self._require_session()
+        try:
+            started = self.main_window.export_report(
+                interactive=False, formats=request.get("formats"), mode=request.get("mode")
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not started:
+            raise CommandError("an export is already running")
+        return {"status": "started"}
+    
+    def run(self, capture: bool = False, single_instance: bool = True):
         """Launch the application"""
         try:
+            # Listen first: the socket is what makes this the single instance
+            if not self.control_server.start():
+                # Lost a race with a launch that started at the same time: defer to it
+                if (single_instance and self.control_server.held_by_other_instance()
+                        and hand_off_launch(argparse.Namespace(capture=capture))):
+                    self.logger.info("Another instance started first; handed this launch to it")
+                    return 0
+                self.logger.warning("Another instance may be running; its hotkey will win")
             self.register_hotkey()
-            self.main_window.show()
+            self.app.aboutToQuit.connect(self.control_server.stop)
+            self.app.aboutToQuit.connect(self.main_window.shutdown)
+            self.app.aboutToQuit.connect(metrics.disable)
+            if self.tray_icon is not None:
+                self.tray_icon.show()
+            else:
+                self.main_window.show()
+            # Window first, then the last session fills in behind it
+            self.main_window.restore_last_session()
+            if capture:
+                QTimer.singleShot(0, self.show_capture_overlay)
             
             print("=" * 60)
             print("Overlay Annotator running...")
@@ -131,8 +348,8 @@ if __name__ == "__main__":
     sys.excepthook = exception_hook
     
     try:
-        app = OverlayAnnotatorApp()
-        exit_code = app.run()
+        app = OverlayAnnotatorApp(tray=ARGS.tray, log_level=ARGS.log_level, collect_metrics=ARGS.metrics)
+        exit_code = app.run(capture=ARGS.capture, single_instance=not ARGS.new_instance)
         sys.exit(exit_code)
     except Exception as e:
         print(f"\nFATAL ERROR: {e}")
@@ -1,10 +1,18 @@
-from typing import Optional, List, Tuple
+from typing import TYPE_CHECKING, Optional, List, Tuple
 from enum import Enum
 from dataclasses import dataclass
+import logging
 from PyQt6.QtWidgets import QWidget
 from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QMouseEvent, QFont, QImage, QPixmap
 from PyQt6.QtCore import Qt, QPoint, QRect, QMutex, QMutexLocker
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+from app.core.metrics import timed
+
+if TYPE_CHECKING:
+    from PIL import Image  # Loaded with the first image, not at startup
+
+# Module logger; load/paint details are DEBUG (off at the default level)
+logger = logging.getLogger('OverlayAnnotator.Canvas')
 
 
 class ToolType(Enum):
@@ -36,7 +44,7 @@ class AnnotationCanvas(QWidget):
     
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.pil_image: Optional[Image.Image] = None
+        self.pil_image: Optional["Image.Image"] = None
         self.q_image: Optional[QImage] = None  # Immutable backing image
         self._pixmap: Optional[QPixmap] = None  # Fast paint source
         self._mx = QMutex()  # Guard image swap for thread safety
@@ -53,24 +61,25 @@ class AnnotationCanvas(QWidget):
         
         self.setMinimumSize(400, 300)
     
-    def load_pil(self, pil_img: Image.Image):
+    @timed("canvas.load")
+    def load_pil(self, pil_img: "Image.Image"):
         """Load PIL image into canvas"""
         try:
             if pil_img is None:
-                print("Error: Cannot load None image")
+                logger.error("Cannot load None image")
                 return
             
             # Validate image
             if pil_img.width == 0 or pil_img.height == 0:
-                print("Error: Invalid image dimensions")
+                logger.error("Invalid image dimensions")
                 return
             
-            print(f"Loading image: {pil_img.width}x{pil_img.height}, mode: {pil_img.mode}")
+            logger.debug("Loading image: %dx%d, mode: %s", pil_img.width, pil_img.height, pil_img.mode)
             
             # CRITICAL FIX: Ensure RGBA mode and create deep copy
             # This prevents the dangling buffer crash that was killing Qt
             if pil_img.mode != 'RGBA':
-                print(f"Converting from {pil_img.mode} to RGBA")
+                logger.debug("Converting from %s to RGBA", pil_img.mode)
                 pil_img = pil_img.convert('RGBA')
             
             # Store PIL image (keeps it alive)
@@ -99,11 +108,10 @@ class AnnotationCanvas(QWidget):
             
             # Validate QImage
             if q_img.isNull():
-                print("Error: QImage is null after conversion")
+                logger.error("QImage is null after conversion")
                 return
                 
-            print(f"QImage created: {q_img.width()}x{q_img.height()}")
-            print("Deep copy successful - Qt now owns the image buffer")
+            logger.debug("QImage created: %dx%d (deep copy, Qt owns the buffer)", q_img.width(), q_img.height())
             
             # THREAD SAFETY: Use mutex when swapping images
             with QMutexLocker(self._mx):
@@ -117,9 +125,7 @@ class AnnotationCanvas(QWidget):
             self.update()
             
         except Exception as e:
-            print(f"Error loading PIL image: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"Error loading PIL image: {e}", exc_info=True)
     
     def set_tool(self, tool: ToolType, color: QColor = None, width: int = None):
         """Set active drawing tool"""
@@ -216,6 +222,7 @@ class AnnotationCanvas(QWidget):
         # Crop, blur, and paste back
         if img_x2 > img_x1 and img_y2 > img_y1:
             region = self.pil_image.crop((img_x1, img_y1, img_x2, img_y2))
+            from PIL import ImageFilter
             blurred = region.filter(ImageFilter.GaussianBlur(radius=15))
             self.pil_image.paste(blurred, (img_x1, img_y1))
             
@@ -248,7 +255,7 @@ class AnnotationCanvas(QWidget):
             
             # Validate rect
             if target_rect.width() <= 0 or target_rect.height() <= 0:
-                print(f"Warning: Invalid target rect: {target_rect.width()}x{target_rect.height()}")
+                logger.warning("Invalid target rect: %dx%d", target_rect.width(), target_rect.height())
                 return
             
             # QUALITY FIX: Enable smooth scaling/anti-aliasing
@@ -264,14 +271,14 @@ class AnnotationCanvas(QWidget):
                 try:
                     self._draw_annotation(painter, annotation)
                 except Exception as e:
-                    print(f"Warning: Failed to draw annotation: {e}")
+                    logger.warning("Failed to draw annotation: %s", e)
             
             # Draw current annotation being created
             if self.current_annotation:
                 try:
                     self._draw_annotation(painter, self.current_annotation)
                 except Exception as e:
-                    print(f"Warning: Failed to draw current annotation: {e}")
+                    logger.warning("Failed to draw current annotation: %s", e)
             
             # Draw text cursor if pending
             if self.pending_text and self.text_position:
@@ -280,12 +287,10 @@ class AnnotationCanvas(QWidget):
                     painter.setPen(pen)
                     painter.drawEllipse(self.text_position, 5, 5)
                 except Exception as e:
-                    print(f"Warning: Failed to draw text cursor: {e}")
+                    logger.warning("Failed to draw text cursor: %s", e)
                     
         except Exception as e:
-            print(f"ERROR in paintEvent: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"Error in paintEvent: {e}", exc_info=True)
         finally:
             # CRITICAL: Always end the painter
             painter.end()
@@ -378,89 +383,33 @@ class AnnotationCanvas(QWidget):
         painter.fillRect(text_rect, QColor(255, 255, 255, 200))
         painter.drawText(annotation.start, annotation.text)
     
-    def render_annotated(self) -> Image.Image:
+    @timed("canvas.render")
+    def render_annotated(self) -> "Image.Image":
         """Render final image with all annotations burned in at high quality"""
         if not self.pil_image:
+            from PIL import Image
             return Image.new("RGB", (1, 1), "white")
         
-        output = self.pil_image.copy()
-        draw = ImageDraw.Draw(output)
+        from app.core.render import render_annotations
         
-        # Scale factors
-        w, h = output.size
+        # Annotations are in widget coordinates; scale them to the image
+        w, h = self.pil_image.size
         scale_x = w / (self.width() or 1)
         scale_y = h / (self.height() or 1)
-        
-        # QUALITY FIX: Use higher base width for better visibility
-        min_width = max(3, int(3 * scale_x))  # At least 3px, scaled up for large images
-        
-        # Draw each annotation on PIL image
-        for annotation in self.annotations:
-            if annotation.tool == ToolType.TEXT and annotation.text:
-                # Draw text
-                x = int(annotation.start.x() * scale_x)
-                y = int(annotation.start.y() * scale_y)
-                
-                # QUALITY FIX: Use larger font size scaled to image
-                font_size = max(24, int(32 * scale_y))  # Scale font with image
-                
-                # Try to load a good font
-                try:
-                    font = ImageFont.truetype("arial.ttf", font_size)
-                except:
-                    try:
-                        # Try common font locations
-                        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", font_size)
-                    except:
-                        # Fallback to default (will be small)
-                        font = ImageFont.load_default()
-                
-                # Draw white background for text
-                bbox = draw.textbbox((x, y), annotation.text, font=font)
-                draw.rectangle(bbox, fill=(255, 255, 255, 220))
-                
-                # Draw text with color
-                color = (annotation.color.red(), annotation.color.green(), annotation.color.blue())
-                draw.text((x, y), annotation.text, fill=color, font=font)
-            
-            elif annotation.tool in [ToolType.ARROW, ToolType.BOX, ToolType.PEN]:
-                if not annotation.start or not annotation.end:
-                    continue
-                
-                x1 = int(annotation.start.x() * scale_x)
-                y1 = int(annotation.start.y() * scale_y)
-                x2 = int(annotation.end.x() * scale_x)
-                y2 = int(annotation.end.y() * scale_y)
-                
-                # CRITICAL FIX: Normalize coordinates so x1 <= x2 and y1 <= y2
-                # This prevents "x1 must be greater than or equal to x0" error
-                x1, x2 = min(x1, x2), max(x1, x2)
-                y1, y2 = min(y1, y2), max(y1, y2)
-                
-                color = (annotation.color.red(), annotation.color.green(), annotation.color.blue())
-                
-                # QUALITY FIX: Scale width properly and ensure minimum visibility
-                width = max(min_width, int(annotation.width * max(scale_x, scale_y)))
-                
-                if annotation.tool == ToolType.BOX:
-                    draw.rectangle([x1, y1, x2, y2], outline=color, width=width)
-                elif annotation.tool in [ToolType.ARROW, ToolType.PEN]:
-                    draw.line([x1, y1, x2, y2], fill=color, width=width)
-                    
-                    # Add arrowhead for arrows
-                    if annotation.tool == ToolType.ARROW:
-                        dx = x2 - x1
-                        dy = y2 - y1
-                        length = (dx**2 + dy**2)**0.5
-                        if length > 0:
-                            dx, dy = dx/length, dy/length
-                            # QUALITY FIX: Scale arrow size with image
-                            arrow_size = max(20, int(30 * scale_x))
-                            pts = [
-                                (x2, y2),
-                                (int(x2 - arrow_size * (dx + dy*0.5)), int(y2 - arrow_size * (dy - dx*0.5))),
-                                (int(x2 - arrow_size * (dx - dy*0.5)), int(y2 - arrow_size * (dy + dx*0.5)))
-                            ]
-                            draw.polygon(pts, fill=color)
-        
-        return output
+        shapes = [self._to_shape(a) for a in self.annotations if a.start is not None]
+        return render_annotations(self.pil_image, shapes, scale_x, scale_y)
+    
+    def _to_shape(self, annotation: Annotation):
+        """Annotation as a headless render shape (widget coordinates)"""
+        from app.core.render import Shape
+        end = annotation.end
+        return Shape(
+            kind=annotation.tool.value,
+            x1=annotation.start.x(),
+            y1=annotation.start.y(),
+            x2=end.x() if end is not None else None,
+            y2=end.y() if end is not None else None,
+            color=(annotation.color.red(), annotation.color.green(), annotation.color.blue()),
+            width=annotation.width,
+            text=annotation.text,
+        )
@@ -0,0 +1,56 @@
+"""
+One-off background calls with results delivered on the GUI thread
+"""
+import logging
+from typing import Any, Callable, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.Background')
+
+# Signal objects of calls still running; kept alive until their result is delivered
+_active = set()
+
+
+class _CallSignals(QObject):
+    done = pyqtSignal(object)    # return value
+    failed = pyqtSignal(object)  # exception
+
+
+class _Call(QRunnable):
+    """Run fn() on a pool thread and emit its result or exception"""
+
+    def __init__(self, fn: Callable[[], Any], signals: _CallSignals):
+        super().__init__()
+        self.fn = fn
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.fn()
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            self.signals.done.emit(result)
+
+
+def run_in_background(fn: Callable[[], Any], on_done: Callable[[Any], None],
+                      on_error: Callable[[Exception], None], pool: Optional[QThreadPool] = None) -> None:
+    """Call fn() on a pool thread, then on_done(result) or on_error(exception) on the GUI thread
+
+    Must be called from the GUI thread. fn must not touch widgets or models.
+    """
+    signals = _CallSignals()
+    _active.add(signals)
+
+    def finish(callback, value):
+        _active.discard(signals)
+        try:
+            callback(value)
+        except Exception:
+            logger.error("Background call result handler failed", exc_info=True)
+
+    signals.done.connect(lambda result: finish(on_done, result))
+    signals.failed.connect(lambda error: finish(on_error, error))
+    (pool or QThreadPool.globalInstance()).start(_Call(fn, signals))
@@ -4,15 +4,29 @@ Transparent full-screen overlay for region selection
 from PyQt6.QtWidgets import QWidget, QApplication
 from PyQt6.QtCore import Qt, QRect, QPoint, pyqtSignal
 from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QPixmap
-from mss import mss
-from PIL import Image
-from typing import Callable, Optional
+from typing import TYPE_CHECKING, Callable, Optional
 import logging
 
+from app.core import metrics
+
+if TYPE_CHECKING:
+    from PIL import Image
+
 # Module logger
 logger = logging.getLogger('OverlayAnnotator.CaptureOverlay')
 
 
+def grab_region(x: int, y: int, width: int, height: int) -> "Image.Image":
+    """Screenshot of a virtual-desktop rectangle, without the overlay"""
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid region size: {width}x{height}")
+    from mss import mss
+    from PIL import Image
+    with mss() as sct:
+        shot = sct.grab({"left": x, "top": y, "width": width, "height": height})
+        return Image.frombytes('RGB', shot.size, shot.rgb)
+
+
 class CaptureOverlay(QWidget):
     """Full-screen transparent overlay for capturing screen regions"""
     
@@ -63,17 +77,20 @@ class CaptureOverlay(QWidget):
         desktop = QApplication.primaryScreen().virtualGeometry()
         self.setGeometry(desktop)
         
-        print(f"Overlay geometry: {desktop.x()}, {desktop.y()}, {desktop.width()}x{desktop.height()}")
+        logger.debug("Overlay geometry: %d, %d, %dx%d", desktop.x(), desktop.y(), desktop.width(), desktop.height())
         
         self.show()
         self.raise_()
         self.activateWindow()
+        metrics.record_since("overlay", "capture.request_to_overlay")
     
+    @metrics.timed("capture.screen")
     def capture_screen(self):
         """Capture full screen using mss - ALL MONITORS"""
         try:
-            from PyQt6.QtCore import QBuffer, QIODevice
             from io import BytesIO
+            from mss import mss  # Loaded on first capture, not at startup
+            from PIL import Image
             
             with mss() as sct:
                 # CRITICAL FIX: Capture ALL monitors (monitor 0 = all screens combined)
@@ -85,10 +102,10 @@ class CaptureOverlay(QWidget):
                 
                 # Validate image
                 if img.width == 0 or img.height == 0:
-                    print("Error: Invalid image dimensions")
+                    logger.error("Invalid image dimensions")
                     return
                 
-                print(f"Captured ALL monitors: {img.width}x{img.height}")
+                logger.debug("Captured all monitors: %dx%d", img.width, img.height)
                 
                 # Convert PIL to QPixmap using in-memory buffer (no file system!)
                 byte_array = BytesIO()
@@ -101,15 +118,13 @@ class CaptureOverlay(QWidget):
                 
                 # Validate QPixmap loaded successfully
                 if self.screenshot.isNull():
-                    print("Error: Failed to load QPixmap")
+                    logger.error("Failed to load QPixmap")
                     return
                 
-                print(f"QPixmap loaded: {self.screenshot.width()}x{self.screenshot.height()}")
+                logger.debug("QPixmap loaded: %dx%d", self.screenshot.width(), self.screenshot.height())
                     
         except Exception as e:
-            print(f"Error capturing screen: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"Error capturing screen: {e}", exc_info=True)
     
     def mousePressEvent(self, event):
         """Start region selection"""
@@ -140,17 +155,20 @@ class CaptureOverlay(QWidget):
                 
                 # Crop the screenshot
                 if self.screenshot and x2 > x1 and y2 > y1:
-                    cropped = self.screenshot.copy(x1, y1, x2 - x1, y2 - y1)
-                    
-                    # Convert QPixmap to PIL Image using in-memory buffer (no temp file!)
-                    from PyQt6.QtCore import QBuffer, QIODevice
-                    from io import BytesIO
-                    
-                    buffer = QBuffer()
-                    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
-                    cropped.save(buffer, "PNG")
-                    
-                    pil_img = Image.open(BytesIO(buffer.data()))
+                    metrics.mark("selected")
+                    with metrics.span("capture.crop"):
+                        cropped = self.screenshot.copy(x1, y1, x2 - x1, y2 - y1)
+                        
+                        # Convert QPixmap to PIL Image using in-memory buffer (no temp file!)
+                        from PyQt6.QtCore import QBuffer, QIODevice
+                        from io import BytesIO
+                        from PIL import Image
+                        
+                        buffer = QBuffer()
+                        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+                        cropped.save(buffer, "PNG")
+                        
+                        pil_img = Image.open(BytesIO(buffer.data()))
                     
                     # Pass to callback
                     self.on_region_selected(pil_img)
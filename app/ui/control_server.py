@@ -0,0 +1,209 @@
+"""
+Local control socket for the running app (see app.core.control for the protocol)
+"""
+from collections import deque
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtNetwork import QAbstractSocket, QLocalServer, QLocalSocket
+
+from app.core.control import (
+    BUSY, MAX_LINE_BYTES, CommandError, encode_reply, parse_command, server_name
+)
+
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.ControlServer')
+
+# Commands waiting to run; further requests are answered "busy"
+MAX_PENDING = 32
+# GUI time spent on queued commands per event-loop turn
+DRAIN_BUDGET_S = 0.010
+
+Handler = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+class PendingReply:
+    """Returned by a handler whose result comes later, e.g. from a worker thread
+
+    Call resolve(**fields) or fail(message) on the GUI thread; the reply is
+    written then, if the client is still connected.
+    """
+
+    def __init__(self):
+        self._make = None   # request -> reply line, once the result is known
+        self._write = None  # set by the server when the handler returns
+
+    def resolve(self, **fields) -> None:
+        self._finish(lambda request: encode_reply(request, **fields))
+
+    def fail(self, error: str) -> None:
+        self._finish(lambda request: encode_reply(request, ok=False, error=error))
+
+    def _finish(self, make) -> None:
+        if self._make is None:
+            self._make = make
+            self._flush()
+
+    def _attach(self, write: Callable[[bytes], None], request: Dict[str, Any]) -> None:
+        self._write = lambda: write(self._make(request))
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._make is not None and self._write is not None:
+            write, self._write = self._write, None
+            write()
+
+
+class ControlServer(QObject):
+    """QLocalServer that queues JSON-line commands and runs them on the GUI thread
+
+    Requests are parsed as they arrive but only queued; a zero-interval
+    timer runs them a few at a time between other events, so scripted
+    floods cannot starve painting or input. Handlers return a dict of
+    reply fields, raise CommandError, or return a PendingReply for work
+    they hand to a worker thread.
+    """
+
+    def __init__(self, handlers: Dict[str, Handler], name: Optional[str] = None, parent=None):
+        super().__init__(parent)
+        self.handlers = handlers
+        self.name = name or server_name()
+        self._server = QLocalServer(self)
+        self._server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self._server.newConnection.connect(self._on_new_connection)
+        self._buffers: Dict[QLocalSocket, bytes] = {}
+        self._queue = deque()
+        self._in_flight = 0  # PendingReply results not yet written
+        self._other_instance = False
+        self._drain = QTimer(self)
+        self._drain.setInterval(0)
+        self._drain.timeout.connect(self._run_queued)
+
+    def start(self) -> bool:
+        """Listen on the per-user name, replacing a stale socket left by a crash
+
+        Returns False if a live instance already holds the name (see
+        held_by_other_instance()) or listening fails.
+        """
+        # Checked first: on Unix, listen() with socket options renames its
+        # socket over an existing one, taking the name from a live instance
+        self._other_instance = self._is_alive()
+        if self._other_instance:
+            logger.warning(f"Control socket {self.name} is held by another instance")
+            return False
+        if self._server.listen(self.name):
+            logger.info(f"Control socket listening: {self._server.fullServerName()}")
+            return True
+        if self._server.serverError() == QAbstractSocket.SocketError.AddressInUseError and not self._is_alive():
+            QLocalServer.removeServer(self.name)
+            if self._server.listen(self.name):
+                logger.info(f"Control socket listening (stale socket replaced): {self._server.fullServerName()}")
+                return True
+        logger.warning(f"Control socket unavailable: {self._server.errorString()}")
+        return False
+
+    def held_by_other_instance(self) -> bool:
+        """After a failed start(): True if a live instance is listening on the name"""
+        return self._other_instance
+
+    def stop(self) -> None:
+        self._drain.stop()
+        self._queue.clear()
+        for sock in list(self._buffers):
+            sock.disconnectFromServer()
+        self._server.close()
+
+    def full_name(self) -> str:
+        return self._server.fullServerName()
+
+    def pending(self) -> int:
+        """Commands queued or still running in the background"""
+        return len(self._queue) + self._in_flight
+
+    # --- connections ---
+
+    def _is_alive(self) -> bool:
+        probe = QLocalSocket()
+        probe.connectToServer(self.name)
+        alive = probe.waitForConnected(200)
+        probe.abort()
+        return alive
+
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            sock = self._server.nextPendingConnection()
+            self._buffers[sock] = b""
+            sock.readyRead.connect(lambda s=sock: self._on_ready_read(s))
+            sock.disconnected.connect(lambda s=sock: self._on_disconnected(s))
+
+    def _on_disconnected(self, sock: QLocalSocket):
+        self._buffers.pop(sock, None)
+        sock.deleteLater()
+
+    def _on_ready_read(self, sock: QLocalSocket):
+        if sock not in self._buffers:
+            return
+        data = self._buffers[sock] + bytes(sock.readAll())
+        *lines, rest = data.split(b"\n")
+        if len(rest) > MAX_LINE_BYTES:
+            sock.write(encode_reply(None, ok=False, error=f"request longer than {MAX_LINE_BYTES} bytes"))
+            sock.disconnectFromServer()
+            self._buffers.pop(sock, None)
+            return
+        self._buffers[sock] = rest
+        for line in lines:
+            if line.strip():
+                self._enqueue(sock, line)
+
+    def _enqueue(self, sock: QLocalSocket, line: bytes):
+        try:
+            request = parse_command(line)
+        except CommandError as e:
+            sock.write(encode_reply(None, ok=False, error=str(e)))
+            return
+        if self.pending() >= MAX_PENDING:
+            # Backpressure: tell the client now instead of buffering without bound
+            sock.write(encode_reply(request, ok=False, error=BUSY))
+            return
+        self._queue.append((sock, request))
+        if not self._drain.isActive():
+            self._drain.start()
+
+    # --- execution ---
+
+    def _run_queued(self):
+        deadline = time.perf_counter() + DRAIN_BUDGET_S
+        while self._queue:
+            sock, request = self._queue.popleft()
+            reply = self._execute(request)
+            if isinstance(reply, PendingReply):
+                self._in_flight += 1
+                reply._attach(lambda data, s=sock: self._write_later(s, data), request)
+            elif sock in self._buffers:  # client may have gone away meanwhile
+                sock.write(reply)
+            if time.perf_counter() >= deadline:
+                break
+        if not self._queue:
+            self._drain.stop()
+
+    def _write_later(self, sock: QLocalSocket, data: bytes):
+        self._in_flight -= 1
+        if sock in self._buffers:
+            sock.write(data)
+
+    def _execute(self, request: Dict[str, Any]):
+        handler = self.handlers.get(request["cmd"])
+        if handler is None:
+            return encode_reply(request, ok=False, error=f"{request['cmd']} is not available")
+        try:
+            result = handler(request) or {}
+            if isinstance(result, PendingReply):
+                return result
+        except CommandError as e:
+            return encode_reply(request, ok=False, error=str(e))
+        except Exception as e:
+            logger.error(f"Control command {request['cmd']} failed", exc_info=True)
+            return encode_reply(request, ok=False, error=f"{type(e).__name__}: {e}")
+        return encode_reply(request, **result)
@@ -0,0 +1,337 @@
+"""
+Model/view entry list backed by the session manifest
+"""
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from PyQt6.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel, QTimer
+)
+
+from app.core.manifest import manifest_row
+from app.ui.background import run_in_background
+
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.EntryModel')
+
+ENTRY_ID_ROLE = Qt.ItemDataRole.UserRole
+ENTRY_TITLE_ROLE = Qt.ItemDataRole.UserRole + 1
+ENTRY_TIMESTAMP_ROLE = Qt.ItemDataRole.UserRole + 2
+# Timestamp as epoch seconds (inf if it does not parse), for sorting
+ENTRY_TIME_ROLE = Qt.ItemDataRole.UserRole + 3
+
+# Manifest rows pulled per fetchMore() call
+PAGE_SIZE = 200
+# Quiet time after the last filter keystroke before the manifest is queried
+FILTER_DELAY_MS = 250
+
+
+def display_text(row: Dict) -> str:
+    """List text for a manifest row; the filter matches against it"""
+    return f"{row['id']} — {row['title']}"
+
+
+def matches(row: Dict, text: str) -> bool:
+    """Whether a row passes a casefolded filter text"""
+    return not text or text in display_text(row).casefold()
+
+
+def entry_time(timestamp) -> float:
+    """Epoch seconds of a timestamp, inf if it does not parse"""
+    # Storage is loaded by the time rows exist (SessionLoader imports it)
+    from app.core.storage import timestamp_order
+    unparsed, value = timestamp_order(timestamp)
+    return float("inf") if unparsed else value
+
+
+def run_query(manifest, field: Optional[str], descending: bool, text: str) -> Tuple[List[Dict], int]:
+    """Live manifest rows passing the filter, sorted; runs on a pool thread
+
+    Returns the rows and the manifest offset they were read up to.
+    """
+    from app.core.storage import timestamp_order
+    live, offset = manifest.snapshot()
+    rows = [row for row in live.values() if matches(row, text)]
+    if field == "timestamp":
+        rows.sort(key=lambda row: timestamp_order(row["timestamp"]), reverse=descending)
+    elif field:
+        rows.sort(key=lambda row: str(row.get(field) or "").casefold(), reverse=descending)
+    return rows, offset
+
+
+class EntryListModel(QAbstractListModel):
+    """Entries of one session, paged in from manifest.jsonl on demand
+
+    Only manifest rows (id, title, timestamp, image) are held; full entries
+    are loaded when selected and thumbnails only for rows the view paints.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = None
+        self.thumbnail_loader = None
+        self._rows: List[Dict] = []
+        self._index: Dict[str, int] = {}
+        self._offset = 0
+        # Sort and filter run on manifest rows, so rows not paged in yet still count
+        self._sort_field: Optional[str] = None
+        self._descending = False
+        self._filter = ""
+        # Rows of a sorted/filtered query still to be paged in (None: manifest order)
+        self._queued: Optional[List[Dict]] = None
+        # Bumped per query so results of superseded ones are dropped
+        self._generation = 0
+        self._querying = False
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(FILTER_DELAY_MS)
+        self._filter_timer.timeout.connect(self._reload)
+
+    def set_session(self, store, thumbnail_loader=None, first_page=None):
+        """Point the model at a session; rows arrive through fetchMore()
+
+        first_page is a (rows, offset) result of manifest.read_page(0, ...)
+        already read off the GUI thread; it is shown straight away unless
+        a sort or filter is active (that query runs in the background).
+        Otherwise the first page is read here.
+        """
+        if self.thumbnail_loader is not None:
+            self.thumbnail_loader.thumbnail_ready.disconnect(self._on_thumbnail_ready)
+        self.store = store
+        self.thumbnail_loader = thumbnail_loader
+        if store is not None:
+            store.ensure_manifest()
+        if thumbnail_loader is not None:
+            thumbnail_loader.thumbnail_ready.connect(self._on_thumbnail_ready)
+        self._reset_rows(None, 0)
+        self._reload(first_page)
+
+    def set_sort(self, field: Optional[str], descending: bool = False):
+        """Page rows in ordered by a manifest field (None: manifest order)"""
+        if (field, descending) != (self._sort_field, self._descending):
+            self._sort_field, self._descending = field, descending
+            self._reload()
+
+    def set_filter(self, text: str):
+        """Only page in rows whose id or title contains text (case-insensitive)
+
+        The query waits for FILTER_DELAY_MS without further changes, so
+        typing does not re-read the manifest on every keystroke.
+        """
+        text = text.casefold()
+        if text != self._filter:
+            self._filter = text
+            self._filter_timer.start()
+
+    def is_busy(self) -> bool:
+        """Whether a sort or filter query has not been applied yet"""
+        return self._querying or self._filter_timer.isActive()
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        row = self._rows[index.row()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return display_text(row)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{row['title']}\n{row['timestamp']}"
+        if role == Qt.ItemDataRole.DecorationRole and self.thumbnail_loader is not None:
+            # Only called for painted rows, so thumbnails load as you scroll
+            icon = self.thumbnail_loader.request(row["id"], row["image"], row.get("sha256"))
+            return icon if icon is not None else self.thumbnail_loader.placeholder
+        if role == ENTRY_ID_ROLE:
+            return row["id"]
+        if role == ENTRY_TITLE_ROLE:
+            return row["title"]
+        if role == ENTRY_TIMESTAMP_ROLE:
+            return row["timestamp"]
+        if role == ENTRY_TIME_ROLE:
+            return entry_time(row["timestamp"])
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.store is None:
+            return False
+        return bool(self._queued) or self._offset < self.store.manifest.size()
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.store is None:
+            return
+        changes, self._offset = self.store.manifest.read_page(self._offset, PAGE_SIZE)
+        if self._queued is None:
+            self._apply_changes(changes)
+        elif changes:
+            # Saved since the query ran: newer than anything queued
+            self._drop_queued({change["id"] for change in changes})
+            self._apply_changes([c for c in changes
+                                 if c.get("deleted") or c["id"] in self._index or matches(c, self._filter)])
+        else:
+            page, self._queued = self._queued[:PAGE_SIZE], self._queued[PAGE_SIZE:]
+            self._apply_changes(page)
+
+    # --- helpers ---
+
+    def add_entry(self, entry):
+        """Show a just-saved entry without waiting for the view to page it in"""
+        self.add_entries([entry])
+
+    def add_entries(self, entries):
+        """Show a batch of new entries with a single row insert
+
+        With a sort active they are appended; the proxy puts them in place.
+        """
+        rows = [manifest_row(entry) for entry in entries]
+        if self._queued is not None:
+            self._drop_queued({row["id"] for row in rows})
+        for row in [r for r in rows if r["id"] in self._index]:
+            self._update(row)
+        self._append_rows([r for r in rows if r["id"] not in self._index and matches(r, self._filter)])
+
+    def row_for_id(self, entry_id: str) -> Optional[int]:
+        return self._index.get(entry_id)
+
+    def _reload(self, first_page=None):
+        """Start paging the current query from the top
+
+        In manifest order the first page is shown at once. A sort or filter
+        reads and orders the manifest rows on a pool thread; the current
+        rows stay up until the result arrives.
+        """
+        self._filter_timer.stop()
+        self._generation += 1
+        self._querying = False
+        if self.store is not None and (self._sort_field or self._filter):
+            self._querying = True
+            query = partial(run_query, self.store.manifest, self._sort_field, self._descending, self._filter)
+            run_in_background(query, partial(self._on_query_done, self._generation),
+                              partial(self._on_query_failed, self._generation))
+            return
+        self._reset_rows(None, 0)
+        if self.store is None:
+            return
+        if first_page is not None:
+            changes, self._offset = first_page
+            self._apply_changes(changes)
+        else:
+            self.fetchMore()
+
+    def _on_query_done(self, generation: int, result: Tuple[List[Dict], int]):
+        if generation != self._generation:
+            return  # superseded by a later sort, filter or session
+        self._querying = False
+        rows, offset = result
+        self._reset_rows(rows, offset)
+        self.fetchMore()
+
+    def _on_query_failed(self, generation: int, error: Exception):
+        if generation == self._generation:
+            self._querying = False
+            logger.error(f"Entry list query failed: {error}")
+
+    def _reset_rows(self, queued: Optional[List[Dict]], offset: int):
+        self.beginResetModel()
+        self._rows = []
+        self._index = {}
+        self._offset = offset
+        self._queued = queued
+        self.endResetModel()
+
+    def _drop_queued(self, entry_ids):
+        """Forget queued rows that newer changes supersede"""
+        self._queued = [row for row in self._queued if row["id"] not in entry_ids]
+
+    def _apply_changes(self, changes: List[Dict]):
+        pending: Dict[str, Dict] = {}
+        for change in changes:
+            entry_id = change["id"]
+            if change.get("deleted") or entry_id in self._index:
+                # Rows must be in the model before they can change or go away
+                self._append_rows(list(pending.values()))
+                pending = {}
+                if change.get("deleted"):
+                    self._remove(entry_id)
+                else:
+                    self._update(change)
+            else:
+                pending[entry_id] = change
+        self._append_rows(list(pending.values()))
+
+    def _append_rows(self, rows: List[Dict]):
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for row in rows:
+            self._index[row["id"]] = len(self._rows)
+            self._rows.append(row)
+        self.endInsertRows()
+
+    def _update(self, row: Dict):
+        pos = self._index[row["id"]]
+        self._rows[pos] = row
+        idx = self.index(pos)
+        self.dataChanged.emit(idx, idx)
+
+    def _remove(self, entry_id: str):
+        pos = self._index.get(entry_id)
+        if pos is None:
+            return
+        self.beginRemoveRows(QModelIndex(), pos, pos)
+        del self._rows[pos]
+        self._index = {r["id"]: i for i, r in enumerate(self._rows)}
+        self.endRemoveRows()
+
+    def _on_thumbnail_ready(self, entry_id: str, icon):
+        pos = self._index.get(entry_id)
+        if pos is not None:
+            idx = self.index(pos)
+            self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DecorationRole])
+
+
+class EntryFilterProxyModel(QSortFilterProxyModel):
+    """Case-insensitive title/id filter plus sorting on entry roles
+
+    The source model applies the same sort and filter to the whole manifest
+    before paging rows in; the proxy keeps the paged-in rows in that order
+    and places entries added since.
+    """
+
+    SORT_MODES = {
+        "Oldest first": (None, Qt.SortOrder.AscendingOrder),
+        "Newest first": ("timestamp", Qt.SortOrder.DescendingOrder),
+        "Title A–Z": ("title", Qt.SortOrder.AscendingOrder),
+    }
+    SORT_ROLES = {"timestamp": ENTRY_TIME_ROLE, "title": ENTRY_TITLE_ROLE}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.setFilterRole(Qt.ItemDataRole.DisplayRole)
+        self.setSortCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+
+    def set_sort_mode(self, mode: str):
+        """Apply one of SORT_MODES"""
+        field, order = self.SORT_MODES[mode]
+        source = self.sourceModel()
+        if source is not None:
+            source.set_sort(field, order == Qt.SortOrder.DescendingOrder)
+        if field is None:
+            # Manifest order: the source rows are already in it
+            self.sort(-1)
+            return
+        self.setSortRole(self.SORT_ROLES[field])
+        self.sort(0, order)
+
+    def set_filter_text(self, text: str):
+        """Filter by title or id, including rows not paged in yet"""
+        source = self.sourceModel()
+        if source is not None:
+            source.set_filter(text)
+        self.setFilterFixedString(text)
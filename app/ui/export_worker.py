@@ -0,0 +1,53 @@
+"""
+Background report export for the main window
+"""
+import logging
+import threading
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from app.core.export_pipeline import ExportCancelled, run_export
+
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.ExportWorker')
+
+
+class ExportWorker(QThread):
+    """Runs one export pipeline pass off the GUI thread
+
+    Signals are delivered on the GUI thread. cancel() stops the export
+    between entries; previous report files are left untouched.
+    """
+
+    progress = pyqtSignal(int, int)   # entries done, total
+    completed = pyqtSignal(list)      # output paths (str), in sink order
+    failed = pyqtSignal(str)          # error message
+    cancelled = pyqtSignal()
+
+    def __init__(self, store, sinks, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.sinks = list(sinks)
+        self._cancel = threading.Event()
+        self._last_reported = 0
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        try:
+            paths = run_export(self.store, self.sinks, progress=self._report_progress, cancel=self._cancel)
+        except ExportCancelled:
+            logger.info("Export cancelled")
+            self.cancelled.emit()
+        except Exception as e:
+            logger.error("Export failed", exc_info=True)
+            self.failed.emit(str(e))
+        else:
+            self.completed.emit([str(p) for p in paths])
+
+    def _report_progress(self, done: int, total: int):
+        # About 100 updates per export, however many entries it has
+        if done == total or done - self._last_reported >= max(1, total // 100):
+            self._last_reported = done
+            self.progress.emit(done, total)
@@ -0,0 +1,49 @@
+"""
+Watch-folder ingestion for the main window
+"""
+from pathlib import Path
+import logging
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, pyqtSignal
+
+from app.core.ingest import FolderWatcher
+
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.FolderWatch')
+
+
+class FolderWatchController(QObject):
+    """Runs a FolderWatcher and reports results on the GUI thread
+
+    QFileSystemWatcher only pokes the background watcher, which still does
+    its own settle check, so a burst of change notifications costs one scan.
+    Signals are delivered on the GUI thread.
+    """
+
+    entries_ingested = pyqtSignal(list)  # Entry objects, one batch
+    ingest_failed = pyqtSignal(str, str)  # file name, error message
+
+    def __init__(self, store, folder: Path, parent=None, **options):
+        super().__init__(parent)
+        self.folder = Path(folder)
+        self.watcher = FolderWatcher(
+            store, self.folder,
+            on_entries=self.entries_ingested.emit,
+            on_error=lambda path, error: self.ingest_failed.emit(path.name, error),
+            **options
+        )
+        self._fs_watcher = QFileSystemWatcher(self)
+        self._fs_watcher.directoryChanged.connect(lambda _path: self.watcher.poke())
+
+    def start(self):
+        self.watcher.start()
+        if not self._fs_watcher.addPath(str(self.folder)):
+            logger.info(f"No change notifications for {self.folder}; polling only")
+
+    def stop(self):
+        """Stop watching; waits for the file being handled"""
+        self._fs_watcher.removePaths(self._fs_watcher.directories())
+        self.watcher.stop()
+
+    def is_running(self) -> bool:
+        return self.watcher.is_running()
@@ -4,17 +4,18 @@ Main application window with session management
 from pathlib import Path
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QFileDialog, QVBoxLayout, QHBoxLayout, 
-    QPushButton, QLabel, QTextEdit, QComboBox, QListWidget, 
-    QSplitter, QMessageBox, QStatusBar
+    QPushButton, QLabel, QTextEdit, QComboBox, QLineEdit, QCheckBox,
+    QSplitter, QMessageBox, QStatusBar, QListView, QProgressBar
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QSettings, QSize
 from PyQt6.QtGui import QKeySequence, QShortcut
-from PIL import Image
 
-from app.core.storage import SessionStore
-from app.core.models import Entry, ImageModel
 from app.ui.annotation_canvas import AnnotationCanvas, ToolType
 from app.ui.annotation_toolbar import AnnotationToolbar
+from app.ui.entry_model import EntryListModel, EntryFilterProxyModel, ENTRY_ID_ROLE, PAGE_SIZE
+
+# QSettings key holding the folder of the session opened last
+LAST_SESSION_KEY = "session/last"
 
 
 class MainWindow(QMainWindow):
@@ -29,7 +30,13 @@ class MainWindow(QMainWindow):
         self.app_instance = app_instance  # Reference to OverlayAnnotatorApp
         self.session_path = None
         self.store = None
+        self.thumbnail_loader = None
+        self.export_worker = None
+        self.export_interactive = True
+        self.folder_watch = None
+        self.session_loader = None
         self.annotation_toolbar = None
+        self.settings = QSettings("OverlayAnnotator", "OverlayAnnotator")
         
         if self.logger:
             self.logger.debug("MainWindow initializing...")
@@ -54,17 +61,52 @@ class MainWindow(QMainWindow):
         self.btn_capture.setEnabled(False)
         left_layout.addWidget(self.btn_capture)
         
+        # Ingest screenshots other tools drop into a folder
+        self.btn_watch = QPushButton("👁 Watch Folder")
+        self.btn_watch.setCheckable(True)
+        self.btn_watch.toggled.connect(self.toggle_folder_watch)
+        self.btn_watch.setEnabled(False)
+        left_layout.addWidget(self.btn_watch)
+        
         left_layout.addWidget(QLabel("Entries:"))
-        self.entry_list = QListWidget()
-        self.entry_list.itemClicked.connect(self.load_entry)
+        self.entry_filter = QLineEdit()
+        self.entry_filter.setPlaceholderText("Filter by title or id...")
+        left_layout.addWidget(self.entry_filter)
+        
+        self.entry_sort = QComboBox()
+        self.entry_sort.addItems(list(EntryFilterProxyModel.SORT_MODES))
+        left_layout.addWidget(self.entry_sort)
+        
+        # Model/view list: rows are paged in from the session manifest on demand
+        self.entry_model = EntryListModel(self)
+        self.entry_proxy = EntryFilterProxyModel(self)
+        self.entry_proxy.setSourceModel(self.entry_model)
+        self.entry_filter.textChanged.connect(self.entry_proxy.set_filter_text)
+        self.entry_sort.currentTextChanged.connect(self.entry_proxy.set_sort_mode)
+        
+        self.entry_list = QListView()
+        self.entry_list.setModel(self.entry_proxy)
+        self.entry_list.setIconSize(QSize(96, 72))
+        # Uniform rows + batched layout keep the list virtualized for big sessions
+        self.entry_list.setUniformItemSizes(True)
+        self.entry_list.setLayoutMode(QListView.LayoutMode.Batched)
+        self.entry_list.setBatchSize(200)
+        self.entry_list.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.entry_list.clicked.connect(self.load_entry)
         left_layout.addWidget(self.entry_list)
         
         # Export button
         self.btn_export = QPushButton("📤 Export Report")
-        self.btn_export.clicked.connect(self.export_report)
+        self.btn_export.clicked.connect(lambda: self.export_report())
         self.btn_export.setEnabled(False)
         left_layout.addWidget(self.btn_export)
         
+        # Linked HTML: images in an assets/ folder instead of inline base64
+        self.export_linked = QCheckBox("Link images (assets/ folder)")
+        left_layout.addWidget(self.export_linked)
+        self.export_pdf = QCheckBox("Also export PDF")
+        left_layout.addWidget(self.export_pdf)
+        
         left_panel.setLayout(left_layout)
         
         # Center panel: Canvas
@@ -107,6 +149,12 @@ class MainWindow(QMainWindow):
         self.layout_select.addItems(["image-left", "image-top"])
         right_layout.addWidget(self.layout_select)
         
+        right_layout.addWidget(QLabel("Image Format:"))
+        self.codec_select = QComboBox()  # Filled when a session opens
+        self.codec_select.setEnabled(False)
+        self.codec_select.currentTextChanged.connect(self.change_codec)
+        right_layout.addWidget(self.codec_select)
+        
         right_layout.addWidget(QLabel("Title:"))
         self.title_edit = QTextEdit()
         self.title_edit.setPlaceholderText("Enter title...")
@@ -145,6 +193,17 @@ class MainWindow(QMainWindow):
         # Status bar
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
+        
+        # Export progress + cancel, shown only while an export runs
+        self.export_progress = QProgressBar()
+        self.export_progress.setMaximumWidth(200)
+        self.export_progress.hide()
+        self.status_bar.addPermanentWidget(self.export_progress)
+        self.btn_cancel_export = QPushButton("Cancel")
+        self.btn_cancel_export.clicked.connect(self.cancel_export)
+        self.btn_cancel_export.hide()
+        self.status_bar.addPermanentWidget(self.btn_cancel_export)
+        
         self.update_status("Ready. Press Ctrl+Alt+S to capture screen region.")
     
     def setup_shortcuts(self):
@@ -183,55 +242,116 @@ class MainWindow(QMainWindow):
         
         if not path:
             return
+        self.open_session(Path(path))
+    
+    def restore_last_session(self) -> bool:
+        """Reopen the session used last time, if it still exists"""
+        path = self.settings.value(LAST_SESSION_KEY)
+        if not path or not (Path(path) / "metadata").is_dir():
+            return False
+        self.open_session(Path(path))
+        return True
+    
+    def open_session(self, path: Path):
+        """Open a session folder; entries and thumbnails load in the background"""
+        # A running export belongs to the old session
+        if self.export_worker:
+            self.export_worker.cancel()
+            self.export_worker.wait()
+        self.btn_watch.setChecked(False)
+        if self.session_loader:
+            self.session_loader.cancel()
         
         self.session_path = Path(path)
-        self.session_path.mkdir(parents=True, exist_ok=True)
-        (self.session_path / "images").mkdir(exist_ok=True)
-        (self.session_path / "metadata").mkdir(exist_ok=True)
+        self.store = None
+        self.entry_model.set_session(None)
+        if self.thumbnail_loader:
+            # Each session gets its own loader; drop the old one with its pool
+            self.thumbnail_loader.clear()
+            self.thumbnail_loader.deleteLater()
+            self.thumbnail_loader = None
+        for widget in (self.btn_watch, self.btn_export, self.codec_select):
+            widget.setEnabled(False)
+        # Captures only need the screen; saving waits for the store
+        self.btn_capture.setEnabled(True)
         
-        self.store = SessionStore(self.session_path)
-        self.load_session_entries()
+        # Storage (pydantic, PIL codecs) loads on the loader thread, not at startup
+        from app.ui.session_loader import SessionLoader
+        loader = SessionLoader(self.session_path, PAGE_SIZE, parent=self)
+        loader.loaded.connect(lambda store, page: self.on_session_loaded(loader, store, page))
+        loader.failed.connect(lambda message: self.on_session_failed(loader, message))
+        loader.finished.connect(loader.deleteLater)
+        self.session_loader = loader
+        loader.start()
+        self.update_status(f"Loading session: {self.session_path.name}...")
+    
+    def on_session_loaded(self, loader, store, first_page):
+        """Attach a session opened by the loader thread"""
+        if loader is not self.session_loader:
+            return  # superseded by a later open_session()
+        self.session_loader = None
+        from app.ui.thumbnail_loader import ThumbnailLoader
+        self.store = store
+        self.thumbnail_loader = ThumbnailLoader(self.store, parent=self)
+        self.entry_model.set_session(self.store, self.thumbnail_loader, first_page)
+        self.entry_proxy.set_sort_mode(self.entry_sort.currentText())
+        
+        # Reflect the session's image format without re-saving it
+        self.codec_select.blockSignals(True)
+        if not self.codec_select.count():
+            from app.core.codecs import codec_names
+            self.codec_select.addItems(codec_names())
+        self.codec_select.setCurrentText(self.store.codec)
+        self.codec_select.blockSignals(False)
         
         # Enable buttons
         self.btn_capture.setEnabled(True)
+        self.btn_watch.setEnabled(True)
         self.btn_export.setEnabled(True)
+        self.codec_select.setEnabled(True)
         
+        self.settings.setValue(LAST_SESSION_KEY, str(self.session_path))
         self.update_status(f"Session loaded: {self.session_path.name}")
     
-    def load_session_entries(self):
-        """Load existing entries from session"""
+    def on_session_failed(self, loader, message: str):
+        if loader is not self.session_loader:
+            return
+        self.session_loader = None
+        self.btn_capture.setEnabled(False)
+        if self.settings.value(LAST_SESSION_KEY) == str(self.session_path):
+            self.settings.remove(LAST_SESSION_KEY)
+        self.update_status(f"Could not open session {self.session_path.name}: {message}")
+        self.session_path = None
+    
+    def change_codec(self, codec: str):
+        """Switch the image format used for new captures in this session"""
         if not self.store:
             return
-        
-        self.entry_list.clear()
-        entries = self.store.load_entries()
-        
-        for entry in entries:
-            self.entry_list.addItem(f"{entry.id} — {entry.title}")
+        self.store.set_codec(codec)
+        self.update_status(f"Image format: {codec}")
     
-    def load_entry(self, item):
+    def load_entry(self, index):
         """Load selected entry into canvas"""
         if not self.store:
             return
         
-        entry_id = item.text().split(" — ")[0]
-        entries = self.store.load_entries()
-        
-        for entry in entries:
-            if entry.id == entry_id:
-                # Load image
-                img_path = self.session_path / entry.image.path
-                if img_path.exists():
-                    pil_img = Image.open(img_path)
-                    self.canvas.load_pil(pil_img)
-                    
-                    # Load metadata
-                    self.title_edit.setPlainText(entry.title)
-                    self.notes_edit.setPlainText(entry.notes)
-                    self.layout_select.setCurrentText(entry.layout)
-                    
-                    self.update_status(f"Loaded entry: {entry.title}")
-                break
+        entry = self.store.load_entry(index.data(ENTRY_ID_ROLE))
+        if entry is None:
+            return
+        
+        # Load image
+        img_path = self.session_path / entry.image.path
+        if img_path.exists():
+            from PIL import Image
+            pil_img = Image.open(img_path)
+            self.canvas.load_pil(pil_img)
+            
+            # Load metadata
+            self.title_edit.setPlainText(entry.title)
+            self.notes_edit.setPlainText(entry.notes)
+            self.layout_select.setCurrentText(entry.layout)
+            
+            self.update_status(f"Loaded entry: {entry.title}")
     
     def trigger_capture(self):
         """Manually trigger capture (for testing without hotkey)"""
@@ -244,13 +364,13 @@ class MainWindow(QMainWindow):
             if self.logger:
                 self.logger.error("App instance not set - cannot trigger capture")
     
-    def handle_captured_region(self, pil_img: Image.Image):
+    def handle_captured_region(self, pil_img):
         """Handle captured screen region"""
         try:
             if self.logger:
                 self.logger.info(f"Handling captured region: {pil_img.width}x{pil_img.height}")
             
-            if not self.store:
+            if not self.session_path:
                 if self.logger:
                     self.logger.warning("No session - cannot handle captured region")
                 QMessageBox.warning(self, "No Session", "Please create a session first.")
@@ -348,10 +468,15 @@ class MainWindow(QMainWindow):
     
     def save_entry(self):
         """Save annotated entry"""
+        if self.session_loader and self.canvas.pil_image is not None:
+            self.update_status("Session still loading - save again in a moment")
+            return
         if not self.store or self.canvas.pil_image is None:
             self.update_status("Nothing to save")
             return
         
+        from app.core.models import Entry, ImageModel
+        
         # Render annotated image
         pil = self.canvas.render_annotated()
         
@@ -364,11 +489,12 @@ class MainWindow(QMainWindow):
             notes=self.notes_edit.toPlainText().strip(),
             layout=self.layout_select.currentText(),
             image=ImageModel(
-                path=str(img_rel_path),
+                path=img_rel_path.as_posix(),
                 width=pil.width,
                 height=pil.height,
                 quality=None,
-                hires=False
+                hires=False,
+                sha256=self.store.image_hash(img_rel_path)
             ),
         )
         
@@ -376,7 +502,7 @@ class MainWindow(QMainWindow):
         self.store.save_entry(entry)
         
         # Update list
-        self.entry_list.addItem(f"{entry.id} — {entry.title}")
+        self.entry_model.add_entry(entry)
         
         # Clear form
         self.title_edit.clear()
@@ -395,49 +521,172 @@ class MainWindow(QMainWindow):
             f"Entry '{entry.title}' saved successfully!"
         )
     
-    def export_report(self):
-        """Export session report as both Markdown and HTML"""
+    def toggle_folder_watch(self, enabled: bool):
+        """Start or stop ingesting images dropped into a folder"""
+        if not enabled:
+            if self.folder_watch:
+                self.folder_watch.stop()
+                self.folder_watch.deleteLater()
+                self.folder_watch = None
+                self.btn_watch.setText("👁 Watch Folder")
+                self.update_status("Stopped watching folder")
+            return
+        
         if not self.store:
+            self.btn_watch.setChecked(False)
+            return
+        folder = QFileDialog.getExistingDirectory(self, "Choose Folder to Watch", str(self.session_path.parent))
+        if not folder:
+            self.btn_watch.setChecked(False)
             return
         
-        try:
-            # Export both formats
-            md_path = self.store.export_markdown()
-            html_path = self.store.export_html()
-            
-            self.update_status(f"Reports exported: {md_path.name} & {html_path.name}")
-            
-            # Ask user which one to open
-            reply = QMessageBox.question(
-                self,
-                "Export Complete",
-                f"Reports exported successfully!\n\n"
-                f"📄 Markdown: {md_path}\n"
-                f"🌐 HTML: {html_path}\n\n"
-                f"Open HTML report in browser?",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
-                QMessageBox.StandardButton.Yes
-            )
-            
-            if reply == QMessageBox.StandardButton.Yes:
-                import webbrowser
-                webbrowser.open(str(html_path.absolute()))
-                
-        except Exception as e:
-            if self.logger:
-                self.logger.error("Export failed", exc_info=True)
-            QMessageBox.critical(
-                self,
-                "Export Failed",
-                f"Failed to export report:\n{str(e)}"
-            )
+        from app.ui.folder_watch import FolderWatchController
+        self.folder_watch = FolderWatchController(self.store, Path(folder), parent=self)
+        self.folder_watch.entries_ingested.connect(self.on_entries_ingested)
+        self.folder_watch.ingest_failed.connect(
+            lambda name, error: self.update_status(f"Could not ingest {name}: {error}")
+        )
+        self.folder_watch.start()
+        self.btn_watch.setText(f"👁 Watching {Path(folder).name}")
+        self.update_status(f"Watching {folder} for new screenshots")
+    
+    def on_entries_ingested(self, entries: list):
+        """Show entries created from the watched folder"""
+        self.entry_model.add_entries(entries)
+        self.update_status(f"Ingested {len(entries)} screenshot(s); latest: {entries[-1].title}")
+    
+    def show_saved_entry(self, store, entry) -> bool:
+        """Add an entry saved in the background to the list (unless the session changed since)"""
+        if store is not self.store:
+            return False
+        self.entry_model.add_entry(entry)
+        self.update_status(f"Entry saved: {entry.title}")
+        return True
+    
+    def export_report(self, interactive: bool = True, formats=None, mode: str = None) -> bool:
+        """Export session reports in one background pass
+
+        Defaults to Markdown, HTML and JSON plus PDF when ticked; scripted
+        exports (interactive=False) skip the completion dialog.
+        """
+        if not self.store or self.export_worker:
+            return False
+        
+        from app.core.export_pipeline import HtmlSink, JsonSink, MarkdownSink
+        from app.ui.export_worker import ExportWorker
+        if formats is None:
+            formats = ["md", "html", "json"] + (["pdf"] if self.export_pdf.isChecked() else [])
+        mode = mode or ("linked" if self.export_linked.isChecked() else "embedded")
+        sinks = []
+        for fmt in formats:
+            if fmt == "md":
+                sinks.append(MarkdownSink(self.store))
+            elif fmt == "html":
+                sinks.append(HtmlSink(self.store, mode=mode))
+            elif fmt == "json":
+                sinks.append(JsonSink(self.store))
+            elif fmt == "pdf":
+                from app.core.pdf_export import PdfSink
+                sinks.append(PdfSink(self.store))
+            else:
+                raise ValueError(f"Unknown export format: {fmt}")
+        self.export_interactive = interactive
+        
+        self.export_worker = ExportWorker(self.store, sinks, parent=self)
+        self.export_worker.progress.connect(self.report_export_progress)
+        self.export_worker.completed.connect(self.on_export_completed)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_worker.cancelled.connect(lambda: self.update_status("Export cancelled"))
+        self.export_worker.finished.connect(self.on_export_finished)
+        
+        self.btn_export.setEnabled(False)
+        self.export_progress.setRange(0, 0)
+        self.export_progress.show()
+        self.btn_cancel_export.show()
+        self.update_status("Exporting report...")
+        self.export_worker.start()
+        return True
+    
+    def cancel_export(self):
+        """Stop a running export; existing report files are kept"""
+        if self.export_worker:
+            self.btn_cancel_export.setEnabled(False)
+            self.export_worker.cancel()
+    
+    def on_export_completed(self, paths: list):
+        """Report finished exports and offer to open the HTML report"""
+        paths = [Path(p) for p in paths]
+        self.update_status("Reports exported: " + ", ".join(p.name for p in paths))
+        html_path = next((p for p in paths if p.suffix == ".html"), None)
+        if not self.export_interactive or html_path is None:
+            return
+        
+        # Ask user which one to open
+        icons = {".md": "📄 Markdown", ".html": "🌐 HTML", ".json": "🗂 JSON", ".pdf": "📕 PDF"}
+        listing = "\n".join(f"{icons.get(p.suffix, p.suffix)}: {p}" for p in paths)
+        reply = QMessageBox.question(
+            self,
+            "Export Complete",
+            f"Reports exported successfully!\n\n"
+            f"{listing}\n\n"
+            f"Open HTML report in browser?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes
+        )
+        
+        if reply == QMessageBox.StandardButton.Yes:
+            import webbrowser
+            webbrowser.open(str(html_path.absolute()))
+    
+    def on_export_failed(self, message: str):
+        """Show an export error (already logged by the worker)"""
+        self.update_status("Export failed")
+        if not self.export_interactive:
+            return
+        QMessageBox.critical(
+            self,
+            "Export Failed",
+            f"Failed to export report:\n{message}"
+        )
+    
+    def on_export_finished(self):
+        """Reset export controls once the worker thread has stopped"""
+        self.export_worker.deleteLater()
+        self.export_worker = None
+        self.export_progress.hide()
+        self.btn_cancel_export.hide()
+        self.btn_cancel_export.setEnabled(True)
+        self.btn_export.setEnabled(self.store is not None)
+    
+    def report_export_progress(self, done: int, total: int):
+        """Show export progress while the report is being written"""
+        self.export_progress.setRange(0, total)
+        self.export_progress.setValue(done)
+        self.update_status(f"Exporting report... {done}/{total} entries")
     
     def update_status(self, message: str):
         """Update status bar"""
         self.status_bar.showMessage(message)
     
     def closeEvent(self, event):
-        """Handle window close"""
+        """Handle window close (only hides it when the app stays resident)"""
+        if getattr(self.app_instance, "resident", False):
+            self.hide()
+            event.ignore()
+            return
+        self.shutdown()
+        event.accept()
+
+    def shutdown(self):
+        """Stop background work; safe to call more than once"""
+        if self.session_loader:
+            self.session_loader.cancel()
+            self.session_loader.wait()
+            self.session_loader = None
+        if self.folder_watch:
+            self.folder_watch.stop()
+        if self.export_worker:
+            self.export_worker.cancel()
+            self.export_worker.wait()
         if self.annotation_toolbar:
             self.annotation_toolbar.close()
-        event.accept()
@@ -0,0 +1,71 @@
+"""
+Background session opening for the main window
+"""
+from pathlib import Path
+import logging
+import threading
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from app.core.thumbnails import DEFAULT_THUMBNAIL_SIZE
+
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.SessionLoader')
+
+# Thumbnails generated up front: about one screenful of the entry list
+PREFETCH_THUMBNAILS = 24
+
+
+class SessionLoader(QThread):
+    """Opens a session off the GUI thread
+
+    Creates the folder layout, constructs the SessionStore (importing the
+    storage stack on first use), builds the manifest if it is missing,
+    reads the first page of entry rows and warms the thumbnail cache for
+    them. The window stays interactive meanwhile; signals are delivered on
+    the GUI thread.
+    """
+
+    loaded = pyqtSignal(object, object)  # SessionStore, (rows, offset) first manifest page
+    failed = pyqtSignal(str)             # error message
+
+    def __init__(self, session_path: Path, page_size: int, parent=None):
+        super().__init__(parent)
+        self.session_path = Path(session_path)
+        self.page_size = page_size
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Skip the remaining steps; nothing is emitted after cancelling"""
+        self._cancel.set()
+
+    def run(self):
+        try:
+            for sub in ("images", "metadata"):
+                (self.session_path / sub).mkdir(parents=True, exist_ok=True)
+            from app.core.storage import SessionStore
+            store = SessionStore(self.session_path)
+            if self._cancel.is_set():
+                return
+            page = store.ensure_manifest().read_page(0, self.page_size)
+            self._prefetch_thumbnails(store, page[0])
+        except Exception as e:
+            logger.error(f"Could not open session {self.session_path}", exc_info=True)
+            if not self._cancel.is_set():
+                self.failed.emit(str(e))
+            return
+        if not self._cancel.is_set():
+            self.loaded.emit(store, page)
+
+    def _prefetch_thumbnails(self, store, rows):
+        for row in rows[:PREFETCH_THUMBNAILS]:
+            if self._cancel.is_set():
+                return
+            if row.get("deleted") or not row.get("image"):
+                continue
+            try:
+                image_hash = row.get("sha256") or store.image_hash(row["image"])
+                if image_hash:
+                    store.thumbnails.get_or_create(store.root / row["image"], image_hash, DEFAULT_THUMBNAIL_SIZE)
+            except Exception:
+                logger.debug(f"Thumbnail prefetch skipped {row['image']}", exc_info=True)
@@ -0,0 +1,117 @@
+"""
+Background thumbnail loading for the entry list
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import logging
+
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QIcon, QPixmap
+
+from app.core.thumbnails import DEFAULT_THUMBNAIL_SIZE
+
+# Module logger
+logger = logging.getLogger('OverlayAnnotator.ThumbnailLoader')
+
+# Decoded icons kept in memory; everything else is reloaded from the disk cache
+MAX_CACHED_ICONS = 512
+
+
+class _TaskSignals(QObject):
+    finished = pyqtSignal(str, str)  # key, thumbnail path ("" on failure)
+
+
+class _ThumbnailTask(QRunnable):
+    """Generate (or find) one cached thumbnail on a pool thread"""
+
+    def __init__(self, store, key: str, image_path: str, image_hash: Optional[str], size: int, signals):
+        super().__init__()
+        self.store = store
+        self.key = key
+        self.image_path = image_path
+        self.image_hash = image_hash
+        self.size = size
+        self.signals = signals
+
+    def run(self):
+        try:
+            image_hash = self.image_hash or self.store.image_hash(self.image_path)
+            if image_hash is None:
+                self.signals.finished.emit(self.key, "")
+                return
+            thumb = self.store.thumbnails.get_or_create(
+                self.store.root / self.image_path, image_hash, self.size
+            )
+            self.signals.finished.emit(self.key, str(thumb))
+        except Exception:
+            logger.warning(f"Thumbnail failed for {self.image_path}", exc_info=True)
+            self.signals.finished.emit(self.key, "")
+
+
+class ThumbnailLoader(QObject):
+    """Loads entry thumbnails in a thread pool and caches the icons
+
+    Call request() for items that are on screen; thumbnail_ready fires on
+    the GUI thread once the icon is available.
+    """
+
+    thumbnail_ready = pyqtSignal(str, QIcon)  # key, icon
+
+    def __init__(self, store, size: int = DEFAULT_THUMBNAIL_SIZE, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.size = size
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, min(4, QThreadPool.globalInstance().maxThreadCount() - 1)))
+        self._icons: "OrderedDict[str, QIcon]" = OrderedDict()
+        self._pending = set()
+        self._signals = _TaskSignals()
+        self._signals.finished.connect(self._on_finished)
+        
+        # Blank icon shown until the real thumbnail arrives, so rows keep their height
+        blank = QPixmap(size, size)
+        blank.fill(Qt.GlobalColor.transparent)
+        self.placeholder = QIcon(blank)
+
+    def icon(self, key: str) -> Optional[QIcon]:
+        """Icon if already loaded, without scheduling any work"""
+        icon = self._icons.get(key)
+        if icon is not None:
+            self._icons.move_to_end(key)
+        return icon
+
+    def request(self, key: str, image_path: str, image_hash: Optional[str] = None) -> Optional[QIcon]:
+        """Return the icon if loaded, otherwise schedule it in the background"""
+        icon = self.icon(key)
+        if icon is not None or key in self._pending:
+            return icon
+
+        # Fast path: thumbnail already on disk from an earlier run
+        if image_hash:
+            cached = self.store.thumbnails.get(image_hash, self.size)
+            if cached is not None:
+                return self._remember(key, str(cached))
+
+        self._pending.add(key)
+        self.pool.start(_ThumbnailTask(self.store, key, image_path, image_hash, self.size, self._signals))
+        return None
+
+    def clear(self):
+        """Drop queued work and cached icons (e.g. when switching sessions)"""
+        self.pool.clear()
+        self._pending.clear()
+        self._icons.clear()
+
+    def _remember(self, key: str, thumb_path: str) -> QIcon:
+        icon = QIcon(QPixmap(thumb_path))
+        self._icons[key] = icon
+        while len(self._icons) > MAX_CACHED_ICONS:
+            self._icons.popitem(last=False)
+        return icon
+
+    def _on_finished(self, key: str, thumb_path: str):
+        self._pending.discard(key)
+        if not thumb_path or not Path(thumb_path).exists():
+            return
+        self.thumbnail_ready.emit(key, self._remember(key, thumb_path))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark image codec presets on a sample corpus
+
+Usage:
+  python benchmarks/bench_codecs.py                 # synthetic corpus
+  python benchmarks/bench_codecs.py <image_dir>     # your own screenshots
+"""
+import sys
+import time
+import random
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.core.codecs import CODECS, choose_codec, get_codec
+
+REPEAT = 3
+
+
+def synthetic_corpus():
+    """Generate screenshots that resemble typical captures"""
+    rnd = random.Random(42)
+    corpus = {}
+
+    # Flat UI: few colors, hard edges
+    ui = Image.new("RGB", (1600, 900), (245, 245, 245))
+    d = ImageDraw.Draw(ui)
+    d.rectangle([0, 0, 1600, 60], fill=(102, 126, 234))
+    for i in range(12):
+        y = 90 + i * 60
+        d.rectangle([40, y, 1560, y + 44], outline=(200, 200, 200), fill=(255, 255, 255))
+        d.text((60, y + 14), f"Row {i}: status OK, latency {rnd.randint(1, 999)} ms", fill=(30, 30, 30))
+    corpus["flat-ui"] = ui
+
+    # Anti-aliased UI: text rendered then softened, many intermediate tones
+    corpus["text-ui"] = ui.filter(ImageFilter.GaussianBlur(0.6))
+
+    # Photographic content: smooth gradients plus noise
+    gradient = Image.linear_gradient("L").resize((1600, 900))
+    channels = [gradient, gradient.rotate(90, expand=False), Image.effect_noise((1600, 900), 60)]
+    corpus["photo"] = Image.merge("RGB", channels).filter(ImageFilter.GaussianBlur(1.5))
+    return corpus
+
+
+def load_corpus(folder: Path):
+    corpus = {}
+    for p in sorted(folder.iterdir()):
+        if p.suffix.lower() in (".png", ".jpg", ".jpeg", ".webp", ".bmp"):
+            with Image.open(p) as img:
+                corpus[p.name] = img.convert("RGB")
+    return corpus
+
+
+def bench(codec, img):
+    encode = decode = 0.0
+    data = b""
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        data = codec.encode(img)
+        t1 = time.perf_counter()
+        with Image.open(BytesIO(data)) as decoded:
+            decoded.load()
+        t2 = time.perf_counter()
+        encode += t1 - t0
+        decode += t2 - t1
+    return encode / REPEAT * 1000, decode / REPEAT * 1000, len(data)
+
+
+def main():
+    corpus = load_corpus(Path(sys.argv[1])) if len(sys.argv) > 1 else synthetic_corpus()
+    if not corpus:
+        print("No images found")
+        return 1
+
+    print(f"{'image':<20} {'codec':<15} {'encode ms':>10} {'decode ms':>10} {'KB':>10}")
+    print("-" * 69)
+    totals = {}
+    for name, img in corpus.items():
+        auto = choose_codec(img).name
+        for codec_name in CODECS:
+            codec = get_codec(codec_name)
+            enc, dec, size = bench(codec, img)
+            t = totals.setdefault(codec_name, [0.0, 0.0, 0])
+            t[0] += enc
+            t[1] += dec
+            t[2] += size
+            marker = " *" if codec_name == auto else ""
+            print(f"{name[:20]:<20} {codec_name:<15} {enc:>10.1f} {dec:>10.1f} {size / 1024:>10.1f}{marker}")
+    print("-" * 69)
+    for codec_name, (enc, dec, size) in totals.items():
+        print(f"{'TOTAL':<20} {codec_name:<15} {enc:>10.1f} {dec:>10.1f} {size / 1024:>10.1f}")
+    print("\n* = codec chosen by auto mode")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Export throughput: thread pool vs process pool
+
+Builds a synthetic session and times a cold HTML + JSON + NDJSON export
+(fragment cache cleared before every run) with run_export on one worker,
+on a thread pool and on a process pool. Per-entry work (template render,
+base64, JSON dumps) mostly holds the GIL, so threads add little; processes
+scale with cores, minus the cost of starting them.
+
+Usage:
+  python benchmarks/bench_export.py
+  python benchmarks/bench_export.py --entries 400 --workers 4
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw
+
+from app.core.export_pipeline import HtmlSink, JsonSink, NdjsonSink, run_export
+from app.core.models import Entry, ImageModel
+from app.core.parallel import default_workers
+from app.core.storage import SessionStore
+
+
+def build_session(root: Path, count: int) -> SessionStore:
+    store = SessionStore(root, codec="png")
+    for i in range(count):
+        # UI-like capture with a photo-like strip, so files are a realistic size
+        img = Image.new("RGB", (1600, 900), (245, 245, 245))
+        img.paste(Image.effect_noise((1600, 300), 40).convert("RGB"), (0, 600))
+        draw = ImageDraw.Draw(img)
+        for row in range(10):
+            draw.rectangle([20, 20 + row * 55, 1580, 60 + row * 55], outline=(200, 200, 200), fill=(255, 255, 255))
+            draw.text((30, 32 + row * 55), f"Entry {i} row {row}", fill=(30, 30, 30))
+        path = store.save_image(img)
+        store.save_entry(Entry.new(
+            title=f"Entry {i}", notes="Observed behaviour\n" * 20, layout="image-left",
+            image=ImageModel(path=path.as_posix(), width=img.width, height=img.height,
+                             sha256=store.image_hash(path)),
+        ))
+    return store
+
+
+def export_once(store: SessionStore, workers: int, executor: str) -> float:
+    shutil.rmtree(store.cache_dir / "fragments", ignore_errors=True)
+    sinks = [HtmlSink(store), JsonSink(store), NdjsonSink(store, image="inline")]
+    t0 = time.perf_counter()
+    run_export(store, sinks, workers=workers, executor=executor)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    setups = [("inline", 1, "thread"), ("threads", args.workers, "thread"), ("processes", args.workers, "process")]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = build_session(Path(tmp), args.entries)
+        results = {}
+        for name, workers, executor in setups:
+            export_once(store, workers, executor)  # warm up (template bytecode, page cache)
+            results[name] = statistics.median(export_once(store, workers, executor) for _ in range(args.runs))
+
+    print(f"cold HTML+JSON+NDJSON export, {args.entries} entries, {args.workers} workers, "
+          f"{os.cpu_count()} CPUs")
+    base = results["inline"]
+    for name, seconds in results.items():
+        print(f"{name:10} {seconds * 1000:8.0f}ms  {base / seconds:5.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
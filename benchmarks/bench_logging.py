@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Logging overhead on capture-to-canvas latency
+
+Times the GUI-thread path from a selected region to a loaded canvas (PNG
+crop decoded by PIL, handed to AnnotationCanvas.load_pil, with the log
+lines the app emits on the way) under several logging setups:
+
+  off           app loggers at WARNING: hot-path debug calls are skipped
+  queued-info   setup_logging() defaults: INFO through the queue listener
+  queued-debug  setup_logging(level="DEBUG")
+  sync-debug    the old setup: root at DEBUG, FileHandler + console on the caller's thread
+
+--disk-latency-ms adds a delay to every file write, as on a slow or
+network home directory, which is where synchronous logging hurts.
+
+Usage:
+  python benchmarks/bench_logging.py
+  python benchmarks/bench_logging.py --runs 200 --disk-latency-ms 5
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+if sys.platform.startswith("linux") and not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PIL import Image, ImageDraw
+from PyQt6.QtWidgets import QApplication
+
+from app.core import logger as app_logging
+from app.ui.annotation_canvas import AnnotationCanvas
+
+SETUPS = ("off", "queued-info", "queued-debug", "sync-debug")
+
+
+class SlowFileHandler(logging.FileHandler):
+    """FileHandler whose writes take `delay` seconds longer"""
+
+    def __init__(self, path, delay: float):
+        super().__init__(path, encoding="utf-8")
+        self.delay = delay
+
+    def emit(self, record):
+        if self.delay:
+            time.sleep(self.delay)
+        super().emit(record)
+
+
+def sample_capture() -> bytes:
+    """PNG bytes of a 1600x900 UI-like region, as the overlay produces them"""
+    img = Image.new("RGB", (1600, 900), (245, 245, 245))
+    draw = ImageDraw.Draw(img)
+    for i in range(14):
+        draw.rectangle([40, 40 + i * 60, 1560, 84 + i * 60], outline=(200, 200, 200), fill=(255, 255, 255))
+        draw.text((60, 54 + i * 60), f"Row {i}: status OK", fill=(30, 30, 30))
+    buffer = BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def configure(setup: str, log_dir: Path, delay: float, console):
+    """Install one logging setup; returns a function that tears it down"""
+    root = logging.getLogger()
+    app = logging.getLogger("OverlayAnnotator")
+    if setup == "sync-debug":
+        app_logging.stop_logging()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        formatter = logging.Formatter(app_logging.LOG_FORMAT)
+        handlers = [SlowFileHandler(log_dir / "sync.log", delay), logging.StreamHandler(console)]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+        app.setLevel(logging.NOTSET)
+
+        def teardown():
+            for handler in handlers:
+                root.removeHandler(handler)
+                handler.close()
+        return teardown
+
+    level = {"off": "WARNING", "queued-info": "INFO", "queued-debug": "DEBUG"}[setup]
+    stdout, sys.stdout = sys.stdout, console  # the console handler binds sys.stdout
+    try:
+        app_logging.setup_logging(log_dir, level=level)
+    finally:
+        sys.stdout = stdout
+    if delay:
+        # Slow down the listener's file writes the same way
+        listener = app_logging._listener
+        slow = SlowFileHandler(listener.handlers[0].baseFilename, delay)
+        slow.setFormatter(listener.handlers[0].formatter)
+        listener.handlers = (slow,) + tuple(listener.handlers[1:])
+    return app_logging.stop_logging
+
+
+def capture_to_canvas(canvas: AnnotationCanvas, png: bytes, log: logging.Logger):
+    pil_img = Image.open(BytesIO(png))
+    log.info(f"Handling captured region: {pil_img.width}x{pil_img.height}")
+    log.debug("Loading image into canvas...")
+    canvas.load_pil(pil_img)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=60)
+    parser.add_argument("--disk-latency-ms", type=float, default=0.0, help="extra delay per file write")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    canvas = AnnotationCanvas()
+    png = sample_capture()
+    log = logging.getLogger("OverlayAnnotator.MainWindow")
+    delay = args.disk_latency_ms / 1000
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as console:
+        for setup in SETUPS:
+            teardown = configure(setup, Path(tmp), delay, console)
+            try:
+                capture_to_canvas(canvas, png, log)  # warm up
+                times = []
+                for _ in range(args.runs):
+                    t0 = time.perf_counter()
+                    capture_to_canvas(canvas, png, log)
+                    times.append((time.perf_counter() - t0) * 1000)
+                    app.processEvents()
+            finally:
+                teardown()
+            times.sort()
+            results[setup] = (statistics.median(times), times[int(len(times) * 0.95) - 1])
+
+    base = results["off"][0]
+    print(f"capture-to-canvas, 1600x900 PNG, {args.runs} runs, disk latency {args.disk_latency_ms:g} ms")
+    print(f"{'setup':14} {'median':>9} {'p95':>9} {'overhead':>9}")
+    for setup, (median, p95) in results.items():
+        print(f"{setup:14} {median:7.2f}ms {p95:7.2f}ms {median - base:+7.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: save and load entry metadata under each JSON backend
+
+Usage:
+  python benchmarks/bench_serialization.py [count]     # default 10000 entries
+"""
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.models import Entry, ImageModel
+from app.core.serialization import BACKENDS, dump_entry, load_entry, resolve_backend
+from app.core.storage import SessionStore
+
+
+def make_entries(count):
+    entries = []
+    for i in range(count):
+        entry = Entry.new(
+            title=f"Finding {i}: login form accepts weak passwords",
+            notes="Steps to reproduce:\n1. Open the login page\n2. Submit a short password\n" * 3,
+            layout="image-left",
+            image=ImageModel(path=f"images/ab/{i:064x}.webp", width=1920, height=1080, sha256=f"{i:064x}"),
+        )
+        entry.tags = ["auth", "web"]
+        entry.context = {"url": "https://example.test/login", "browser": "firefox"}
+        entries.append(entry)
+    return entries
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    entries = make_entries(count)
+
+    print(f"{count} entries")
+    print("encode/decode: in memory; save/load: through SessionStore on disk")
+    print(f"{'backend':<10} {'pretty':<7} {'encode s':>9} {'decode s':>9} {'save s':>8} {'load s':>8} {'KB':>10}")
+    print("-" * 67)
+    for backend in BACKENDS:
+        if resolve_backend(backend) != backend:
+            print(f"{backend:<10} (not installed, skipped)")
+            continue
+        for pretty in (True, False):
+            t0 = time.perf_counter()
+            blobs = [dump_entry(entry, backend, pretty) for entry in entries]
+            t1 = time.perf_counter()
+            for blob in blobs:
+                load_entry(blob, backend)
+            t2 = time.perf_counter()
+            encode, decode = t1 - t0, t2 - t1
+
+            with tempfile.TemporaryDirectory() as tmpdir:
+                store = SessionStore(Path(tmpdir), json_backend=backend, pretty_json=pretty)
+
+                t0 = time.perf_counter()
+                for entry in entries:
+                    store.save_entry(entry)
+                t1 = time.perf_counter()
+                loaded = store.load_entries()
+                t2 = time.perf_counter()
+
+                assert len(loaded) == count
+                size = sum(p.stat().st_size for p in store.meta.glob("*.json"))
+                print(f"{backend:<10} {str(pretty):<7} {encode:>9.3f} {decode:>9.3f} "
+                      f"{t1 - t0:>8.3f} {t2 - t1:>8.3f} {size / 1024:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: import cost of app.main and time to a visible window
+
+Each run is a fresh interpreter. Imports are measured with -X importtime;
+launch-to-window is wall time from spawning the process until the main
+window has been shown and painted once. Modules that should load on first
+use (export, capture, storage) are reported if they show up at startup.
+
+Usage:
+  python benchmarks/bench_startup.py                  # 5 runs
+  python benchmarks/bench_startup.py --runs 10 --top 15
+  python benchmarks/bench_startup.py --budget-ms 600  # exit 1 if the median window time is slower
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Must not be imported before the window is up
+DEFERRED_MODULES = ("jinja2", "mss", "pydantic", "PIL", "app.core.storage", "app.core.export_pipeline")
+
+WINDOW_SCRIPT = """
+from app.main import OverlayAnnotatorApp
+app = OverlayAnnotatorApp()
+app.main_window.show()
+app.app.processEvents()
+print("WINDOW_SHOWN", flush=True)
+"""
+
+
+def child_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    if sys.platform.startswith("linux") and not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def import_profile():
+    """(module, self µs, cumulative µs) rows from one -X importtime run"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import app.main failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def time_to_window():
+    """Seconds from process spawn to the main window being shown"""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", WINDOW_SCRIPT],
+        cwd=ROOT, env=child_env(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        for line in proc.stdout:
+            if line.startswith("WINDOW_SHOWN"):
+                return time.perf_counter() - t0
+        raise RuntimeError("window was never shown")
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="heaviest modules to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if median launch-to-window exceeds this")
+    args = parser.parse_args()
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    totals = [next(cum for name, _, cum in rows if name == "app.main") / 1000 for rows in profiles]
+    window = [time_to_window() * 1000 for _ in range(args.runs)]
+
+    print(f"import app.main      median {statistics.median(totals):7.1f} ms   (min {min(totals):.1f})")
+    print(f"launch to window     median {statistics.median(window):7.1f} ms   (min {min(window):.1f})")
+
+    rows = min(profiles, key=lambda r: next(cum for name, _, cum in r if name == "app.main"))
+    print(f"\nHeaviest imports (self time, fastest run):")
+    for name, self_us, cum_us in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:7.1f} ms  (cumulative {cum_us / 1000:7.1f})  {name}")
+
+    loaded = {name for name, _, _ in rows}
+    early = [m for m in DEFERRED_MODULES if m in loaded]
+    if early:
+        print(f"\nWARNING: imported at startup but meant to load on first use: {', '.join(early)}")
+    else:
+        print(f"\nDeferred until first use: {', '.join(DEFERRED_MODULES)}")
+
+    if args.budget_ms is not None and statistics.median(window) > args.budget_ms:
+        print(f"FAIL: launch to window exceeds {args.budget_ms:.0f} ms budget")
+        return 1
+    return 1 if early else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,20 +19,15 @@ def test_html_generation(session_path):
     # Load session
     store = SessionStore(session_path)
     
-    # Check templates exist
+    # Check templates (session copies override the package defaults)
     print("\n1. Checking templates...")
     md_template = store.tpl_dir / "report.md.j2"
     html_template = store.tpl_dir / "report.html.j2"
     
-    print(f"   MD template: {md_template.exists()} - {md_template}")
-    print(f"   HTML template: {html_template.exists()} - {html_template}")
-    
+    print(f"   MD template override: {md_template.exists()} - {md_template}")
+    print(f"   HTML template override: {html_template.exists()} - {html_template}")
     if not html_template.exists():
-        print("   ❌ HTML template missing! Creating it...")
-        from app.core.storage import SessionStore
-        # Re-init will create template
-        store = SessionStore(session_path)
-        print(f"   ✓ Template created: {html_template.exists()}")
+        print("   Using built-in HTML template")
     
     # Load entries
     print("\n2. Loading entries...")
@@ -67,7 +62,7 @@ def test_html_generation(session_path):
         print(f"   HTML length: {len(html_content)} characters")
         
         # Check for embedded images
-        base64_count = html_content.count('data:image/jpeg;base64,')
+        base64_count = html_content.count(';base64,')
         print(f"   Embedded images: {base64_count}")
         
         if base64_count != len(entries):
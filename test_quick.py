@@ -89,6 +89,1952 @@ def test_session_storage():
         traceback.print_exc()
         return False
 
+def test_image_codecs():
+    """Test codec presets and per-session codec selection"""
+    print("\nTesting image codecs...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.codecs import CODECS, get_codec, choose_codec
+        from PIL import Image, ImageDraw
+        from io import BytesIO
+        import tempfile
+        
+        # Low-color UI capture
+        img = Image.new("RGB", (200, 120), color="white")
+        ImageDraw.Draw(img).rectangle([10, 10, 150, 60], fill=(102, 126, 234))
+        
+        for name in CODECS:
+            data = get_codec(name).encode(img)
+            decoded = Image.open(BytesIO(data)).convert("RGB")
+            assert decoded.size == img.size
+            if get_codec(name).lossless or name == "png-palette":
+                assert decoded.tobytes() == img.tobytes(), f"{name} is not lossless"
+        print("✓ All presets round-trip")
+        
+        assert choose_codec(img).lossless or choose_codec(img).palette
+        print(f"✓ Auto picked {choose_codec(img).name} for UI capture")
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            img_path = store.save_image(img)
+            assert img_path.suffix == ".png"
+            
+            # Codec preset is remembered per session
+            assert SessionStore(Path(tmpdir)).codec == "png"
+            print("✓ Session codec persisted")
+        
+        print("\n✅ Image codec tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Codec test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_content_addressed_images():
+    """Test content-addressed image storage and reference counting"""
+    print("\nTesting content-addressed images...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        from PIL import Image
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            img = Image.new("RGB", (64, 64), color="blue")
+            
+            # Identical content is stored once under its hash
+            first = store.save_image(img)
+            second = store.save_image(img)
+            assert first == second
+            digest = store.image_hash(first)
+            assert first.as_posix() == f"images/{digest[:2]}/{digest}.png"
+            print(f"✓ Deduplicated: {first}")
+            
+            entries = []
+            for title in ("One", "Two"):
+                entry = Entry.new(
+                    title=title, notes="", layout="image-left",
+                    image=ImageModel(path=first.as_posix(), width=64, height=64, sha256=digest)
+                )
+                store.save_entry(entry)
+                entries.append(entry)
+            assert store.image_refcounts()[first.as_posix()] == 2
+            print("✓ Reference counts from entries")
+            
+            # Image survives until its last entry is deleted
+            store.delete_entry(entries[0].id)
+            assert (store.root / first).exists()
+            store.delete_entry(entries[1].id)
+            assert not (store.root / first).exists()
+            print("✓ Unreferenced image removed")
+            
+            # Counts come from the manifest: deleting does not load every entry
+            keep = Entry.new(title="Keep", notes="", layout="image-left",
+                             image=ImageModel(path=store.save_image(img).as_posix(), width=64, height=64))
+            store.save_entry(keep)
+            store.load_entries = lambda: (_ for _ in ()).throw(AssertionError("entries loaded"))
+            try:
+                # An image stored for an entry not saved yet survives a delete of the same content
+                pending = store.save_image(img)
+                store.delete_entry(keep.id)
+                assert (store.root / pending).exists()
+                assert store.collect_garbage() == [] and (store.root / pending).exists()
+                late = Entry.new(title="Late", notes="", layout="image-left",
+                                 image=ImageModel(path=pending.as_posix(), width=64, height=64))
+                store.save_entry(late)
+                assert store.image_refcounts()[pending.as_posix()] == 1
+                
+                # Given up without an entry: removed unless an entry references it
+                assert not store.release_image(store.save_image(img))
+                dropped = store.save_image(Image.new("RGB", (8, 8), color="red"))
+                assert store.release_image(dropped) and not (store.root / dropped).exists()
+            finally:
+                del store.load_entries
+            print("✓ Images of entries still being saved are never deleted")
+        
+        print("\n✅ Content-addressed storage tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Content-addressed storage test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_session_manifest():
+    """Test manifest paging, updates and reindexing"""
+    print("\nTesting session manifest...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir))
+            entries = []
+            for i in range(5):
+                entry = Entry.new(
+                    title=f"Entry {i}", notes="", layout="image-left",
+                    image=ImageModel(path="images/missing.jpg", width=1, height=1)
+                )
+                store.save_entry(entry)
+                entries.append(entry)
+            
+            # Re-save and delete are appended, readers keep the latest state
+            entries[1].title = "Renamed"
+            store.save_entry(entries[1])
+            store.delete_entry(entries[2].id)
+            rows = store.manifest.rows()
+            assert list(rows) == [e.id for e in entries if e is not entries[2]]
+            assert rows[entries[1].id]["title"] == "Renamed"
+            print("✓ Updates and tombstones applied")
+            
+            page, offset = store.manifest.read_page(0, 2)
+            assert len(page) == 2 and offset > 0
+            print("✓ Paged read")
+            
+            # Rebuilding from metadata compacts the file
+            store.manifest.path.unlink()
+            assert store.reindex() == 4
+            assert list(store.ensure_manifest().rows()) == list(rows)
+            print("✓ Reindexed from metadata")
+        
+        print("\n✅ Session manifest tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Session manifest test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_json_backends():
+    """Test entry serialization under every available backend"""
+    print("\nTesting JSON backends...")
+    
+    try:
+        from app.core.models import Entry, ImageModel
+        from app.core.serialization import BACKENDS, resolve_backend, dump_entry, load_entry
+        
+        entry = Entry.new(
+            title="Ünïcode title", notes="line 1\nline 2", layout="image-top",
+            image=ImageModel(path="images/ab/abc.webp", width=10, height=20, sha256="abc")
+        )
+        for backend in BACKENDS:
+            backend = resolve_backend(backend)
+            for pretty in (True, False):
+                data = dump_entry(entry, backend, pretty)
+                assert load_entry(data, backend) == entry
+                # Every backend reads every other backend's output
+                assert load_entry(data, "json") == entry
+            print(f"✓ {backend} round-trip")
+        
+        print("\n✅ JSON backend tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ JSON backend test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_streaming_html_export():
+    """Test streamed HTML export embeds every image intact"""
+    print("\nTesting streaming HTML export...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        from PIL import Image
+        import base64
+        import hashlib
+        import logging
+        import re
+        import tempfile
+        from app.core import templates
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # Every shipped default is recognised as stock
+            assert all(templates.is_stock_template(source) for source in templates.default_templates().values())
+            assert all(templates.is_stock_template(source) for source in templates.BUILTIN_TEMPLATES.values())
+            
+            # An unedited stock copy of an older version is retired and replaced
+            legacy = "{{ entries|length }}"
+            old_copy = "{# overlay-annotator template v3 #}{{ fragments|length }}"
+            stock = templates.STOCK_TEMPLATE_HASHES
+            templates.STOCK_TEMPLATE_HASHES = stock | {hashlib.sha256(s.encode()).hexdigest() for s in (legacy, old_copy)}
+            try:
+                (Path(tmpdir) / "_templates").mkdir()
+                (Path(tmpdir) / "_templates" / "report.html.j2").write_text(legacy, encoding="utf-8")
+                store = SessionStore(Path(tmpdir), codec="png")
+                assert (store.tpl_dir / "report.html.j2.v0.bak").exists()
+                # Later retirements keep earlier backups
+                for _ in range(2):
+                    (store.tpl_dir / "report.html.j2").write_text(old_copy, encoding="utf-8")
+                    SessionStore(Path(tmpdir))
+            finally:
+                templates.STOCK_TEMPLATE_HASHES = stock
+            assert sorted(p.name for p in store.tpl_dir.glob("*.bak")) == [
+                "report.html.j2.v0.bak", "report.html.j2.v3.1.bak", "report.html.j2.v3.bak"]
+            assert (store.tpl_dir / "report.html.j2.v0.bak").read_text(encoding="utf-8") == legacy
+            print("✓ Stock templates of older versions moved aside to versioned backups")
+            
+            # An edited template is the user's: kept in place, with a warning
+            edited = "{# overlay-annotator template v3 #}<h1>Our QA report</h1>{{ fragments|length }}"
+            (store.tpl_dir / "report.md.j2").write_text(edited, encoding="utf-8")
+            warnings = []
+            handler = logging.Handler()
+            handler.emit = warnings.append
+            logging.getLogger("OverlayAnnotator.Storage").addHandler(handler)
+            try:
+                SessionStore(Path(tmpdir))
+            finally:
+                logging.getLogger("OverlayAnnotator.Storage").removeHandler(handler)
+            assert (store.tpl_dir / "report.md.j2").read_text(encoding="utf-8") == edited
+            assert not list(store.tpl_dir.glob("report.md.j2.*.bak"))
+            assert any("report.md.j2" in r.getMessage() and "v3" in r.getMessage() for r in warnings), warnings
+            (store.tpl_dir / "report.md.j2").unlink()
+            print("✓ Edited outdated templates are kept and reported")
+            
+            for i in range(3):
+                # Noise makes the image larger than one base64 chunk
+                img = Image.effect_noise((200 + i, 200), 60).convert("RGB")
+                img_path = store.save_image(img)
+                store.save_entry(Entry.new(
+                    title=f"Shot {i}", notes="n" if i else "", layout="image-left",
+                    image=ImageModel(path=img_path.as_posix(), width=img.width, height=img.height)
+                ))
+            
+            html = store.export_html().read_text(encoding="utf-8")
+            payloads = re.findall(r'data:image/png;base64,([A-Za-z0-9+/=]+)"', html)
+            assert len(payloads) == 3
+            files = {(store.root / e.image.path).read_bytes() for e in store.load_entries()}
+            assert {base64.b64decode(p) for p in payloads} == files
+            print("✓ Embedded images decode to stored files")
+            
+            assert '<span class="number">3</span>' in html
+            assert '<span class="number">2</span>' in html
+            print("✓ Stats precomputed")
+        
+        print("\n✅ Streaming HTML export tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Streaming HTML export test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_incremental_export():
+    """Test that re-exports only render changed entries"""
+    print("\nTesting incremental export...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        from PIL import Image
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            img_path = store.save_image(Image.new("RGB", (50, 50), color="green"))
+            
+            def add(title):
+                entry = Entry.new(
+                    title=title, notes="", layout="image-left",
+                    image=ImageModel(path=img_path.as_posix(), width=50, height=50)
+                )
+                store.save_entry(entry)
+                return entry
+            
+            first = add("First")
+            add("Second")
+            store.export_html()
+            fragments = store.fragments.cache_dir / "html"
+            before = {p.name: p.stat().st_mtime_ns for p in fragments.glob("*.frag")}
+            assert len(before) == 2
+            
+            # Adding one entry renders one new fragment, the rest are reused
+            add("Third")
+            html = store.export_html().read_text(encoding="utf-8")
+            after = {p.name: p.stat().st_mtime_ns for p in fragments.glob("*.frag")}
+            assert len(after) == 3
+            assert all(after[name] == mtime for name, mtime in before.items())
+            assert html.count('class="entry ') == 3
+            print("✓ Unchanged fragments reused")
+            
+            # Editing an entry replaces its fragment
+            first.title = "First (edited)"
+            store.save_entry(first)
+            html = store.export_html().read_text(encoding="utf-8")
+            assert "First (edited)" in html
+            assert len(list(fragments.glob("*.frag"))) == 3
+            print("✓ Edited entry re-rendered, stale fragment pruned")
+            
+            md = store.export_markdown().read_text(encoding="utf-8")
+            assert md.count("## ") == 3
+            print("✓ Markdown export")
+        
+        print("\n✅ Incremental export tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Incremental export test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_linked_html_export():
+    """Test linked-asset HTML export with responsive renditions"""
+    print("\nTesting linked HTML export...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        from PIL import Image
+        import shutil
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            big = store.save_image(Image.new("RGB", (2000, 1000), color="navy"))
+            small = store.save_image(Image.new("RGB", (300, 200), color="red"))
+            for path, (w, h) in ((big, (2000, 1000)), (small, (300, 200))):
+                store.save_entry(Entry.new(
+                    title="Linked", notes="", layout="image-left",
+                    image=ImageModel(path=path.as_posix(), width=w, height=h)
+                ))
+            
+            html = store.export_html(mode="linked").read_text(encoding="utf-8")
+            assets = store.root / "assets"
+            names = sorted(p.name for p in assets.iterdir())
+            big_hash, small_hash = store.image_hash(big), store.image_hash(small)
+            
+            # Large image: full + 1400 + 400; small image: only the original
+            assert sum(n.startswith(big_hash) for n in names) == 3
+            assert sum(n.startswith(small_hash) for n in names) == 1
+            assert ";base64," not in html
+            assert html.count('loading="lazy"') == 2
+            assert f"assets/{big_hash}_w400" in html and "400w" in html
+            with Image.open(next(assets.glob(f"{big_hash}_w1400_*"))) as web:
+                assert web.size == (1400, 700)
+            print("✓ Full, web and thumbnail assets written and referenced via srcset")
+            
+            # Assets are write-once and restored if the folder is removed
+            mtimes = {p.name: p.stat().st_mtime_ns for p in assets.iterdir()}
+            store.export_html(mode="linked")
+            assert {p.name: p.stat().st_mtime_ns for p in assets.iterdir()} == mtimes
+            shutil.rmtree(assets)
+            store.export_html(mode="linked")
+            assert sorted(p.name for p in assets.iterdir()) == names
+            print("✓ Assets reused, recreated when missing")
+            
+            # Embedded mode still inlines images and keeps its own fragments
+            html = store.export_html().read_text(encoding="utf-8")
+            assert html.count(";base64,") == 2
+            try:
+                store.export_html(mode="zip")
+                assert False, "unknown mode accepted"
+            except ValueError:
+                pass
+            print("✓ Embedded mode unaffected")
+        
+        print("\n✅ Linked HTML export tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Linked HTML export test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_export_renditions():
+    """Test cached, configurable export renditions"""
+    print("\nTesting export renditions...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        from PIL import Image
+        import base64
+        import io
+        import re
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            assert store.export_max_width == 1400
+            img_path = store.save_image(Image.new("RGB", (3000, 1500), color="teal"))
+            store.save_entry(Entry.new(
+                title="Wide", notes="", layout="image-left",
+                image=ImageModel(path=img_path.as_posix(), width=3000, height=1500)
+            ))
+            
+            def embedded_size():
+                html = (store.root / "report.html").read_text(encoding="utf-8")
+                data = re.search(r";base64,([^\"]+)", html).group(1)
+                with Image.open(io.BytesIO(base64.b64decode(data))) as img:
+                    return img.size
+            
+            store.export_html()
+            assert embedded_size() == (1400, 700)
+            renditions = list(store.renditions.cache_dir.rglob("*_w1400_q82.*"))
+            assert len(renditions) == 1
+            mtime = renditions[0].stat().st_mtime_ns
+            print("✓ Embedded export uses a 1400px rendition by default")
+            
+            # Linked export and later exports reuse the cached file
+            store.export_html(mode="linked")
+            store.fragments.prune("html", [])
+            store.export_html()
+            assert renditions[0].stat().st_mtime_ns == mtime
+            assert len(list(store.renditions.cache_dir.rglob("*.*"))) == 2
+            print("✓ Renditions cached and shared across export modes")
+            
+            # Settings persist with the session; 0 embeds the original
+            store.set_export_renditions(max_width=800, quality=60)
+            reopened = SessionStore(Path(tmpdir))
+            assert (reopened.export_max_width, reopened.export_quality) == (800, 60)
+            reopened.export_html()
+            assert embedded_size() == (800, 400)
+            assert list(reopened.renditions.cache_dir.rglob("*_w800_q60.*"))
+            reopened.export_html(max_width=0)
+            assert embedded_size() == (3000, 1500)
+            try:
+                reopened.set_export_renditions(quality=0)
+                assert False, "invalid quality accepted"
+            except ValueError:
+                pass
+            print("✓ Max width and quality configurable and persisted")
+        
+        print("\n✅ Export rendition tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Export rendition test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_template_environment():
+    """Test shared Jinja environments and session template overrides"""
+    print("\nTesting template environment...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.templates import get_environment
+        import os
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir))
+            assert not list(store.tpl_dir.iterdir())
+            print("✓ Opening a session writes no template files")
+            
+            env = get_environment(store.tpl_dir, autoescape=True)
+            assert get_environment(Path(tmpdir) / "_templates", autoescape=True) is env
+            assert get_environment(store.tpl_dir, autoescape=False) is not env
+            store.export_html()
+            assert env.get_template("report.html.j2") is env.get_template("report.html.j2")
+            print("✓ Environment and compiled templates shared across exports")
+            
+            # Session copies override the defaults and reload when edited
+            written = store.customize_templates()
+            assert {p.name for p in written} == {"report.md.j2", "entry.md.j2", "report.html.j2", "entry.html.j2"}
+            report = store.tpl_dir / "report.md.j2"
+            report.write_text(report.read_text(encoding="utf-8").replace("Overlay Annotator Session", "Custom v1"),
+                              encoding="utf-8")
+            assert "Custom v1" in store.export_markdown().read_text(encoding="utf-8")
+            report.write_text(report.read_text(encoding="utf-8").replace("Custom v1", "Custom v2"),
+                              encoding="utf-8")
+            st = report.stat()
+            os.utime(report, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+            assert "Custom v2" in store.export_markdown().read_text(encoding="utf-8")
+            print("✓ Session override used and reloaded on change")
+            
+            # Environments of many sessions are evicted least recently used first
+            from app.core import templates
+            saved_max = templates.MAX_ENVIRONMENTS
+            templates.MAX_ENVIRONMENTS = 2
+            try:
+                templates.clear_environments()
+                first = get_environment(Path(tmpdir) / "a")
+                second = get_environment(Path(tmpdir) / "b")
+                assert get_environment(Path(tmpdir) / "a") is first
+                get_environment(Path(tmpdir) / "c")
+                assert len(templates._environments) == 2
+                assert get_environment(Path(tmpdir) / "a") is first
+                assert get_environment(Path(tmpdir) / "b") is not second
+            finally:
+                templates.MAX_ENVIRONMENTS = saved_max
+                templates.clear_environments()
+            print("✓ Environment cache bounded (LRU)")
+        
+        print("\n✅ Template environment tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Template environment test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_paginated_html_export():
+    """Test paginated HTML export with an index page"""
+    print("\nTesting paginated HTML export...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        from PIL import Image
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            img_path = store.save_image(Image.new("RGB", (40, 30), color="white"))
+            for i in range(7):
+                store.save_entry(Entry.new(
+                    title=f"Entry {i}", notes="", layout="image-left",
+                    image=ImageModel(path=img_path.as_posix(), width=40, height=30)
+                ))
+            
+            index = store.export_html(page_size=3).read_text(encoding="utf-8")
+            pages = sorted(store.root.glob("report-*.html"))
+            assert [p.name for p in pages] == ["report-0001.html", "report-0002.html", "report-0003.html"]
+            assert all(f'href="{p.name}"' in index for p in pages)
+            assert 'class="entry ' not in index
+            assert '<span class="number">7</span>' in index
+            print("✓ Index page links every page, stats precomputed")
+            
+            first, middle, last = (p.read_text(encoding="utf-8") for p in pages)
+            assert [h.count('class="entry ') for h in (first, middle, last)] == [3, 3, 1]
+            assert 'href="report-0002.html"' in first and "← Previous</span>" in first
+            assert 'href="report-0001.html"' in middle and 'href="report-0003.html"' in middle
+            assert "Next →</span>" in last and 'href="report.html"' in last
+            print("✓ Pages hold page_size entries with prev/next navigation")
+            
+            # Fewer pages (or none) next time: stale pages removed
+            store.export_html(page_size=5)
+            assert len(list(store.root.glob("report-*.html"))) == 2
+            html = store.export_html().read_text(encoding="utf-8")
+            assert not list(store.root.glob("report-*.html"))
+            assert html.count('class="entry ') == 7 and "page-nav" not in html.split("</style>")[1]
+            print("✓ Stale pages pruned, single-file export unchanged")
+        
+        print("\n✅ Paginated HTML export tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Paginated HTML export test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_export_pipeline():
+    """Test single-pass export to several sinks with cancellation"""
+    print("\nTesting export pipeline...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        from app.core.export_pipeline import (
+            ExportCancelled, HtmlSink, JsonSink, MarkdownSink, _PendingFiles, run_export
+        )
+        from PIL import Image
+        import json
+        import shutil
+        import tempfile
+        import threading
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            img_path = store.save_image(Image.new("RGB", (40, 30), color="gray"))
+            for i in range(5):
+                store.save_entry(Entry.new(
+                    title=f"Entry {i}", notes="note", layout="image-left",
+                    image=ImageModel(path=img_path.as_posix(), width=40, height=30)
+                ))
+            
+            loads = []
+            original = store.load_entries
+            store.load_entries = lambda: loads.append(1) or original()
+            seen = []
+            md, html, report = run_export(
+                store, [MarkdownSink(store), HtmlSink(store), JsonSink(store)],
+                progress=lambda done, total: seen.append((done, total)), workers=2
+            )
+            assert len(loads) == 1
+            del store.load_entries
+            assert seen[-1] == (5, 5)
+            assert md.read_text(encoding="utf-8").count("## ") == 5
+            assert html.read_text(encoding="utf-8").count('class="entry ') == 5
+            data = json.loads(report.read_text(encoding="utf-8"))
+            assert data["stats"]["total"] == 5 and len(data["entries"]) == 5
+            assert {e["title"] for e in data["entries"]} == {f"Entry {i}" for i in range(5)}
+            print("✓ Entries loaded once, Markdown/HTML/JSON written in one pass")
+            
+            # Cancelling mid-export keeps the previous outputs and no temp files
+            before = {p: p.read_bytes() for p in (md, html, report)}
+            cancel = threading.Event()
+            store.save_entry(Entry.new(
+                title="Late", notes="", layout="image-left",
+                image=ImageModel(path=img_path.as_posix(), width=40, height=30)
+            ))
+            try:
+                run_export(store, [MarkdownSink(store), HtmlSink(store), JsonSink(store)],
+                           progress=lambda done, total: done == 2 and cancel.set(), cancel=cancel)
+                assert False, "cancelled export completed"
+            except ExportCancelled:
+                pass
+            assert all(p.read_bytes() == data for p, data in before.items())
+            assert not list(store.root.glob(".*.tmp"))
+            print("✓ Cancelled export leaves previous reports intact")
+            
+            # Concurrent exports to one folder (GUI + control socket) use their own temp files
+            names = []
+            barrier = threading.Barrier(2)
+            
+            def open_pending():
+                pending = _PendingFiles()
+                f = pending.open(store.root / "report.json")
+                barrier.wait()  # both threads alive, so their idents differ
+                names.append(f.name)
+                pending.discard()
+            
+            threads = [threading.Thread(target=open_pending) for _ in range(2)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert len(set(names)) == 2, names
+            print("✓ Concurrent exports write separate temp files")
+            
+            # Progress counts every entry once, in order
+            store.delete_entry(store.load_entries()[-1].id)
+            seen = []
+            run_export(store, [JsonSink(store)], progress=lambda done, total: seen.append((done, total)), workers=3)
+            assert seen == [(n, 5) for n in range(1, 6)], seen
+            print("✓ Progress reported once per entry")
+            
+            # Process pool: sinks are pickled without their open files and give the same output
+            run_export(store, [MarkdownSink(store), JsonSink(store)], workers=2, executor="thread")
+            before = {p: p.read_bytes() for p in (md, report)}
+            shutil.rmtree(store.cache_dir / "fragments")  # render in the workers, not from cache
+            run_export(store, [MarkdownSink(store), JsonSink(store)], workers=2, executor="process")
+            assert md.read_bytes() == before[md]
+            assert json.loads(report.read_bytes())["entries"] == json.loads(before[report])["entries"]
+            print("✓ Process-pool export matches the thread export")
+            
+            # Cancel reaches process exports too: the parent checks it between results
+            before = {p: p.read_bytes() for p in (md, report)}
+            cancel = threading.Event()
+            try:
+                run_export(store, [MarkdownSink(store), JsonSink(store)], workers=2, executor="process",
+                           progress=lambda done, total: cancel.set(), cancel=cancel)
+                assert False, "cancelled export completed"
+            except ExportCancelled:
+                pass
+            assert all(p.read_bytes() == data for p, data in before.items())
+            print("✓ Cancelling a process-pool export keeps the previous outputs")
+            
+            # max_width: images wider than it are embedded as downscaled renditions
+            wide = store.save_image(Image.new("RGB", (1200, 600), color="navy"))
+            store.save_entry(Entry.new(
+                title="Wide", notes="", layout="image-left",
+                image=ImageModel(path=wide.as_posix(), width=1200, height=600)
+            ))
+            full = run_export(store, [HtmlSink(store, max_width=0)])[0].stat().st_size
+            small = run_export(store, [HtmlSink(store, max_width=300)])[0].read_text(encoding="utf-8")
+            renditions = list(store.renditions.cache_dir.rglob("*_w300_*"))
+            assert renditions and all(Image.open(r).width == 300 for r in renditions), renditions
+            assert len(small) < full
+            print("✓ max_width embeds downscaled renditions")
+        
+        print("\n✅ Export pipeline tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Export pipeline test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def _square_slowly(n):
+    import random
+    import time
+    time.sleep(random.random() * 0.003)
+    return n * n
+
+def test_parallel_map():
+    """Test the bounded, order-preserving pool map"""
+    print("\nTesting ordered_map...")
+    
+    try:
+        from app.core.parallel import ordered_map
+        import threading
+        
+        for workers in (1, 4):
+            assert list(ordered_map(_square_slowly, range(50), workers)) == [n * n for n in range(50)]
+        print("✓ Results come back in input order")
+        
+        # The input is pulled at most `window` items ahead of the consumer
+        pulled = []
+        
+        def source():
+            for n in range(40):
+                pulled.append(n)
+                yield n
+        
+        consumed = 0
+        for _ in ordered_map(_square_slowly, source(), workers=3, window=4):
+            consumed += 1
+            assert len(pulled) - consumed <= 4, (len(pulled), consumed)
+        assert consumed == 40
+        print("✓ Bounded window")
+        
+        # Closing early cancels queued work and waits for running calls
+        started = []
+        lock = threading.Lock()
+        
+        def record(n):
+            with lock:
+                started.append(n)
+            return _square_slowly(n)
+        
+        results = ordered_map(record, range(1000), workers=2, window=4)
+        assert [next(results) for _ in range(3)] == [0, 1, 4]
+        results.close()
+        count = len(started)
+        assert count <= 3 + 4, count
+        assert threading.active_count() < 10
+        assert len(started) == count
+        print("✓ close() stops the pool early")
+        
+        # The initializer runs once per worker, or once inline
+        calls = []
+        list(ordered_map(abs, [1, -2], workers=1, initializer=calls.append, initargs=("x",)))
+        assert calls == ["x"]
+        
+        print("\n✅ ordered_map tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ ordered_map test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_pdf_export():
+    """Test streaming PDF export"""
+    print("\nTesting PDF export...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        from app.core.pdf_export import CONTENT_WIDTH, META_SIZE, TITLE_SIZE, wrap_text, text_width
+        from PIL import Image
+        import io
+        import re
+        import tempfile
+        
+        lines = wrap_text("alpha beta " * 50 + "x" * 300, 10, 200)
+        assert len(lines) > 5 and all(text_width(line, 10) <= 200 for line in lines)
+        print("✓ Notes wrapped to the page width")
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            img_path = store.save_image(Image.new("RGBA", (2000, 1000), (0, 128, 255, 200)))
+            store.save_entry(Entry.new(
+                title="Login (form) accepts \\ weak passwords", notes="Steps to reproduce. " * 400,
+                layout="image-left", image=ImageModel(path=img_path.as_posix(), width=2000, height=1000)
+            ))
+            store.save_entry(Entry.new(
+                title="Short", notes="", layout="image-left",
+                image=ImageModel(path=img_path.as_posix(), width=2000, height=1000)
+            ))
+            
+            data = store.export_pdf().read_bytes()
+            assert data.startswith(b"%PDF-1.4") and data.endswith(b"%%EOF\n")
+            xref = int(re.search(rb"startxref\n(\d+)", data).group(1))
+            rows = data[xref:].split(b"\n")
+            count = int(rows[1].split()[1])
+            for obj_id in range(1, count):
+                offset = int(rows[2 + obj_id][:10])
+                assert data[offset:].startswith(b"%d 0 obj" % obj_id)
+            print("✓ Cross-reference table points at every object")
+            
+            # Cover + long entry spilling onto extra pages + short entry
+            pages = int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", data).group(1))
+            assert pages >= 4
+            assert b"(Login \\(form\\) accepts \\\\ weak passwords)" in data
+            assert b"\\(continued\\))" in data
+            
+            # Images are JPEG renditions at most export_max_width wide
+            streams = re.findall(rb"/Width (\d+) /Height (\d+) .*?/DCTDecode >>\nstream\n", data)
+            assert streams == [(b"1400", b"700")] * 2
+            start = data.index(b"/DCTDecode >>\nstream\n") + len(b"/DCTDecode >>\nstream\n")
+            with Image.open(io.BytesIO(data[start:])) as img:
+                assert img.format == "JPEG" and img.size == (1400, 700)
+            print("✓ Pages laid out with title, JPEG image and notes")
+            
+            # PNG sources are converted to JPEG once and reused by later exports
+            jpegs = list(store.renditions.cache_dir.rglob("*.jpg"))
+            assert len(jpegs) == 1, jpegs
+            mtime = jpegs[0].stat().st_mtime_ns
+            assert store.export_pdf().read_bytes().count(b"/DCTDecode") == 2
+            assert jpegs[0].stat().st_mtime_ns == mtime
+            print("✓ JPEG conversions cached in the rendition cache")
+            
+            # Long titles wrap, including on continuation pages
+            long_title = "Checkout total ignores discount codes " * 6
+            store.save_entry(Entry.new(
+                title=long_title.strip(), notes="Observed. " * 600, layout="image-left",
+                image=ImageModel(path=img_path.as_posix(), width=2000, height=1000)
+            ))
+            data = store.export_pdf().read_bytes()
+            strings = [re.sub(rb"\\(.)", rb"\1", m).decode("cp1252")
+                       for m in re.findall(rb"Td \(((?:\\.|[^\\)\n])*)\) Tj", data)]
+            title_lines = [t for t in strings if "discount" in t or "Checkout" in t]
+            assert len(title_lines) > 4 and any(t.endswith("(continued)") for t in strings), title_lines
+            # Entry page title at TITLE_SIZE, continuation headings at META_SIZE
+            assert all(text_width(t, TITLE_SIZE, "F2") <= CONTENT_WIDTH for t in title_lines[:4])
+            assert all(text_width(t, META_SIZE, "F2") <= CONTENT_WIDTH for t in title_lines)
+            print("✓ Long titles wrapped on entry and continuation pages")
+        
+        print("\n✅ PDF export tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ PDF export test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_ndjson_export():
+    """Test streaming NDJSON export with since filtering"""
+    print("\nTesting NDJSON export...")
+    
+    try:
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        from PIL import Image
+        import base64
+        import json
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            img_path = store.save_image(Image.new("RGB", (20, 20), color="purple"))
+            for i, stamp in enumerate(["2024-01-01T10:00:00+00:00", "2024-02-01T10:00:00+00:00",
+                                       "2024-03-01T10:00:00+00:00"]):
+                entry = Entry.new(title=f"Entry {i}", notes="", layout="image-left",
+                                  image=ImageModel(path=img_path.as_posix(), width=20, height=20))
+                entry.timestamp = stamp
+                store.save_entry(entry)
+            
+            lines = store.export_ndjson().read_text(encoding="utf-8").splitlines()
+            rows = [json.loads(line) for line in lines]
+            assert [r["title"] for r in rows] == ["Entry 0", "Entry 1", "Entry 2"]
+            assert all(r["image"]["sha256"] == img_path.stem and r["image"]["path"] for r in rows)
+            print("✓ One entry per line, oldest first, with image hash and path")
+            
+            out = Path(tmpdir) / "nightly.ndjson"
+            store.export_ndjson(out, since="2024-01-15", image="inline")
+            rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+            assert [r["title"] for r in rows] == ["Entry 1", "Entry 2"]
+            assert base64.b64decode(rows[0]["image"]["data"]) == (store.root / img_path).read_bytes()
+            assert rows[0]["image"]["mime"] == "image/png"
+            assert store.export_ndjson(out, since="2024-03-01T10:00:00Z").read_text() == ""
+            print("✓ --since filtering and inline images")
+        
+        print("\n✅ NDJSON export tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ NDJSON export test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_cli():
+    """Test the headless CLI: export, reindex, stats, verify"""
+    print("\nTesting headless CLI...")
+    
+    try:
+        from app.cli import main
+        from app.core.storage import SessionStore
+        from app.core.models import Entry, ImageModel
+        from PIL import Image
+        import contextlib
+        import io
+        import json
+        import subprocess
+        import sys
+        import tempfile
+        
+        # Importing the CLI must not pull in Qt or the capture backend
+        code = "import sys, app.cli; sys.exit(any(m in sys.modules for m in ('PyQt6', 'mss', 'app.core.storage')))"
+        assert subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent).returncode == 0
+        print("✓ CLI imports only the standard library at startup")
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            for i in range(3):
+                img_path = store.save_image(Image.new("RGB", (20 + i, 20), color="teal"))
+                store.save_entry(Entry.new(title=f"Entry {i}", notes="n" if i else "", layout="image-left",
+                                           image=ImageModel(path=img_path.as_posix(), width=20 + i, height=20)))
+            
+            def run(*argv):
+                out = io.StringIO()
+                with contextlib.redirect_stdout(out):
+                    code = main(list(argv))
+                return code, out.getvalue()
+            
+            code, _ = run("export", tmpdir, "--format", "md,json,ndjson")
+            assert code == 0
+            assert all((Path(tmpdir) / name).exists() for name in ("report.md", "report.json", "entries.ndjson"))
+            assert not (Path(tmpdir) / "report.html").exists()
+            print("✓ export writes the requested formats")
+            
+            # NDJSON is oldest first even without --since (metadata file order is by id)
+            entries = store.load_entries()
+            for n, entry in enumerate(reversed(entries)):
+                entry.timestamp = f"2024-01-0{n + 1}T10:00:00+00:00"
+                store.save_entry(entry)
+            run("export", tmpdir, "--format", "ndjson")
+            rows = [json.loads(line) for line in (Path(tmpdir) / "entries.ndjson").read_text().splitlines()]
+            assert [r["title"] for r in rows] == [e.title for e in reversed(entries)]
+            print("✓ NDJSON export is oldest first")
+            
+            # CLI and GUI (SessionStore.export_*) exports share one order; offsets compare as instants
+            entries[2].timestamp = "2024-01-03T12:00:00+05:00"  # 07:00 UTC, before entries[0]
+            store.save_entry(entries[2])
+            expected = [entries[1].title, entries[2].title, entries[0].title]
+            run("export", tmpdir, "--format", "json,ndjson")
+            cli_json = json.loads((Path(tmpdir) / "report.json").read_text())
+            rows = [json.loads(line) for line in (Path(tmpdir) / "entries.ndjson").read_text().splitlines()]
+            assert [e["title"] for e in cli_json["entries"]] == [r["title"] for r in rows] == expected
+            store.export_json()
+            assert [e["title"] for e in json.loads((Path(tmpdir) / "report.json").read_text())["entries"]] == expected
+            print("✓ CLI and GUI exports list entries in the same order")
+            
+            # A --since export leaves other entries' assets and cached fragments alone
+            run("export", tmpdir, "--format", "html,md", "--mode", "linked")
+            assets = sorted((Path(tmpdir) / "assets").iterdir())
+            fragments = sorted(store.fragments.cache_dir.rglob("*.*"))
+            code, _ = run("export", tmpdir, "--format", "html,md", "--mode", "linked", "--since", "2024-01-02")
+            assert code == 0
+            assert sorted((Path(tmpdir) / "assets").iterdir()) == assets
+            assert set(fragments) <= set(store.fragments.cache_dir.rglob("*.*"))
+            print("✓ Partial exports keep assets and fragments of other entries")
+            
+            # A legacy timestamp that does not parse sorts last and is skipped by --since
+            legacy = Entry.new(title="Legacy", notes="", layout="image-left", image=entries[0].image)
+            legacy.timestamp = "last tuesday"
+            store.save_entry(legacy)
+            code, _ = run("export", tmpdir, "--format", "ndjson")
+            rows = [json.loads(line) for line in (Path(tmpdir) / "entries.ndjson").read_text().splitlines()]
+            assert code == 0 and [r["title"] for r in rows] == expected + ["Legacy"]
+            code, _ = run("export", tmpdir, "--format", "ndjson", "--since", "2024-01-02")
+            rows = [json.loads(line) for line in (Path(tmpdir) / "entries.ndjson").read_text().splitlines()]
+            assert code == 0 and [r["title"] for r in rows] == expected
+            store.delete_entry(legacy.id)
+            print("✓ Unparseable timestamps do not fail exports")
+            
+            # stats reads plain metadata: pydantic stays unloaded
+            code = ("import sys, io, contextlib, app.cli; out = io.StringIO(); "
+                    "contextlib.redirect_stdout(out).__enter__(); app.cli.main(['stats', sys.argv[1]]); "
+                    "sys.exit('pydantic' in sys.modules)")
+            assert subprocess.run([sys.executable, "-c", code, tmpdir], cwd=Path(__file__).parent).returncode == 0
+            print("✓ stats runs without loading the models")
+            
+            code, out = run("stats", tmpdir, "--json")
+            stats = json.loads(out)
+            assert code == 0 and stats["total"] == 3 and stats["with_notes"] == 2 and stats["images"] == 3
+            
+            store.manifest.path.unlink()
+            code, out = run("reindex", tmpdir)
+            assert code == 0 and "3 entries" in out and store.manifest.exists()
+            print("✓ stats and reindex")
+            
+            code, out = run("verify", tmpdir, "--json")
+            assert code == 0 and json.loads(out)["problems"] == []
+            with open(store.root / img_path, "ab") as f:
+                f.write(b"corrupt")
+            next(iter(store.meta.glob("*.json"))).write_text("{broken", encoding="utf-8")
+            code, out = run("verify", tmpdir, "--json")
+            assert code == 1 and len(json.loads(out)["problems"]) >= 2
+            print("✓ verify reports corrupted images and unreadable metadata")
+            
+            with contextlib.redirect_stderr(io.StringIO()):
+                try:
+                    main(["stats", str(Path(tmpdir) / "missing")])
+                    raise AssertionError("non-session folder accepted")
+                except SystemExit as e:
+                    assert e.code == 2
+            print("✓ Non-session folders are rejected")
+        
+        print("\n✅ CLI tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ CLI test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_annotation_render():
+    """Test headless annotation rendering and the batch API"""
+    print("\nTesting headless annotation rendering...")
+    
+    try:
+        from app.core.render import RenderJob, Shape, render_annotations, render_batch
+        from app.core.storage import SessionStore
+        from PIL import Image
+        import tempfile
+        
+        base = Image.new("RGB", (200, 100), color="white")
+        base.paste((0, 0, 255), (150, 0, 200, 100))
+        out = render_annotations(base, [
+            Shape(kind="box", x1=10, y1=10, x2=60, y2=60, color=(255, 0, 0)),
+            Shape(kind="redact", x1=100, y1=10, x2=120, y2=30),
+            Shape(kind="arrow", x1=70, y1=90, x2=140, y2=40, color=(0, 128, 0)),
+            Shape(kind="blur", x1=140, y1=0, x2=160, y2=100),
+        ])
+        assert out.size == base.size and base.getpixel((10, 30)) == (255, 255, 255)
+        assert out.getpixel((10, 30))[:3] == (255, 0, 0) and out.getpixel((30, 30))[:3] == (255, 255, 255)
+        assert out.getpixel((110, 20))[:3] == (0, 0, 0)
+        assert out.getpixel((139, 41))[:3] == (0, 128, 0)
+        assert out.getpixel((150, 50))[:3] not in ((255, 255, 255), (0, 0, 255))
+        print("✓ Boxes, arrows, redactions and blur burned in at image coordinates")
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            sources = []
+            for i in range(4):
+                src = Path(tmpdir) / f"run_{i}.png"
+                Image.new("RGB", (60, 40), color=(i * 60, 0, 0)).save(src)
+                sources.append(src)
+            jobs = [RenderJob(image=str(src), title=f"Step {i}",
+                              shapes=[Shape(kind="text", x1=2, y1=2, text=f"#{i}")])
+                    for i, src in enumerate(sources)]
+            jobs.append({"image": str(sources[0]), "title": "Dict job"})
+            entries = render_batch(store, jobs, workers=2)
+            assert [e.title for e in entries] == ["Step 0", "Step 1", "Step 2", "Step 3", "Dict job"]
+            assert len(store.load_entries()) == 5 and len(store.ensure_manifest().rows()) == 5
+            for entry in entries:
+                assert (store.root / entry.image.path).exists() and entry.image.sha256
+            print("✓ Batch rendered on a process pool and saved through SessionStore")
+        
+        print("\n✅ Annotation render tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Annotation render test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_folder_ingest():
+    """Test watch-folder ingestion: debounce, sidecars, dedup, failures"""
+    print("\nTesting watch-folder ingestion...")
+    
+    try:
+        from app.core.ingest import FolderWatcher
+        from app.core.storage import SessionStore
+        from PIL import Image
+        import json
+        import tempfile
+        import threading
+        import time
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), codec="png")
+            drop = Path(tmpdir) / "drop"
+            drop.mkdir()
+            Image.new("RGB", (30, 20), color="red").save(drop / "login_page-01.png")
+            Image.new("RGB", (30, 20), color="green").save(drop / "checkout.jpg")
+            (drop / "checkout.jpg.json").write_text(json.dumps(
+                {"title": "Checkout", "notes": "step 2", "tags": ["ci"], "timestamp": "2024-05-01T10:00:00+00:00"}))
+            Image.new("RGB", (30, 20), color="red").save(drop / "copy_of_login.png")
+            (drop / "broken.png").write_bytes(b"not an image")
+            
+            watcher = FolderWatcher(store, drop, settle=0.3, workers=2)
+            assert watcher.scan_once() == []
+            print("✓ New files wait until they have settled")
+            
+            time.sleep(0.35)
+            entries = watcher.scan_once()
+            titles = sorted(e.title for e in entries)
+            assert titles == ["Checkout", "login page 01"], titles
+            checkout = next(e for e in entries if e.title == "Checkout")
+            assert checkout.notes == "step 2" and checkout.tags == ["ci"] and checkout.timestamp.startswith("2024-05-01")
+            assert len(store.load_entries()) == 2
+            print("✓ Entries from filenames and sidecar JSON; duplicate image skipped")
+            
+            assert not any(p.is_file() for p in drop.iterdir())
+            assert (drop / "failed" / "broken.png").exists()
+            assert (drop / "ingested" / "checkout.jpg.json").exists()
+            print("✓ Handled files moved to ingested/ and failed/")
+            
+            got = threading.Event()
+            batches = []
+            bg = FolderWatcher(store, drop, settle=0.0, poll_interval=5.0,
+                               on_entries=lambda b: (batches.append(b), got.set()))
+            bg.start()
+            Image.new("RGB", (30, 20), color="blue").save(drop / ".late.png")
+            (drop / ".late.png").replace(drop / "late.png")
+            bg.poke()
+            assert got.wait(5)
+            bg.stop()
+            assert not bg.is_running() and [e.title for e in batches[0]] == ["late"]
+            print("✓ Background watcher wakes on poke and stops cleanly")
+            
+            # A sidecar timestamp that does not parse fails the file, not later --since exports
+            Image.new("RGB", (30, 20), color="purple").save(drop / "bad_time.png")
+            (drop / "bad_time.png.json").write_text(json.dumps({"timestamp": "last tuesday"}))
+            watcher.settle = 0.0
+            assert watcher.scan_once() == []
+            assert (drop / "failed" / "bad_time.png").exists()
+            assert len(store.load_entries_since("2000-01-01")) == 3
+            print("✓ Invalid sidecar timestamp sends the file to failed/")
+            
+            # Deleting an entry lets the same image be ingested again
+            store.delete_entry(checkout.id)
+            Image.new("RGB", (30, 20), color="green").save(drop / "checkout_again.jpg")
+            again = watcher.scan_once()
+            assert [e.title for e in again] == ["checkout again"], again
+            print("✓ Re-dropping a deleted image is not treated as a duplicate")
+            
+            # Duplicates are caught before storing: no second image file, nothing unreferenced
+            stored = sorted(store.images.rglob("*.*"))
+            Image.new("RGB", (30, 20), color="green").save(drop / "checkout_third.jpg")
+            assert watcher.scan_once() == []
+            assert sorted(store.images.rglob("*.*")) == stored and store.collect_garbage() == []
+            print("✓ Duplicates skipped without writing an image")
+            
+            # Stopping mid-batch leaves the rest in the folder and no stored-but-unsaved images
+            for i in range(4):
+                Image.new("RGB", (30, 20), color=(10 * i, 200, 90)).save(drop / f"burst_{i}.png")
+            encode = watcher._encode_one
+            
+            def encode_then_stop(path):
+                if path.name == "burst_1.png":
+                    watcher._stop.set()
+                return encode(path)
+            watcher._encode_one = encode_then_stop
+            watcher.workers = 1
+            watcher.scan_once()
+            del watcher._encode_one
+            watcher._stop.clear()
+            assert store.collect_garbage() == []
+            assert (drop / "burst_3.png").exists()
+            watcher.scan_once()
+            assert not list(drop.glob("burst_*.png")) and store.collect_garbage() == []
+            print("✓ A stop mid-batch stores nothing it does not save")
+            
+            # shot.json is shared by shot.png and shot.jpg: both get its fields
+            Image.new("RGB", (30, 20), color="orange").save(drop / "shot.png")
+            Image.new("RGB", (30, 20), color="yellow").save(drop / "shot.jpg")
+            (drop / "shot.json").write_text(json.dumps({"title": "Shared"}))
+            shared = watcher.scan_once()
+            assert [e.title for e in shared] == ["Shared", "Shared"], shared
+            assert not (drop / "shot.json").exists() and (drop / "ingested" / "shot.json").exists()
+            print("✓ A bare sidecar moves with the last image that uses it")
+        
+        print("\n✅ Folder ingest tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Folder ingest test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_control_socket():
+    """Test the local control socket: commands, errors and backpressure"""
+    print("\nTesting control socket...")
+    
+    try:
+        from PyQt6.QtWidgets import QApplication
+        from app.core.control import CommandError, parse_command, send
+        from app.ui.background import run_in_background
+        from app.ui.control_server import MAX_PENDING, ControlServer, PendingReply
+        import os
+        import threading
+        import time
+        
+        app = QApplication.instance() or QApplication([])
+        
+        assert parse_command(b'{"cmd": "add", "image": "a.png"}')["image"] == "a.png"
+        for bad in (b'not json', b'[1]', b'{"cmd": "reboot"}', b'{"cmd": "add"}'):
+            try:
+                parse_command(bad)
+                raise AssertionError(f"accepted {bad!r}")
+            except CommandError:
+                pass
+        print("✓ Requests validated before queueing")
+        
+        def slow(request):
+            time.sleep(0.005)
+            return {"n": request["id"]}
+        
+        def refuse(request):
+            raise CommandError("no session open")
+        
+        gui_thread = threading.get_ident()
+        workers = []
+        
+        def in_background(request):
+            # Work on a pool thread, reply when it is done
+            reply = PendingReply()
+            
+            def work():
+                time.sleep(0.05)
+                workers.append(threading.get_ident())
+                if request["image"] == "bad.png":
+                    raise ValueError("cannot decode")
+                return request["image"]
+            
+            run_in_background(work, lambda image: reply.resolve(entry=image),
+                              lambda error: reply.fail(str(error)))
+            return reply
+        
+        name = f"overlay-annotator-test-{os.getpid()}"
+        server = ControlServer({"ping": lambda r: {"pong": True}, "status": slow, "export": refuse,
+                                "add": in_background}, name=name)
+        assert server.start()
+        
+        results = {}
+        
+        def client():
+            results["simple"] = send([{"id": 1, "cmd": "ping"}, {"id": 2, "cmd": "export"},
+                                      {"id": 3, "cmd": "nope"}], name=name)
+            results["deferred"] = send([{"id": 1, "cmd": "add", "image": "a.png"},
+                                        {"id": 2, "cmd": "add", "image": "bad.png"},
+                                        {"id": 3, "cmd": "ping"}], name=name)
+            results["flood"] = send([{"id": i, "cmd": "status"} for i in range(200)], name=name)
+        
+        thread = threading.Thread(target=client)
+        thread.start()
+        deadline = time.time() + 20
+        while thread.is_alive() and time.time() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+        thread.join(1)
+        server.stop()
+        
+        simple = {r.get("id"): r for r in results["simple"]}
+        assert simple[1] == {"ok": True, "id": 1, "pong": True}
+        assert simple[2] == {"ok": False, "id": 2, "error": "no session open"}
+        assert simple[None]["ok"] is False and "unknown command" in simple[None]["error"]
+        print("✓ Replies carry results, handler errors and protocol errors")
+        
+        deferred = results["deferred"]
+        assert deferred[0] == {"ok": True, "id": 3, "pong": True}, deferred  # not held up by the adds
+        assert {r["id"]: r for r in deferred[1:]} == {
+            1: {"ok": True, "id": 1, "entry": "a.png"},
+            2: {"ok": False, "id": 2, "error": "cannot decode"},
+        }, deferred
+        assert len(workers) == 2 and gui_thread not in workers
+        print("✓ Background commands reply when their worker finishes")
+        
+        flood = results["flood"]
+        done = [r for r in flood if r["ok"]]
+        busy = [r for r in flood if not r["ok"]]
+        assert len(flood) == 200 and busy and all(r["error"] == "busy" for r in busy)
+        assert MAX_PENDING <= len(done) < 200 and all(r["n"] == r["id"] for r in done)
+        print(f"✓ Flood of 200 requests: {len(done)} run, {len(busy)} answered busy")
+        
+        print("\n✅ Control socket tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Control socket test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_lazy_imports():
+    """Test that heavy modules load on first use, not at startup"""
+    print("\nTesting lazy imports...")
+    
+    try:
+        import os
+        import subprocess
+        import sys
+        
+        deferred = ("jinja2", "mss", "pydantic", "PIL", "app.core.storage", "app.core.export_pipeline")
+        code = ("import sys, app.main; "
+                f"print('LOADED=' + ','.join(m for m in {deferred!r} if m in sys.modules))")
+        env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+        result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent, env=env,
+                                capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr[-500:]
+        loaded = result.stdout.split("LOADED=", 1)[1].strip()
+        assert loaded == "", f"imported at startup: {loaded}"
+        print("✓ jinja2, mss, pydantic, PIL and storage are not imported by app.main")
+        
+        code = ("import sys, tempfile; from pathlib import Path; from app.core.storage import SessionStore; "
+                "before = 'jinja2' in sys.modules; d = tempfile.mkdtemp(); "
+                "SessionStore(Path(d)).export_markdown(); print(before, 'jinja2' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent,
+                                capture_output=True, text=True)
+        assert result.stdout.split() == ["False", "True"], result.stdout + result.stderr[-500:]
+        print("✓ jinja2 loads on the first export, not with storage")
+        
+        print("\n✅ Lazy import tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Lazy import test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_single_instance():
+    """Test that a second launch hands off to the running instance and exits"""
+    print("\nTesting single-instance handoff...")
+    
+    import os
+    resident = None
+    old_tmpdir = os.environ.get("TMPDIR")
+    try:
+        import subprocess
+        import sys
+        import tempfile
+        import time
+        from app.core.control import hand_off
+        
+        tmp = Path(tempfile.mkdtemp())
+        # Private socket directory and log home, so a real instance is not touched
+        os.environ["TMPDIR"] = str(tmp)
+        env = dict(os.environ, HOME=str(tmp), XDG_CONFIG_HOME=str(tmp / ".config"), QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+        cwd = Path(__file__).parent
+        
+        assert hand_off([{"cmd": "ping"}]) is None
+        print("✓ No instance: hand_off reports nothing listening")
+        
+        resident = subprocess.Popen([sys.executable, "-m", "app.main", "--tray"], cwd=cwd, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        status = None
+        deadline = time.time() + 30
+        while status is None and time.time() < deadline:
+            time.sleep(0.1)
+            status = hand_off([{"cmd": "status"}])
+        assert status and status[0]["pid"] == resident.pid, status
+        
+        t0 = time.perf_counter()
+        second = subprocess.run([sys.executable, "-X", "importtime", "-m", "app.main"], cwd=cwd, env=env,
+                                capture_output=True, text=True, timeout=30)
+        elapsed = time.perf_counter() - t0
+        assert second.returncode == 0, second.stderr[-500:]
+        assert "PyQt6" not in second.stderr, "second launch imported Qt"
+        status = hand_off([{"cmd": "status"}])
+        assert status[0]["pid"] == resident.pid and status[0]["visible"]
+        print(f"✓ Second launch handed off and exited in {elapsed * 1000:.0f} ms without loading Qt")
+        
+        capture = subprocess.run([sys.executable, "-m", "app.main", "--capture"], cwd=cwd, env=env,
+                                 capture_output=True, text=True, timeout=30)
+        assert capture.returncode == 0 and "no session open" in capture.stderr, capture.stderr[-500:]
+        print("✓ --capture without a session reports the error from the running instance")
+        
+        # A launch that missed the early handoff (both started at once) defers when it cannot listen
+        race = subprocess.run([sys.executable, "-c", "import sys, app.main as m; "
+                               "sys.exit(m.OverlayAnnotatorApp().run())"],
+                              cwd=cwd, env=env, capture_output=True, text=True, timeout=30)
+        assert race.returncode == 0, race.stderr[-500:]
+        assert hand_off([{"cmd": "status"}])[0]["pid"] == resident.pid
+        print("✓ Launch that lost the socket race hands off instead of running twice")
+        
+        print("\n✅ Single-instance tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Single-instance test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    
+    finally:
+        if resident is not None:
+            resident.terminate()
+            resident.wait(10)
+        if old_tmpdir is None:
+            os.environ.pop("TMPDIR", None)
+        else:
+            os.environ["TMPDIR"] = old_tmpdir
+
+def test_background_session_load():
+    """Test opening a session off the GUI thread and restoring it at startup"""
+    print("\nTesting background session load...")
+    
+    try:
+        import tempfile
+        import time
+        from PIL import Image
+        from PyQt6 import sip
+        from PyQt6.QtCore import QCoreApplication, QEvent, QSettings
+        from PyQt6.QtWidgets import QApplication
+        from app.core.models import Entry, ImageModel
+        from app.core.storage import SessionStore
+        from app.core.thumbnails import DEFAULT_THUMBNAIL_SIZE
+        from app.ui.main_window import LAST_SESSION_KEY, MainWindow
+        
+        app = QApplication.instance() or QApplication([])
+        tmp = Path(tempfile.mkdtemp())
+        session = tmp / "session"
+        session.mkdir()
+        store = SessionStore(session)
+        for i in range(5):
+            rel = store.save_image(Image.new("RGB", (320, 200), (40 * i, 90, 160)))
+            store.save_entry(Entry.new(
+                title=f"Shot {i}", notes="", layout="image-left",
+                image=ImageModel(path=rel.as_posix(), width=320, height=200, sha256=store.image_hash(rel))
+            ))
+        
+        def make_window():
+            window = MainWindow(project_root=tmp)
+            # Keep the real per-user settings out of the test
+            window.settings = QSettings(str(tmp / "settings.ini"), QSettings.Format.IniFormat)
+            return window
+        
+        def wait_loaded(window):
+            deadline = time.time() + 30
+            while window.session_loader is not None and time.time() < deadline:
+                app.processEvents()
+                time.sleep(0.005)
+            assert window.session_loader is None, "session never finished loading"
+        
+        window = make_window()
+        assert not window.restore_last_session()
+        window.open_session(session)
+        assert window.store is None and window.btn_capture.isEnabled() and not window.btn_export.isEnabled()
+        print("✓ open_session returns at once; capture is enabled while loading")
+        
+        wait_loaded(window)
+        assert window.store is not None and window.entry_model.rowCount() == 5
+        assert window.btn_export.isEnabled()
+        thumbs = list((session / "_cache" / "thumbnails").rglob(f"*_{DEFAULT_THUMBNAIL_SIZE}.png"))
+        assert len(thumbs) == 5, thumbs
+        assert window.settings.value(LAST_SESSION_KEY) == str(session)
+        print("✓ Entries and thumbnails loaded in the background; session remembered")
+        window.shutdown()
+        
+        restored = make_window()
+        assert restored.restore_last_session()
+        wait_loaded(restored)
+        assert restored.session_path == session and restored.entry_model.rowCount() == 5
+        restored.shutdown()
+        print("✓ Last session reopened on the next start")
+        
+        # Switching twice quickly: only the latest session is attached
+        other = tmp / "other"
+        old_thumbnails = restored.thumbnail_loader
+        restored.open_session(other)
+        restored.open_session(session)
+        wait_loaded(restored)
+        app.processEvents()
+        QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+        assert restored.session_path == session and restored.store.root == session
+        assert sip.isdeleted(old_thumbnails) and restored.thumbnail_loader is not old_thumbnails
+        print("✓ A superseded load is discarded; the old thumbnail loader is released")
+        
+        print("\n✅ Background session load tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Background session load test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_thumbnail_cache():
+    """Test the on-disk thumbnail cache and the loader's in-memory icon LRU"""
+    print("\nTesting thumbnail cache...")
+    
+    try:
+        import tempfile
+        import time
+        from PIL import Image
+        from PyQt6 import sip
+        from PyQt6.QtCore import QCoreApplication, QEvent
+        from PyQt6.QtWidgets import QApplication
+        from app.core.storage import SessionStore
+        from app.core.thumbnails import ThumbnailCache
+        from app.ui import thumbnail_loader
+        from app.ui.thumbnail_loader import ThumbnailLoader
+        
+        app = QApplication.instance() or QApplication([])
+        tmp = Path(tempfile.mkdtemp())
+        source = tmp / "shot.png"
+        Image.new("RGB", (640, 400), (200, 80, 40)).save(source)
+        
+        cache = ThumbnailCache(tmp / "thumbs")
+        assert cache.get("ab" * 32, 96) is None
+        first = cache.get_or_create(source, "ab" * 32, 96)
+        assert first == cache.get("ab" * 32, 96) and first.parent.name == "ab"
+        with Image.open(first) as thumb:
+            assert max(thumb.size) == 96, thumb.size
+        mtime = first.stat().st_mtime_ns
+        # Same hash reuses the file, even if the path it came from is gone
+        source.unlink()
+        assert cache.get_or_create(tmp / "missing.png", "ab" * 32, 96) == first
+        assert first.stat().st_mtime_ns == mtime
+        print("✓ Thumbnails reused by content hash")
+        
+        Image.new("RGB", (640, 400), (200, 80, 40)).save(source)
+        small = cache.get_or_create(source, "ab" * 32, 32)
+        assert small != first and cache.get("ab" * 32, 48) is None
+        with Image.open(small) as thumb:
+            assert max(thumb.size) == 32, thumb.size
+        print("✓ Each size cached separately")
+        
+        session = tmp / "session"
+        session.mkdir()
+        store = SessionStore(session)
+        images = []
+        for i in range(3):
+            rel = store.save_image(Image.new("RGB", (64, 40), (60 * i, 90, 160)))
+            images.append((rel.as_posix(), store.image_hash(rel)))
+        for image_path, image_hash in images:
+            store.thumbnails.get_or_create(session / image_path, image_hash, 48)
+        
+        limit = thumbnail_loader.MAX_CACHED_ICONS
+        thumbnail_loader.MAX_CACHED_ICONS = 2
+        try:
+            loader = ThumbnailLoader(store, size=48)
+            # Thumbnails already on disk load without a round trip through the pool
+            assert loader.request("e0", *images[0]) is not None
+            assert loader.request("e1", *images[1]) is not None
+            assert loader.icon("e0") is not None  # touch: e1 is now least recent
+            assert loader.request("e2", *images[2]) is not None
+            assert loader.icon("e1") is None
+            assert loader.icon("e0") is not None and loader.icon("e2") is not None
+            print("✓ Icon cache evicts the least recently used entry")
+        finally:
+            thumbnail_loader.MAX_CACHED_ICONS = limit
+        
+        # Cache misses go through the pool and arrive as thumbnail_ready
+        ready = {}
+        loader.thumbnail_ready.connect(lambda key, icon: ready.setdefault(key, icon))
+        rel = store.save_image(Image.new("RGB", (64, 40), (1, 2, 3)))
+        assert loader.request("e3", rel.as_posix(), store.image_hash(rel)) is None
+        deadline = time.time() + 10
+        while "e3" not in ready and time.time() < deadline:
+            app.processEvents()
+            time.sleep(0.005)
+        assert "e3" in ready and loader.icon("e3") is not None
+        loader.clear()
+        assert loader.icon("e0") is None
+        print("✓ Missing thumbnails generated in the background")
+        
+        loader.deleteLater()
+        QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+        assert sip.isdeleted(loader)
+        
+        print("\n✅ Thumbnail cache tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Thumbnail cache test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_entry_model():
+    """Test manifest paging and the sort/filter proxy of the entry list"""
+    print("\nTesting entry list model...")
+    
+    try:
+        import tempfile
+        import time
+        from PIL import Image
+        from PyQt6.QtWidgets import QApplication
+        from app.core.models import Entry, ImageModel
+        from app.core.storage import SessionStore, parse_timestamp
+        from app.ui import entry_model
+        from app.ui.entry_model import ENTRY_ID_ROLE, ENTRY_TITLE_ROLE, EntryFilterProxyModel, EntryListModel
+        
+        app = QApplication.instance() or QApplication([])
+        store = SessionStore(Path(tempfile.mkdtemp()))
+        rel = store.save_image(Image.new("RGB", (32, 24), (10, 20, 30)))
+        image = ImageModel(path=rel.as_posix(), width=32, height=24, sha256=store.image_hash(rel))
+        # Saved in one order, timestamped and titled in others; half the
+        # timestamps carry a +02:00 offset, so their text sorts after every UTC one
+        entries = []
+        for i in range(25):
+            entry = Entry.new(title=f"Note {(i * 7) % 25:02d}", notes="", layout="image-left", image=image)
+            minute = (i * 11) % 25
+            entry.timestamp = (f"2024-01-01T02:{minute:02d}:00+02:00" if i % 2
+                               else f"2024-01-01T00:{minute:02d}:00+00:00")
+            store.save_entry(entry)
+            entries.append(entry)
+        
+        page_size = entry_model.PAGE_SIZE
+        entry_model.PAGE_SIZE = 10
+        try:
+            model = EntryListModel()
+            proxy = EntryFilterProxyModel()
+            proxy.setSourceModel(model)
+            model.set_session(store)
+            counts = [model.rowCount()]
+            while model.canFetchMore():
+                model.fetchMore()
+                counts.append(model.rowCount())
+            assert counts == [10, 20, 25], counts
+            assert [model.index(i).data(ENTRY_ID_ROLE) for i in range(25)] == [e.id for e in entries]
+            print("✓ Manifest rows paged in, in save order")
+            
+            # Changes appended to the manifest since are picked up by the next page
+            entries[3].title = "Renamed"
+            store.save_entry(entries[3])
+            store.delete_entry(entries[4].id)
+            assert model.canFetchMore()
+            model.fetchMore()
+            assert model.rowCount() == 24 and not model.canFetchMore()
+            assert model.index(3).data(ENTRY_TITLE_ROLE) == "Renamed"
+            assert model.row_for_id(entries[4].id) is None
+            del entries[4]
+            print("✓ Updates and deletions applied from the manifest tail")
+            
+            def visible(column=ENTRY_ID_ROLE):
+                return [proxy.index(i, 0).data(column) for i in range(proxy.rowCount())]
+            
+            def wait():
+                deadline = time.time() + 10
+                while model.is_busy() and time.time() < deadline:
+                    app.processEvents()
+                    time.sleep(0.005)
+                assert not model.is_busy(), "query never finished"
+            
+            newest = sorted(entries, key=lambda e: parse_timestamp(e.timestamp), reverse=True)
+            proxy.set_sort_mode("Newest first")
+            wait()
+            # Only the first page is loaded, yet it holds the newest entries of all
+            assert model.rowCount() == 10, model.rowCount()
+            assert visible() == [e.id for e in newest[:10]]
+            while proxy.canFetchMore(proxy.index(-1, 0).parent()):
+                proxy.fetchMore(proxy.index(-1, 0).parent())
+            assert visible() == [e.id for e in newest]
+            
+            proxy.set_sort_mode("Title A–Z")
+            wait()
+            assert model.rowCount() == 10
+            assert visible(ENTRY_TITLE_ROLE) == sorted(e.title for e in entries)[:10]
+            print("✓ Sorting orders the whole manifest in the background, timestamps as instants")
+            
+            # Saved while sorted: the proxy places it; paging in later keeps the new title
+            late = next(e for e in entries if e.title == "Note 24")
+            late.title = "Aardvark"
+            store.save_entry(late)
+            model.add_entry(late)
+            assert visible(ENTRY_TITLE_ROLE)[0] == "Aardvark"
+            while model.canFetchMore():
+                model.fetchMore()
+            titles = visible(ENTRY_TITLE_ROLE)
+            assert titles == sorted(e.title for e in entries) and "Note 24" not in titles
+            print("✓ Entries saved while sorted land in place")
+            
+            # The filter finds rows that were never paged in
+            proxy.set_sort_mode("Oldest first")
+            resets = []
+            model.modelReset.connect(lambda: resets.append(1))
+            for text in ("n", "no", "not", "note", "note 2"):
+                proxy.set_filter_text(text)
+            assert model.is_busy()
+            wait()
+            assert len(resets) == 1, resets  # one query for the whole burst of keystrokes
+            matching = [e.id for e in entries if "note 2" in e.title.lower()]
+            assert len(matching) == 3 and not model.canFetchMore()
+            assert model.rowCount() == 3 and visible() == matching
+            proxy.set_filter_text(entries[20].id.upper())
+            wait()
+            assert visible() == [entries[20].id]
+            proxy.set_filter_text("")
+            wait()
+            assert model.rowCount() == 10 and model.canFetchMore()
+            assert visible()[:3] == [e.id for e in entries[:3]]
+            print("✓ Filter matches title or id across the whole session")
+        finally:
+            entry_model.PAGE_SIZE = page_size
+        
+        print("\n✅ Entry list model tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Entry list model test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_logging_pipeline():
+    """Test that log calls are queued and written by the listener thread"""
+    print("\nTesting logging pipeline...")
+    
+    import logging
+    root = logging.getLogger()
+    app_logger = logging.getLogger('OverlayAnnotator')
+    saved = (list(root.handlers), root.level, app_logger.level)
+    try:
+        import logging.handlers
+        import tempfile
+        import time
+        from PIL import Image
+        from PyQt6.QtWidgets import QApplication
+        from app.core import logger as app_logging
+        from app.ui.annotation_canvas import AnnotationCanvas
+        
+        app = QApplication.instance() or QApplication([])
+        tmp = Path(tempfile.mkdtemp())
+        
+        _, log_file = app_logging.setup_logging(tmp, level="INFO")
+        assert [type(h) for h in root.handlers] == [logging.handlers.QueueHandler]
+        assert app_logger.level == logging.INFO and root.level == app_logging.LIBRARY_LEVEL
+        
+        # A stalled disk must not stall the caller
+        listener = app_logging._listener
+        file_handler = listener.handlers[0]
+        real_emit = file_handler.emit
+        file_handler.emit = lambda record: (time.sleep(0.05), real_emit(record))
+        t0 = time.perf_counter()
+        for i in range(20):
+            logging.getLogger('OverlayAnnotator.Test').info("record %d", i)
+        elapsed = time.perf_counter() - t0
+        assert elapsed < 0.05, f"log calls blocked for {elapsed:.3f}s"
+        print(f"✓ 20 log calls against a 50 ms/write disk returned in {elapsed * 1000:.1f} ms")
+        
+        canvas = AnnotationCanvas()
+        canvas.load_pil(Image.new("RGB", (64, 48)))
+        app_logging.stop_logging()
+        text = log_file.read_text(encoding="utf-8")
+        assert "record 19" in text and "Loading image" not in text
+        print("✓ Queued records are written on stop; canvas debug output is off at INFO")
+        
+        _, log_file = app_logging.setup_logging(tmp, level="DEBUG")
+        canvas.load_pil(Image.new("RGB", (64, 48)))
+        app_logging.stop_logging()
+        assert "Loading image: 64x48, mode: RGB" in log_file.read_text(encoding="utf-8")
+        assert app_logging.resolve_level("warning") == logging.WARNING
+        print("✓ Hot-path details appear at DEBUG")
+        
+        print("\n✅ Logging pipeline tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Logging pipeline test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    
+    finally:
+        from app.core.logger import stop_logging
+        stop_logging()
+        root.handlers[:] = saved[0]
+        root.setLevel(saved[1])
+        app_logger.setLevel(saved[2])
+
+def test_log_retention():
+    """Test log rotation, compression of old logs and pruning by size and age"""
+    print("\nTesting log retention...")
+    
+    import logging
+    root = logging.getLogger()
+    app_logger = logging.getLogger('OverlayAnnotator')
+    saved = (list(root.handlers), root.level, app_logger.level)
+    try:
+        import gzip
+        import os
+        import tempfile
+        import time
+        from app.core import logger as app_logging
+        
+        tmp = Path(tempfile.mkdtemp())
+        now = time.time()
+        
+        def old_log(name, days, size):
+            path = tmp / name
+            path.write_bytes(b"x" * size)
+            os.utime(path, (now - days * 86400, now - days * 86400))
+            return path
+        
+        for i in range(30):
+            old_log(f"overlay_annotator_202401{i + 1:02d}_120000.log", 30 - i, 2000)
+        recent = old_log("overlay_annotator_20991231_120000.log", 0.001, 4000)
+        current = old_log("overlay_annotator_20991231_130000.log", 40, 4000)
+        backup = old_log("overlay_annotator_20991231_130000.log.1.gz", 40, 4000)
+        other = old_log("metrics.json", 40, 10)
+        
+        result = app_logging.prune_logs(tmp, current, max_total_bytes=20000, max_age_days=14)
+        names = sorted(p.name for p in tmp.iterdir())
+        assert result.compressed == 13 and result.deleted == 17, result  # expired ones are not compressed first
+        assert recent.exists() and current.exists() and backup.exists() and other.exists()
+        assert all(n.endswith(".gz") for n in names if n.startswith("overlay_annotator_2024"))
+        kept = [n for n in names if n.startswith("overlay_annotator_2024")]
+        # Older than 14 days goes regardless of size; the rest is within budget
+        assert kept == [f"overlay_annotator_202401{d:02d}_120000.log.gz" for d in range(18, 31)], kept
+        assert gzip.decompress((tmp / kept[0]).read_bytes()) == b"x" * 2000
+        print(f"✓ Pruned: {result.compressed} compressed, {result.deleted} deleted; current log and backups kept")
+        
+        # Protected and recent logs take 12000 bytes; room for a few small .gz files
+        result = app_logging.prune_logs(tmp, current, max_total_bytes=12100, max_age_days=14)
+        kept = sorted(p.name for p in tmp.glob("overlay_annotator_2024*"))
+        assert result.total_bytes <= 12100 and 0 < len(kept) < 13, (result, kept)
+        assert kept[-1].endswith("0130_120000.log.gz") and recent.exists()
+        print("✓ Oldest logs deleted first until under the size budget")
+        
+        # Many tiny logs within the size and age budget are capped by count
+        for i in range(40):
+            old_log(f"overlay_annotator_202402{i:02d}_120000.log.gz", 1 + i / 100, 10)
+        result = app_logging.prune_logs(tmp, current, max_total_bytes=10**9, max_age_days=14, max_files=20)
+        kept = sorted(p.name for p in tmp.glob("overlay_annotator_*"))
+        assert len(kept) == 20 and result.deleted > 0, (result, kept)
+        assert current.exists() and backup.exists() and recent.exists()
+        assert "overlay_annotator_20240200_120000.log.gz" in kept  # newest of the batch
+        print(f"✓ File count capped at 20 ({result.deleted} deleted)")
+        
+        # Rotation produces gzip backups
+        _, log_file = app_logging.setup_logging(tmp, level="INFO")
+        handler = app_logging._listener.handlers[0]
+        handler.maxBytes = 2000
+        for i in range(200):
+            logging.getLogger('OverlayAnnotator.Test').info("line %d %s", i, "y" * 40)
+        app_logging.stop_logging()
+        backups = sorted(tmp.glob(log_file.name + ".*.gz"))
+        assert len(backups) == app_logging.LOG_BACKUP_COUNT, backups
+        assert b"line" in gzip.decompress(backups[0].read_bytes())
+        assert log_file.stat().st_size <= 2000 + 200
+        print(f"✓ Rotation keeps {len(backups)} gzip backups")
+        
+        print("\n✅ Log retention tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Log retention test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    
+    finally:
+        from app.core.logger import stop_logging
+        stop_logging()
+        root.handlers[:] = saved[0]
+        root.setLevel(saved[1])
+        app_logger.setLevel(saved[2])
+
+def test_metrics():
+    """Test timing spans, histograms and the periodic metrics file"""
+    print("\nTesting metrics...")
+    
+    from app.core import metrics
+    try:
+        import json
+        import tempfile
+        import time
+        from PIL import Image
+        from PyQt6.QtWidgets import QApplication
+        from app.core.models import Entry, ImageModel
+        from app.core.storage import SessionStore
+        from app.ui.annotation_canvas import AnnotationCanvas
+        
+        app = QApplication.instance() or QApplication([])
+        tmp = Path(tempfile.mkdtemp())
+        store = SessionStore(tmp)
+        canvas = AnnotationCanvas()
+        
+        assert not metrics.enabled()
+        assert metrics.span("a") is metrics.span("b")  # shared no-op
+        metrics.mark("capture")
+        metrics.record_since("capture", "capture.request_to_canvas")
+        print("✓ Disabled: spans are a shared no-op")
+        
+        path = tmp / metrics.METRICS_FILE
+        metrics.enable(path, interval=0.05)
+        metrics.mark("capture")
+        for i in range(5):
+            canvas.load_pil(Image.new("RGB", (320, 200), (i, 0, 0)))
+            pil = canvas.render_annotated()
+            rel = store.save_image(pil)
+            store.save_entry(Entry.new(title=f"M{i}", notes="", layout="image-left",
+                                       image=ImageModel(path=rel.as_posix(), width=320, height=200)))
+        store.export_json()
+        metrics.record_since("capture", "capture.request_to_canvas")
+        metrics.record_since("capture", "capture.request_to_canvas")  # mark is used once
+        
+        deadline = time.time() + 5
+        while not path.exists() and time.time() < deadline:
+            time.sleep(0.01)
+        assert path.exists(), "metrics file never written"
+        metrics.disable()
+        spans = json.loads(path.read_text(encoding="utf-8"))["spans"]
+        for name in ("canvas.load", "canvas.render", "store.save_image", "store.encode", "store.save_entry"):
+            assert spans[name]["count"] == 5, (name, spans.get(name))
+            assert spans[name]["p50_ms"] <= spans[name]["p95_ms"] <= spans[name]["max_ms"]
+        assert spans["store.export_json"]["count"] == 1 and spans["export.run"]["count"] == 1
+        assert spans["capture.request_to_canvas"]["count"] == 1
+        print(f"✓ {len(spans)} spans written to {path.name} (save_image p50 {spans['store.save_image']['p50_ms']} ms)")
+        
+        assert not metrics.enabled() and metrics.span("x") is metrics.span("y")
+        print("✓ Disabling writes a final snapshot and stops collecting")
+        
+        print("\n✅ Metrics tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Metrics test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    
+    finally:
+        metrics.disable()
+
 if __name__ == "__main__":
     print("=" * 50)
     print("Overlay Annotator - Quick Tests")
@@ -97,6 +2043,32 @@ if __name__ == "__main__":
     success = True
     success = test_imports() and success
     success = test_session_storage() and success
+    success = test_image_codecs() and success
+    success = test_content_addressed_images() and success
+    success = test_session_manifest() and success
+    success = test_json_backends() and success
+    success = test_streaming_html_export() and success
+    success = test_incremental_export() and success
+    success = test_linked_html_export() and success
+    success = test_export_renditions() and success
+    success = test_template_environment() and success
+    success = test_paginated_html_export() and success
+    success = test_export_pipeline() and success
+    success = test_parallel_map() and success
+    success = test_pdf_export() and success
+    success = test_ndjson_export() and success
+    success = test_cli() and success
+    success = test_annotation_render() and success
+    success = test_folder_ingest() and success
+    success = test_control_socket() and success
+    success = test_lazy_imports() and success
+    success = test_single_instance() and success
+    success = test_background_session_load() and success
+    success = test_thumbnail_cache() and success
+    success = test_entry_model() and success
+    success = test_logging_pipeline() and success
+    success = test_log_retention() and success
+    success = test_metrics() and success
     
     print("\n" + "=" * 50)
     if success: